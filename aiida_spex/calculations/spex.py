@@ -16,17 +16,42 @@ from __future__ import absolute_import
 
 import io
 import os
+from fnmatch import fnmatch
+from glob import has_magic
 
 import six
 import re
 from aiida.common.datastructures import CalcInfo, CodeInfo
 from aiida.common.exceptions import InputValidationError, UniquenessError
+from aiida.common.hashing import make_hash
 from aiida.common.utils import classproperty
 from aiida.engine import CalcJob
-from aiida.orm import Dict, RemoteData
-from aiida_fleur.calculation.fleur import FleurCalculation
-from aiida_spex.tools.spexinp_utils import make_spex_inp, make_energy_inp
-from aiida_spex.tools.add_parsers import parser_registry
+from aiida.orm import ArrayData, Dict, RemoteData
+from aiida_spex.tools.spexinp_utils import (
+    dump_energy_inp,
+    make_spex_inp,
+    canonical_hash,
+)
+from aiida_spex.tools.compression import compress_script, compressed_name
+from aiida_spex.tools.parser_registry import (
+    get_parser_files,
+    get_parser_names,
+    is_parser_temporary,
+)
+from aiida_spex.tools.restart_inventory import (
+    file_fingerprint,
+    inventory_script,
+    restart_family,
+    restart_parameters,
+    select_restart_files,
+)
+from aiida_spex.tools.staging import (
+    SHARED_STAGING_MARKER,
+    fetch_parent_files,
+    fill_shared_staging,
+    place_archive,
+    unpack_script,
+)
 
 
 class SpexCalculation(CalcJob):
@@ -37,6 +62,11 @@ class SpexCalculation(CalcJob):
     NOTE: RemoteData must be a valid FLEUR or SPEX remote data node.
     """
 
+    # process types of the possible parent calculations, compared as strings so
+    # that the plugin classes (and their dependencies) are not imported
+    _SPEX_PROCESS_TYPE = "aiida.calculations:spex.spex"
+    _FLEUR_PROCESS_TYPE = "aiida.calculations:fleur.fleur"
+
     # Default input and output files
     # these will be shown in AiiDA
     _OUTPUT_FILE_NAME = "spex.out"
@@ -91,6 +121,48 @@ class SpexCalculation(CalcJob):
         "spex.core.[0-9]+",
         "eig_gw.hdf",
     ]
+    _RESTART_FILE_PATTERN = re.compile("|".join(_RESTART_FILE_NAMES))
+
+    # spex.inp keywords the RESTART files depend on. A file of the parent is
+    # only reused if these parameters did not change (spex.sigc.2 -> spex.sigc)
+    _RESTART_FILE_DEPENDENCIES = {
+        "spex.uwan": ["BZ", "WANNIER"],
+        "spex.kolap": ["BZ", "WANNIER"],
+        "spex.sigx": ["BZ", "JOB", "MBASIS", "COULOMB"],
+        "spex.sigc": [
+            "BZ",
+            "NBAND",
+            "JOB",
+            "MBASIS",
+            "SUSCEP",
+            "SENERGY",
+            "COULOMB",
+            "WFPROD",
+        ],
+        "spex.sigt": [
+            "BZ",
+            "NBAND",
+            "JOB",
+            "MBASIS",
+            "SUSCEP",
+            "SENERGY",
+            "COULOMB",
+            "WFPROD",
+        ],
+        "spex.wcou": ["BZ", "NBAND", "MBASIS", "SUSCEP", "COULOMB", "WFPROD"],
+        "spex.cor": ["BZ", "NBAND", "MBASIS", "SUSCEP", "COULOMB", "WFPROD"],
+        "spex.cot": ["BZ", "NBAND", "MBASIS", "SUSCEP", "COULOMB", "WFPROD"],
+        "spex.ccou": ["BZ", "MBASIS", "COULOMB"],
+        "spex.mb": ["BZ", "MBASIS", "COULOMB"],
+        "spex.core": ["BZ", "CORES", "CORESOC"],
+        "eig_gw.hdf": ["BZ", "NBAND"],
+    }
+    # written at the end of the job with the size and mtime (or sha256) of the
+    # RESTART files and of the FLEUR files
+    _RESTART_INVENTORY_FILE_NAME = "spex.restart_inventory"
+
+    # parent files of a calculation on another computer, see tools/staging.py
+    _STAGING_ARCHIVE_NAME = "parent_files.tar.gz"
 
     # POLICY
     # We will store everything needed for a further run in the local repository
@@ -107,9 +179,27 @@ class SpexCalculation(CalcJob):
         _POT_FILE_NAME,
         _ECORE_FILE,
     ]
+    # names in the inventory written at the end of the job, see _parent_fingerprints
+    _FILE_CHECKSUM_PATTERN = re.compile(
+        "|".join(re.escape(filename) for filename in _copy_filelist_job_remote)
+    )
 
     _copy_filelist1 = [_INPUT_FILE_NAME, _ENPARA_FILE_NAME]
 
+    # STAGING POLICY
+    # With settings["symlink_parent_files"] the files of the parent which SPEX
+    # only reads (the FLEUR ground state) are symlinked instead of copied.
+    # Everything else, e.g. the RESTART files which SPEX updates, is copied.
+    _symlink_filelist_job_remote = [
+        _OUTXML_FILE_NAME,
+        _INPXML_FILE_NAME,
+        _SYMXML_FILE_NAME,
+        _CDN_HDF5_FILE_NAME,
+        _BASIS_FILE_NAME,
+        _POT_FILE_NAME,
+        _ECORE_FILE,
+    ]
+
     # possible settings_dict keys
     _settings_keys = [
         "additional_retrieve_list",
@@ -118,6 +208,53 @@ class SpexCalculation(CalcJob):
         "remove_from_remotecopy_list",
         "cmdline",
         "parsers",
+        "parser_options",
+        "streaming",
+        "symlink_parent_files",
+        "output_format",
+        "restart_inventory",
+        "staging_cache",
+        "staging_cache_size",
+        "shared_staging",
+        "staging_directory",
+        "keep_parser_files",
+        "compress_outputs",
+        "compress_files",
+    ]
+
+    # CACHING
+    # The inputs are hashed as they are, get_inputs_spex (tools/common_spex_wf.py)
+    # builds them in canonical form (canonical_parameters, canonical_settings),
+    # so equivalent inputs are equal nodes. The hash also includes the attribute
+    # _CACHE_KEY_ATTRIBUTE, the fingerprints of the files of the parent, which
+    # the parent recorded in its inventory. A parent folder whose files changed
+    # is not taken from the cache.
+    _CACHE_KEY_ATTRIBUTE = "spex_cache_key"
+    _PARAMETERS_HASH_ATTRIBUTE = "spex_parameters_hash"
+    # settings with these values are the same as not given
+    _settings_defaults = {
+        "additional_retrieve_list": [],
+        "remove_from_retrieve_list": [],
+        "additional_remotecopy_list": [],
+        "remove_from_remotecopy_list": [],
+        "cmdline": [],
+        "parsers": [],
+        "parser_options": {},
+        "streaming": False,
+        "symlink_parent_files": False,
+        "restart_inventory": True,
+        "shared_staging": False,
+        "keep_parser_files": False,
+        "compress_outputs": False,
+    }
+    # settings which are lists of names in any order
+    _unordered_settings = [
+        "additional_retrieve_list",
+        "remove_from_retrieve_list",
+        "additional_remotecopy_list",
+        "remove_from_remotecopy_list",
+        "parsers",
+        "compress_files",
     ]
 
     @classmethod
@@ -169,6 +306,13 @@ class SpexCalculation(CalcJob):
         # declare outputs of the calculation
         spec.output("output_parameters", valid_type=Dict, required=False)
         spec.output("output_parameters_add", valid_type=Dict, required=False)
+        spec.output(
+            "output_arrays_add",
+            valid_type=ArrayData,
+            required=False,
+            help="Arrays of the additional parsers, "
+            "if settings['output_format'] is 'array'.",
+        )
         spec.output("error_params", valid_type=Dict, required=False)
         spec.default_output_node = "output_parameters"
 
@@ -216,6 +360,140 @@ class SpexCalculation(CalcJob):
     def _get_output_folder(self):
         return "./"
 
+    @classmethod
+    def _is_read_only_file(cls, filename):
+        """
+        True if `filename` (a name or glob pattern of a parent file) is only read
+        by SPEX, i.e. it can be symlinked instead of copied.
+        """
+        return any(
+            fnmatch(filename, pattern) for pattern in cls._symlink_filelist_job_remote
+        )
+
+    @classmethod
+    def restart_file_dependencies(cls, filename):
+        """
+        The spex.inp keywords the RESTART file `filename` depends on.
+        """
+        return cls._RESTART_FILE_DEPENDENCIES.get(restart_family(filename), [])
+
+    def _select_restart_files(self, parent_calc, parent_calc_folder):
+        """
+        The RESTART files of the SPEX parent which can be reused with the
+        parameters of this calculation. Without an inventory of the parent
+        the producing parameters are taken from the parent's input.
+        """
+        if "parameters" in self.inputs:
+            parameters = self.inputs.parameters.get_dict()
+        else:
+            parameters = {}
+
+        inventory = {}
+        if hasattr(parent_calc.outputs, "output_parameters"):
+            inventory = parent_calc.outputs.output_parameters.get_dict().get(
+                "restart_inventory", {}
+            )
+        if not inventory:
+            if "parameters" in parent_calc.inputs:
+                parent_parameters = parent_calc.inputs.parameters.get_dict()
+            else:
+                parent_parameters = {}
+            inventory = {
+                filename: {
+                    "parameters": restart_parameters(
+                        parent_parameters, self.restart_file_dependencies(filename)
+                    )
+                }
+                for filename in parent_calc_folder.listdir()
+                if self._RESTART_FILE_PATTERN.fullmatch(filename)
+            }
+
+        reusable, stale = select_restart_files(
+            inventory, parameters, self._RESTART_FILE_DEPENDENCIES
+        )
+        if stale:
+            self.logger.info(
+                "RESTART files of the parent not staged, their parameters "
+                "changed: {}".format(stale)
+            )
+        return reusable
+
+    def _setup_db_record(self):
+        """
+        Set up the node with the cache key, which is part of its hash.
+        """
+        super()._setup_db_record()
+        self.node.set_attribute(self._CACHE_KEY_ATTRIBUTE, self._cache_key())
+        # to find calculations with equivalent parameters, see tools/sweep.py
+        if "parameters" in self.inputs:
+            self.node.set_attribute(
+                self._PARAMETERS_HASH_ATTRIBUTE,
+                canonical_hash(self.inputs.parameters.get_dict()),
+            )
+
+    def _cache_key(self):
+        """
+        Hash of the content of the parent files, which the inputs (the parent
+        folder node) do not cover.
+        """
+        if "parent_folder" not in self.inputs:
+            return None
+        return make_hash(self._parent_fingerprints(self.inputs.parent_folder))
+
+    def _parent_fingerprints(self, parent_calc_folder):
+        """
+        Fingerprints (sha256, or size and modification time) of the parent
+        files a calculation can use, as recorded by the parent SPEX calculation
+        in its inventory when it finished (no remote access here). Without an
+        inventory the uuid of the parent folder is used, i.e. the calculation
+        is only equal to itself.
+        """
+        parent_calc = parent_calc_folder.creator
+        parent_process_type = getattr(parent_calc, "process_type", None)
+        if parent_process_type != self._SPEX_PROCESS_TYPE:
+            return parent_calc_folder.uuid
+        outputs = parent_calc.outputs
+        if not hasattr(outputs, "output_parameters"):
+            return parent_calc_folder.uuid
+        output_parameters = outputs.output_parameters.get_dict()
+        if "file_fingerprints" not in output_parameters:
+            return parent_calc_folder.uuid
+        fingerprints = list(output_parameters["file_fingerprints"].items())
+        fingerprints += [
+            (filename, file_fingerprint(entry))
+            for filename, entry in output_parameters.get(
+                "restart_inventory", {}
+            ).items()
+        ]
+        # energy.inp is written from the parsed results of the parent
+        if hasattr(outputs, "output_parameters_add"):
+            fingerprints.append(
+                ("output_parameters_add", outputs.output_parameters_add.get_hash())
+            )
+        return sorted(fingerprints)
+
+    def _staging_parent(self, parent_calc, parent_calc_folder):
+        """
+        Calculation and folder the shared staging directory of the FLEUR files
+        is filled from. A SPEX parent which linked these files from a shared
+        staging directory passes them on unchanged, so its children share the
+        staging directory of its own parent instead of staging its copy again.
+        """
+        while parent_calc.process_type == self._SPEX_PROCESS_TYPE:
+            settings = {}
+            if "settings" in parent_calc.inputs:
+                settings = parent_calc.inputs.settings.get_dict()
+            if not settings.get("shared_staging", False):
+                break
+            if "parent_folder" not in parent_calc.inputs:
+                break
+            folder = parent_calc.inputs.parent_folder
+            if folder.computer.uuid != parent_calc_folder.computer.uuid:
+                # the files were staged through the local side
+                break
+            parent_calc, parent_calc_folder = folder.creator, folder
+        return parent_calc, parent_calc_folder
+
     def prepare_for_submission(self, folder):
         """
         This is the routine to be called when you make a SPEX calculation.
@@ -231,8 +509,11 @@ class SpexCalculation(CalcJob):
         remote_symlink_list = []
         mode_retrieved_filelist = []
         parser_retrived_filelist = []
+        parser_temporary_filelist = []
         filelist_tocopy_remote = []
         remote_restart_copy_list = []
+        provenance_exclude_list = []
+        prepend_text = ""
         settings_dict = {}
 
         has_parent = False
@@ -243,7 +524,7 @@ class SpexCalculation(CalcJob):
 
         energy_inp_file_name = self._ENERGY_INPUT_FILE_NAME
         energy_inp_with = "GW"
-        energy_inp_file_content = ""
+        energy_inp_results = None
 
         code = self.inputs.code
 
@@ -268,34 +549,29 @@ class SpexCalculation(CalcJob):
                     "".format(n_parents, "" if n_parents == 0 else "s")
                 )
             parent_calc = parent_calcs[0].node
-            parent_calc_class = parent_calc.process_class
+            parent_process_type = parent_calc.process_type
             has_parent = True
 
             # check if folder from db given, or get folder from rep.
             # Parent calc does not has to be on the same computer.
             # Check parent folder for files and is they exist copy them
 
-            if parent_calc_class is SpexCalculation:
+            if parent_process_type == self._SPEX_PROCESS_TYPE:
                 is_parent_spex = True
                 new_comp = self.node.computer
                 old_comp = parent_calc.computer
                 if new_comp.uuid != old_comp.uuid:
-                    # don't copy files, copy files locally
+                    # the files are staged through the local side
                     copy_remotely = False
-                else:
-                    parent_file_list = parent_calc_folder.listdir()
-                    remote_restart_copy_list += [
-                        j
-                        for j in parent_file_list
-                        for i in self._RESTART_FILE_NAMES
-                        if re.match(i + "$", j)
-                    ]
+                remote_restart_copy_list += self._select_restart_files(
+                    parent_calc, parent_calc_folder
+                )
 
-            elif parent_calc_class is FleurCalculation:
+            elif parent_process_type == self._FLEUR_PROCESS_TYPE:
                 new_comp = self.node.computer
                 old_comp = parent_calc.computer
                 if new_comp.uuid != old_comp.uuid:
-                    # don't copy files, copy files locally
+                    # the files are staged through the local side
                     copy_remotely = False
             else:
                 raise InputValidationError(
@@ -317,13 +593,15 @@ class SpexCalculation(CalcJob):
 
         if is_parser_list:
             add_parsers_list = settings_dict["parsers"]
-            if not all(
-                item in list(parser_registry.keys()) for item in add_parsers_list
-            ):
+            if not all(item in get_parser_names() for item in add_parsers_list):
                 self.exit_codes.ERROR_INVALID_PARSER_NAME
             else:
-                pareser_file_list = [parser_registry[p] for p in add_parsers_list]
-                parser_retrived_filelist = sum(pareser_file_list, [])
+                keep_parser_files = settings_dict.get("keep_parser_files", False)
+                for p in add_parsers_list:
+                    if is_parser_temporary(p) and not keep_parser_files:
+                        parser_temporary_filelist += get_parser_files(p)
+                    else:
+                        parser_retrived_filelist += get_parser_files(p)
 
         # check for for allowed keys, ignore unknown keys but warn.
         for key in settings_dict.keys():
@@ -354,6 +632,8 @@ class SpexCalculation(CalcJob):
                             ].upper()
 
                         if hasattr(parent_calc.outputs, "output_parameters_add"):
+                            from aiida_spex.tools.add_results import load_add_results
+
                             add_out_para_dict = (
                                 parent_calc.outputs.output_parameters_add.get_dict()
                             )
@@ -365,9 +645,8 @@ class SpexCalculation(CalcJob):
                                 if energy_parsed[0] == "ks" and energy_inp_with == "GW":
                                     self.exit_codes.ERROR_ADDITIONAL_PARAMETERS_NOT_VALID
                                 else:
-                                    energy_inp_file_content = make_energy_inp(
-                                        add_out_para_dict[energy_parsed[0]],
-                                        with_e=energy_inp_with,
+                                    energy_inp_results = load_add_results(
+                                        parent_calc, energy_parsed[0]
                                     )
                             else:
                                 self.exit_codes.ERROR_ADDITIONAL_PARAMETERS_NOT_VALID
@@ -384,33 +663,99 @@ class SpexCalculation(CalcJob):
             outfolder_uuid = parent_calc.outputs.retrieved.uuid
             self.logger.info("out folder path {}".format(outfolder_uuid))
 
-            # TODO: not on same computer -> copy needed files from repository
-            # if they are not there throw an error
-            if copy_remotely:  # on same computer.
-                filelist_tocopy_remote = (
-                    filelist_tocopy_remote
-                    + self._copy_filelist_job_remote
-                    + remote_restart_copy_list
+            filelist_tocopy_remote = (
+                filelist_tocopy_remote
+                + self._copy_filelist_job_remote
+                + remote_restart_copy_list
+            )
+            # from settings, user specified
+            # TODO: check if list?
+            for file1 in settings_dict.get("additional_remotecopy_list", []):
+                filelist_tocopy_remote.append(file1)
+
+            for file1 in settings_dict.get("remove_from_remotecopy_list", []):
+                if file1 in filelist_tocopy_remote:
+                    filelist_tocopy_remote.remove(file1)
+
+            if not copy_remotely:  # on another computer.
+                # one compressed archive, fetched through the local staging
+                # cache, uploaded with the inputs and unpacked before SPEX runs
+                archive, staged_files = fetch_parent_files(
+                    parent_calc_folder,
+                    filelist_tocopy_remote,
+                    cache_dir=settings_dict.get("staging_cache"),
+                    logger=self.logger,
+                    max_bytes=settings_dict.get("staging_cache_size"),
                 )
-                # from settings, user specified
-                # TODO: check if list?
-                for file1 in settings_dict.get("additional_remotecopy_list", []):
-                    filelist_tocopy_remote.append(file1)
-
-                for file1 in settings_dict.get("remove_from_remotecopy_list", []):
-                    if file1 in filelist_tocopy_remote:
-                        filelist_tocopy_remote.remove(file1)
+                place_archive(archive, folder.get_abs_path(self._STAGING_ARCHIVE_NAME))
+                provenance_exclude_list.append(self._STAGING_ARCHIVE_NAME)
+                prepend_text = unpack_script(self._STAGING_ARCHIVE_NAME)
+                self.logger.info("staged file list {}".format(staged_files))
+            else:  # on same computer.
+                if settings_dict.get("shared_staging", False):
+                    # the FLEUR files are copied once into a staging directory
+                    # shared by all jobs of this parent and linked from there
+                    shared_files = [
+                        file1
+                        for file1 in filelist_tocopy_remote
+                        if file1 in self._copy_filelist_job_remote
+                    ]
+                    staging_calc, staging_folder = self._staging_parent(
+                        parent_calc, parent_calc_folder
+                    )
+                    staging, staged_files = fill_shared_staging(
+                        staging_folder,
+                        shared_files,
+                        staging_calc.get_hash() or staging_calc.uuid,
+                        self.node.uuid,
+                        root=settings_dict.get("staging_directory"),
+                    )
+                    for file1 in staged_files:
+                        remote_symlink_list.append(
+                            (
+                                parent_calc_folder.computer.uuid,
+                                os.path.join(staging, file1),
+                                file1,
+                            )
+                        )
+                    marker = folder.get_abs_path(SHARED_STAGING_MARKER)
+                    with open(marker, "w") as handle:
+                        handle.write(staging)
+                    provenance_exclude_list.append(SHARED_STAGING_MARKER)
+                    filelist_tocopy_remote = [
+                        file1
+                        for file1 in filelist_tocopy_remote
+                        if file1 not in shared_files
+                    ]
 
+                symlink_parent_files = settings_dict.get("symlink_parent_files", False)
                 for file1 in filelist_tocopy_remote:
-                    remote_copy_list.append(
-                        (
-                            parent_calc_folder.computer.uuid,
-                            os.path.join(parent_calc_folder.get_remote_path(), file1),
-                            self._get_output_folder,
-                        )
+                    remote_path = os.path.join(
+                        parent_calc_folder.get_remote_path(), file1
                     )
+                    if symlink_parent_files and self._is_read_only_file(file1):
+                        # a link needs the name of the link, except for globs
+                        # which are linked into the folder file by file
+                        remote_symlink_list.append(
+                            (
+                                parent_calc_folder.computer.uuid,
+                                remote_path,
+                                self._get_output_folder if has_magic(file1) else file1,
+                            )
+                        )
+                    else:
+                        remote_copy_list.append(
+                            (
+                                parent_calc_folder.computer.uuid,
+                                remote_path,
+                                self._get_output_folder,
+                            )
+                        )
 
                 self.logger.info("remote copy file list {}".format(remote_copy_list))
+                self.logger.info(
+                    "remote symlink file list {}".format(remote_symlink_list)
+                )
 
         input_filename = folder.get_abs_path(self._INPUT_FILE_NAME)
 
@@ -423,7 +768,9 @@ class SpexCalculation(CalcJob):
             energy_input_filename = folder.get_abs_path(energy_inp_file_name)
             # if energy keyword is preent in the parametrs then write the energy.inp file
             with open(energy_input_filename, "w") as infile:
-                infile.write("{}".format(energy_inp_file_content))
+                if energy_inp_results is not None:
+                    # written column-wise straight into the file
+                    dump_energy_inp(energy_inp_results, infile, with_e=energy_inp_with)
 
         ########## MAKE CALCINFO ###########
 
@@ -440,6 +787,8 @@ class SpexCalculation(CalcJob):
         calcinfo.local_copy_list = local_copy_list
         calcinfo.remote_copy_list = remote_copy_list
         calcinfo.remote_symlink_list = remote_symlink_list
+        calcinfo.provenance_exclude_list = provenance_exclude_list
+        calcinfo.prepend_text = prepend_text
 
         # Retrieve by default the output file and the xml file
         retrieve_list = []
@@ -451,6 +800,20 @@ class SpexCalculation(CalcJob):
 
         for mode_file in mode_retrieved_filelist:
             retrieve_list.append(mode_file)
+
+        calcinfo.append_text = ""
+        restart_inventory = settings_dict.get("restart_inventory", True)
+        if restart_inventory:
+            # the FLEUR files are listed too, their fingerprints are the cache
+            # key of calculations restarting from this one. The sha256 of the
+            # (GB sized) files only on request, it costs walltime of the job.
+            calcinfo.append_text += inventory_script(
+                [family + "*" for family in self._RESTART_FILE_DEPENDENCIES]
+                + self._copy_filelist_job_remote,
+                self._RESTART_INVENTORY_FILE_NAME,
+                checksum=restart_inventory == "sha256",
+            )
+            retrieve_list.append(self._RESTART_INVENTORY_FILE_NAME)
         self.logger.info("retrieve_list: {}".format(retrieve_list))
 
         # user specific retrieve
@@ -471,10 +834,40 @@ class SpexCalculation(CalcJob):
             if file1 in retrieve_list:
                 retrieve_list.remove(file1)
 
+        # large text outputs are compressed on the remote computer and
+        # retrieved (and stored) compressed, the parser reads them as stream
+        compression = settings_dict.get("compress_outputs")
+        compress_filelist = []
+        if compression:
+            if compression is True:
+                compression = "gzip"
+            compress_filelist = settings_dict.get(
+                "compress_files",
+                [self._OUTPUT_FILE_NAME]
+                + parser_retrived_filelist
+                + parser_temporary_filelist,
+            )
+            calcinfo.append_text += compress_script(compress_filelist, compression)
+
         calcinfo.retrieve_list = []
         for file1 in retrieve_list:
+            if file1 in compress_filelist:
+                file1 = compressed_name(file1, compression)
             calcinfo.retrieve_list.append(file1)
 
+        # files only the parsers read are not stored in the repository
+        calcinfo.retrieve_temporary_list = []
+        for file1 in parser_temporary_filelist:
+            if file1 in retrieve_list:
+                continue
+            if file1 in compress_filelist:
+                file1 = compressed_name(file1, compression)
+            if file1 not in calcinfo.retrieve_temporary_list:
+                calcinfo.retrieve_temporary_list.append(file1)
+        self.logger.info(
+            "retrieve_temporary_list: {}".format(calcinfo.retrieve_temporary_list)
+        )
+
         codeinfo = CodeInfo()
 
         # walltime_sec = self.node.get_attribute("max_wallclock_seconds")
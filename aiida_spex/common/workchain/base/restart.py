@@ -10,6 +10,7 @@ from aiida.engine import ExitCode, CalcJob, WorkChain, ToContext, append_
 from aiida.plugins.entry_point import get_entry_point_names, load_entry_point
 
 from aiida_spex.common.exceptions import UnexpectedCalculationFailure
+from aiida_spex.tools.staging import clean_workdir
 
 
 class BaseRestartWorkChain(WorkChain):
@@ -211,7 +212,8 @@ class BaseRestartWorkChain(WorkChain):
         for called_descendant in self.node.called_descendants:
             if isinstance(called_descendant, orm.CalcJobNode):
                 try:
-                    called_descendant.outputs.remote_folder._clean()  # pylint: disable=protected-access
+                    # releases a shared staging directory of the calculation first
+                    clean_workdir(called_descendant)
                     cleaned_calcs.append(str(called_descendant.pk))
                 except (IOError, OSError, KeyError):
                     pass
@@ -13,13 +13,32 @@
 This module contains the parser for a spex calculation and methods for
 parsing different files produced by inpgen.
 """
+import io
+import os
+from contextlib import ExitStack
+from functools import partial
+
 from aiida.parsers import Parser
-from aiida.orm import Dict
+from aiida.orm import ArrayData, Dict
 from aiida.common.exceptions import NotExistent
 from aiida_spex.calculations.spex import SpexCalculation
 
-from aiida_spex.tools.spex_io import spexout_parser
-from aiida_spex.tools.add_parsers import parser_registry, spexfile_parse
+from aiida_spex.tools.spex_io import KPointIndex, spexout_parser
+from aiida_spex.tools.parser_registry import (
+    get_parser_files,
+    load_parser,
+    run_parser,
+)
+from aiida_spex.tools.add_results import nan_to_none, split_add_results
+from aiida_spex.tools.compression import (
+    decompressing_reader,
+    uncompressed_name,
+)
+from aiida_spex.tools.restart_inventory import (
+    file_fingerprint,
+    parse_inventory,
+    restart_parameters,
+)
 import re
 
 
@@ -38,6 +57,28 @@ class SpexParser(Parser):
         """
         return "output_parameters_add"
 
+    def get_linkname_outarrays_add(self):
+        """
+        Returns the name of the link to the output_arrays_add
+        Node contains the arrays of the additional parsers, if they are stored as arrays.
+        """
+        return "output_arrays_add"
+
+    @staticmethod
+    def _open_output(output_folder, temporary_folder, filename, stored_files=None):
+        """
+        Open a file of the retrieved folder, or of the temporary folder if it
+        was retrieved only for parsing, in binary mode. A file compressed on
+        the remote computer (`stored_files` maps it to the stored name) is
+        decompressed while it is read.
+        """
+        stored_name, method = (stored_files or {}).get(filename, (filename, None))
+        if temporary_folder and stored_name in os.listdir(temporary_folder):
+            fileobj = open(os.path.join(temporary_folder, stored_name), "rb")
+        else:
+            fileobj = output_folder.open(stored_name, "rb")
+        return decompressing_reader(fileobj, method)
+
     def parse(self, **kwargs):
         """
         Takes spex.out generated by SPEX calculation and created data node.
@@ -49,6 +90,14 @@ class SpexParser(Parser):
 
         should_retrieve = calc.get_attribute("retrieve_list")
 
+        if "settings" in calc.inputs:
+            settings_dict = calc.inputs.settings.get_dict()
+        else:
+            settings_dict = {}
+        # in streaming mode the files are passed to the parsers as open file
+        # objects and read line by line instead of as one string
+        streaming = settings_dict.get("streaming", False)
+
         has_spex_outfile = False
         has_inpxml_file = False
 
@@ -62,6 +111,31 @@ class SpexParser(Parser):
         list_of_files = output_folder.list_object_names()
         self.logger.info("file list {}".format(list_of_files))
 
+        # files retrieved only for the additional parsers, deleted after parsing
+        temporary_folder = kwargs.get("retrieved_temporary_folder")
+        if temporary_folder:
+            list_of_temporary_files = os.listdir(temporary_folder)
+            self.logger.info("temporary file list {}".format(list_of_temporary_files))
+        else:
+            list_of_temporary_files = []
+
+        # files compressed before the retrieval, by their original name
+        stored_files = {}
+        for stored_name in list_of_files + list_of_temporary_files:
+            filename, method = uncompressed_name(stored_name)
+            if method is not None:
+                stored_files[filename] = (stored_name, method)
+        list_of_files = list_of_files + [
+            filename
+            for filename, (stored_name, _) in stored_files.items()
+            if stored_name in list_of_files
+        ]
+        list_of_temporary_files = list_of_temporary_files + [
+            filename
+            for filename, (stored_name, _) in stored_files.items()
+            if stored_name in list_of_temporary_files
+        ]
+
         self.logger.info("SpexData initialized")
 
         if SpexCalculation._OUTPUT_FILE_NAME not in list_of_files:
@@ -72,8 +146,8 @@ class SpexParser(Parser):
         else:
             has_spex_outfile = True
 
-        for file in should_retrieve:
-            if file not in list_of_files:
+        for file in should_retrieve + calc.get_attribute("retrieve_temporary_list", []):
+            if file not in list_of_files + list_of_temporary_files:
                 self.logger.warning(
                     f"Expected file '{file}' not found in retrieved folder, it was probably not created by fleur or spex"
                 )
@@ -94,17 +168,61 @@ class SpexParser(Parser):
                     self.logger.error(f"SPEX error: {spex_error}")
                     return self.exit_codes.ERROR_SPEX_CALC_FAILED
 
-        with output_folder.open(
-            SpexCalculation._OUTPUT_FILE_NAME, "r"
+        # contents of the retrieved files, every file is read only once and
+        # shared by the main and all additional parsers (not in streaming mode)
+        file_cache = {}
+
+        with self._open_output(
+            output_folder,
+            temporary_folder,
+            SpexCalculation._OUTPUT_FILE_NAME,
+            stored_files,
         ) as spexout_opened:
             success = True
             parser_info = {}
             try:
-                out_dict = spexout_parser(spexout_opened.read())
+                if streaming:
+                    out_dict = spexout_parser(
+                        io.TextIOWrapper(spexout_opened, encoding="utf-8")
+                    )
+                else:
+                    file_cache[SpexCalculation._OUTPUT_FILE_NAME] = (
+                        spexout_opened.read().decode("utf-8")
+                    )
+                    out_dict = spexout_parser(
+                        file_cache[SpexCalculation._OUTPUT_FILE_NAME]
+                    )
             except (ValueError, FileNotFoundError, KeyError) as exc:
                 self.logger.error(f"output parsing failed: {str(exc)}")
                 success = False
 
+        # size, fingerprint and producing parameters of the RESTART files, used
+        # to stage only compatible files when restarting from this calculation
+        inventory_file = SpexCalculation._RESTART_INVENTORY_FILE_NAME
+        if success and inventory_file in list_of_files:
+            with output_folder.open(inventory_file, "r") as inventory_opened:
+                inventory_content = inventory_opened.read()
+            restart_inventory = parse_inventory(
+                inventory_content, SpexCalculation._RESTART_FILE_PATTERN
+            )
+            if "parameters" in calc.inputs:
+                parameters = calc.inputs.parameters.get_dict()
+            else:
+                parameters = {}
+            for filename, entry in restart_inventory.items():
+                entry["parameters"] = restart_parameters(
+                    parameters, SpexCalculation.restart_file_dependencies(filename)
+                )
+            out_dict["restart_inventory"] = restart_inventory
+            # fingerprints of the FLEUR files, the cache key of calculations
+            # restarting from this one
+            out_dict["file_fingerprints"] = {
+                filename: file_fingerprint(entry)
+                for filename, entry in parse_inventory(
+                    inventory_content, SpexCalculation._FILE_CHECKSUM_PATTERN
+                ).items()
+            }
+
         # Call routines for output node creation
         if not success:
             self.logger.error("Parsing of SPEX  output file was not successfull.")
@@ -123,32 +241,116 @@ class SpexParser(Parser):
             self.out(link_name, spexout_params)
 
         # Additional parsers
-        settings_dict = calc.inputs.settings.get_dict()
         if "parsers" in settings_dict:
             add_parser_list = settings_dict["parsers"]
             if add_parser_list:
                 add_dict = {}
-                for parser_name in add_parser_list:
-                    add_contents=[]
-                    add_filenames = parser_registry[parser_name]
-                    for add_filename in add_filenames:
-                        if add_filename in list_of_files:
+                parser_options = settings_dict.get("parser_options", {})
+                # one index of the K POINT blocks of spex.out for all parsers
+                kpoint_index = None
+                with ExitStack() as stack:
+                    parser_contents = {}
+                    for parser_name in add_parser_list:
+                        add_filenames = get_parser_files(parser_name)
+                        for add_filename in add_filenames:
+                            if add_filename not in (
+                                list_of_files + list_of_temporary_files
+                            ):
+                                self.logger.error(f"File {add_filename} not found")
+                                return self.exit_codes.ERROR_SPEXOUT_PARSING_FAILED
+                        add_contents = []
+                        for add_filename in add_filenames:
+                            # open binary, text mode may read the whole file at once
                             try:
-                                with output_folder.open(add_filename, "r") as add_file:
-                                    add_contents.append(add_file.read())
+                                if streaming:
+                                    # every parser iterates over its own file object,
+                                    # the KPointIndex reads in its first file
+                                    add_file = stack.enter_context(
+                                        self._open_output(
+                                            output_folder,
+                                            temporary_folder,
+                                            add_filename,
+                                            stored_files,
+                                        )
+                                    )
+                                    add_contents.append(
+                                        stack.enter_context(
+                                            io.TextIOWrapper(add_file, encoding="utf-8")
+                                        )
+                                    )
+                                    continue
+                                if add_filename not in file_cache:
+                                    with self._open_output(
+                                        output_folder,
+                                        temporary_folder,
+                                        add_filename,
+                                        stored_files,
+                                    ) as add_file:
+                                        file_cache[add_filename] = (
+                                            add_file.read().decode("utf-8")
+                                        )
                             except OSError:
                                 self.logger.error(
-                                    f"Failed to open error file: {errorfile}."
+                                    f"Failed to open file: {add_filename}."
                                 )
                                 return self.exit_codes.ERROR_OPENING_OUTPUTS
-                        else:
-                            self.logger.error(f"File {add_filename} not found")
+                            add_contents.append(file_cache[add_filename])
+
+                        if (
+                            load_parser(parser_name).spex_parser_kpoint_index
+                            and kpoint_index is None
+                        ):
+                            reopen = None
+                            if streaming and add_filenames[0] in stored_files:
+                                # a decompressing stream is only read forward
+                                reopen = partial(
+                                    self._open_output,
+                                    output_folder,
+                                    temporary_folder,
+                                    add_filenames[0],
+                                    stored_files,
+                                )
+                            kpoint_index = KPointIndex(add_contents[0], reopen=reopen)
+                            stack.callback(kpoint_index.close)
+                        parser_contents[parser_name] = add_contents
+
+                    # the parsers run one after the other, they share the
+                    # KPointIndex and the file position of its content
+                    for parser_name, add_contents in parser_contents.items():
+                        try:
+                            add_dict[parser_name] = run_parser(
+                                parser_name,
+                                add_contents,
+                                out_dict,
+                                kpoint_index,
+                                parser_options.get(parser_name),
+                            )
+                        except Exception as exc:  # pylint: disable=broad-except
+                            self.logger.error(
+                                f"additional parser '{parser_name}' failed: {exc}"
+                            )
                             return self.exit_codes.ERROR_SPEXOUT_PARSING_FAILED
-                        
-                    add_dict_t = spexfile_parse(parser_name, add_contents, out_dict)
-                    add_dict[parser_name] = add_dict_t
-                if add_dict:
-                    add_params = Dict(dict=add_dict)
+                # parsers may declare arrays as their default output format
+                default_format = "dict"
+                if any(
+                    load_parser(parser_name).spex_parser_output == "array"
+                    for parser_name in add_dict
+                ):
+                    default_format = "array"
+                output_format = settings_dict.get("output_format", default_format)
+                if add_dict and output_format == "array":
+                    # numeric columns go to the repository, the Dict keeps the rest
+                    add_summary, add_arrays = split_add_results(add_dict)
+                    add_array_node = ArrayData()
+                    for array_name, array in add_arrays.items():
+                        add_array_node.set_array(array_name, array)
+                    self.out(self.get_linkname_outarrays_add(), add_array_node)
+                    add_params = Dict(dict=add_summary)
+                    link_name = self.get_linkname_outparams_add()
+                    self.out(link_name, add_params)
+                elif add_dict:
+                    # a Dict can not store NaN, e.g. the padding of arrays
+                    add_params = Dict(dict=nan_to_none(add_dict))
                     link_name = self.get_linkname_outparams_add()
                     self.out(link_name, add_params)
                 else:
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# Copyright (c), Forschungszentrum Jülich GmbH, IAS-1/PGI-1, Germany.         #
+#                All rights reserved.                                         #
+# This file is part of the AiiDA-SPEX package.                               #
+#                                                                             #
+# The code is hosted on GitHub at https://github.com/JuDFTteam/aiida-spex     #
+# For further information on the license, see the LICENSE.txt file            #
+# For further information please visit http://www.flapw.de or                 #
+###############################################################################
+"""
+Tests of the additional parsers of SPEX output files.
+"""
+import os
+
+import numpy as np
+import pytest
+
+from aiida_spex.tools.add_parsers import (
+    GW_IMAG_FIELDS,
+    GW_REAL_FIELDS,
+    KS_REAL_FIELDS,
+    decode_diagonal_tables,
+    gw_parser,
+    plussoc_parser,
+)
+from aiida_spex.tools.add_results import (
+    merge_add_results,
+    nan_to_none,
+    split_add_results,
+)
+from aiida_spex.tools.spex_io import spexout_parser
+
+SPEX_OUT = os.path.join(os.path.dirname(__file__), "files", "spex_gw.out")
+
+PLUSSOC_OUT = """\
+Spin-orbit coupling
+
+K point      1 ->      1
+    1    1    1    1    2    2    1    1
+  -0.51234  -0.51234  -0.20000
+
+K point      2 ->      2
+    3    1    1    1
+  -0.40000  -0.30000
+
+"""
+
+
+def test_plussoc_padded_eigenvalues():
+    """the eigenvalues are a NaN-padded (k point, band) array"""
+    results = plussoc_parser("plussoc", [PLUSSOC_OUT])["results"]
+    assert results["k_point_number"] == [1, 2]
+    assert results["n_bands"] == [3, 2]
+    eigenvalues = np.array(results["eigenvalues"])
+    assert eigenvalues.shape == (2, 3)
+    assert np.isnan(eigenvalues[1, 2])
+    np.testing.assert_allclose(eigenvalues[1, :2], [-0.4, -0.3])
+    assert results["equivalant_k_points"] == [
+        [1, 1, 1, 1, 1],
+        [1, 2, 2, 1, 1],
+        [2, 3, 1, 1, 1],
+    ]
+    assert plussoc_parser.spex_parser_output == "array"
+
+    # the arrays keep NaN, a Dict gets None instead
+    _, arrays = split_add_results({"plussoc": results})
+    assert arrays["plussoc__eigenvalues"].dtype == float
+    assert nan_to_none(results)["eigenvalues"][1] == [-0.4, -0.3, None]
+
+
+def test_merge_padded_arrays():
+    """2-D float arrays of different widths are padded when merged"""
+    first = {"eigenvalues": np.array([[1.0, 2.0, 3.0]]), "equivalent": [[1], [1]]}
+    second = {"eigenvalues": np.array([[4.0, 5.0]]), "equivalent": [[2], [2]]}
+    merged = merge_add_results([first, second])
+    assert merged["equivalent"] == [[1], [1], [2], [2]]
+    expected = [[1.0, 2.0, 3.0], [4.0, 5.0, np.nan]]
+    np.testing.assert_array_equal(np.array(merged["eigenvalues"]), expected)
+
+    # as columns of a table (one row per k point)
+    first = {"kpoint": np.array([1]), "eigenvalues": np.array([[1.0, 2.0, 3.0]])}
+    second = {"kpoint": np.array([1]), "eigenvalues": np.array([[4.0, 5.0]])}
+    merged = merge_add_results([first, second])
+    assert merged["chunk"] == [0, 1]
+    np.testing.assert_array_equal(np.array(merged["eigenvalues"]), expected)
+
+
+def _rows(table):
+    """Reference: the numbers of every non-empty row of a table."""
+    return [[float(val) for val in row.split()] for row in table if row.strip()]
+
+
+def test_gw_parser_decodes_diagonal_tables():
+    """the batched decoding agrees with reading the table row by row"""
+    with open(SPEX_OUT, encoding="utf-8") as handle:
+        content = handle.read()
+    out_dict = spexout_parser(content)
+    results = gw_parser("gw", [content], out_dict)["results"]
+
+    lines = content.splitlines()
+    real_rows, imag_rows = [], []
+    for i, line in enumerate(lines):
+        if line.startswith(" Bd ") and "GW" in line:
+            rows = _rows(lines[i + 1 : lines.index("", i)])
+            real_rows.extend(rows[::2])
+            imag_rows.extend(rows[1::2])
+    assert results["real"]["kpoint"] == [1, 1, 1, 2, 2, 2]
+    assert results["real"]["spin"] == [1] * 6
+    assert results["real"]["Bd"] == [int(row[0]) for row in real_rows]
+    for i, field in enumerate(GW_REAL_FIELDS[1:], start=1):
+        assert results["real"][field] == [row[i] for row in real_rows]
+    for i, field in enumerate(GW_IMAG_FIELDS):
+        assert results["imag"][field] == [row[i] for row in imag_rows]
+    assert results["imag"]["Bd"] == results["real"]["Bd"]
+
+
+def _gw_rows(band, value):
+    """The real and the imaginary row of a band in a GW table."""
+    real = f"    {band} " + f" {value}" * (len(GW_REAL_FIELDS) - 1) + "\n"
+    imag = "      " + f" {-value}" * len(GW_IMAG_FIELDS) + "\n"
+    return real + imag
+
+
+def test_decode_two_spins():
+    """with two spins the bands of a table alternate between up and down"""
+    tables = {
+        "1": _gw_rows(1, 1.0) + _gw_rows(1, 1.5),
+        "2": _gw_rows(1, 3.0) + _gw_rows(1, 3.5) + _gw_rows(2, 5.0) + _gw_rows(2, 5.5),
+    }
+    real, imag = decode_diagonal_tables(
+        tables, ["1", "2"], 2, GW_REAL_FIELDS, GW_IMAG_FIELDS
+    )
+    assert real["kpoint"].tolist() == [1, 1, 2, 2, 2, 2]
+    assert real["spin"].tolist() == [1, 2, 1, 2, 1, 2]
+    assert real["Bd"].tolist() == [1, 1, 1, 1, 2, 2]
+    assert real["GW"].tolist() == [1.0, 1.5, 3.0, 3.5, 5.0, 5.5]
+    assert imag["GW"].tolist() == [-1.0, -1.5, -3.0, -3.5, -5.0, -5.5]
+    assert imag["spin"].tolist() == real["spin"].tolist()
+
+
+def test_decode_malformed_tables():
+    """missing columns or imaginary rows are errors"""
+    with pytest.raises(ValueError, match="columns"):
+        decode_diagonal_tables({"1": "    1  -1.0\n"}, ["1"], 1, KS_REAL_FIELDS)
+    tables = {"1": _gw_rows(1, 0.5) + _gw_rows(2, 0.5).splitlines()[0]}
+    with pytest.raises(ValueError, match="imaginary parts"):
+        decode_diagonal_tables(tables, ["1"], 1, GW_REAL_FIELDS, GW_IMAG_FIELDS)
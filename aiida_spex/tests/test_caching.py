@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# Copyright (c), Forschungszentrum Jülich GmbH, IAS-1/PGI-1, Germany.         #
+#                All rights reserved.                                         #
+# This file is part of the AiiDA-SPEX package.                               #
+#                                                                             #
+# The code is hosted on GitHub at https://github.com/JuDFTteam/aiida-spex     #
+# For further information on the license, see the LICENSE.txt file            #
+# For further information please visit http://www.flapw.de or                 #
+###############################################################################
+"""
+Tests of the canonical inputs of SpexCalculation, which make equivalent
+inputs hash (and cache) equally.
+"""
+import pytest
+
+hashing = pytest.importorskip("aiida.common.hashing")
+
+from aiida_spex.tools.common_spex_wf import canonical_settings  # noqa: E402
+from aiida_spex.tools.spexinp_utils import canonical_parameters  # noqa: E402
+
+
+def test_equivalent_inputs_have_the_same_hash():
+    """inputs differing in keyword case, order and default settings hash equally"""
+    parameters = {"NBAND": 80, "JOB": {"GW": {"1": [[4, 12]], "X": [[4, 8], 9]}}}
+    other_parameters = {"job": {"gw": {"X": [[4, 9]], "1": [[4, 12]]}}, "nband": 80}
+    settings = {"parsers": ["gw", "ks"], "additional_retrieve_list": ["a", "b"]}
+    other_settings = {
+        "additional_retrieve_list": ["b", "a", "a"],
+        "parsers": ["ks", "gw"],
+        "keep_parser_files": False,
+        "streaming": False,
+        "remove_from_retrieve_list": [],
+        "restart_inventory": True,
+    }
+    assert hashing.make_hash(canonical_parameters(parameters)) == hashing.make_hash(
+        canonical_parameters(other_parameters)
+    )
+    assert hashing.make_hash(canonical_settings(settings)) == hashing.make_hash(
+        canonical_settings(other_settings)
+    )
+
+
+def test_different_inputs_have_different_hashes():
+    """settings which change the calculation stay in the hash"""
+    settings = {"parsers": ["gw"], "cmdline": ["-w"]}
+    assert canonical_settings(settings) == settings
+    assert hashing.make_hash(canonical_settings(settings)) != hashing.make_hash(
+        canonical_settings({"parsers": ["gw"]})
+    )
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# Copyright (c), Forschungszentrum Jülich GmbH, IAS-1/PGI-1, Germany.         #
+#                All rights reserved.                                         #
+# This file is part of the AiiDA-SPEX package.                               #
+#                                                                             #
+# The code is hosted on GitHub at https://github.com/JuDFTteam/aiida-spex     #
+# For further information on the license, see the LICENSE.txt file            #
+# For further information please visit http://www.flapw.de or                 #
+###############################################################################
+"""
+Tests of the K POINT index on compressed (retrieved) spex.out files.
+"""
+import gzip
+import io
+import re
+
+import pytest
+
+from aiida_spex.tools.compression import decompressing_reader
+from aiida_spex.tools.spex_io import KPointIndex
+
+SPEXOUT = "".join(
+    f"""##### K POINT:  {k}  #####
+
+ DIAGONAL ELEMENTS
+ Bd     vxc    sigmax
+  1  -10.{k}  -12.{k}
+  2   -9.{k}  -11.{k}
+
+"""
+    for k in range(1, 4)
+).encode("utf-8")
+
+
+def _compress(method):
+    if method == "gzip":
+        return gzip.compress(SPEXOUT)
+    zstandard = pytest.importorskip("zstandard")
+    return zstandard.ZstdCompressor().compress(SPEXOUT)
+
+
+def _tables(index):
+    return {
+        k_point: [index.read(start, end) for _, start, end in block["tables"]]
+        for k_point, block in index.blocks.items()
+    }
+
+
+def _open(method):
+    return decompressing_reader(io.BytesIO(_compress(method)), method)
+
+
+@pytest.mark.parametrize("method", ["gzip", "zstd"])
+def test_kpoint_index_of_compressed_file(method):
+    """The index of a compressed stream reads the same tables, in any order."""
+    reference = KPointIndex(SPEXOUT)
+    opened = []
+
+    def reopen():
+        opened.append(_open(method))
+        return opened[-1]
+
+    index = KPointIndex(_open(method), reopen=reopen)
+    assert index.k_points == ["1", "2", "3"]
+    # forward reads of the whole file do not reopen it
+    assert _tables(index) == _tables(reference)
+    assert len(opened) == 1
+    # every backward read reopens the stream
+    for k_point in reversed(index.k_points):
+        assert _tables(index)[k_point] == _tables(reference)[k_point]
+    index.close()
+    assert all(stream.closed for stream in opened)
+
+
+@pytest.mark.parametrize("method", ["gzip", "zstd"])
+def test_kpoint_tables_in_file_order(method):
+    """`tables` reads the tables of a stream in one forward pass."""
+    header = re.compile(r"\s*Bd")
+    reference = {k: KPointIndex(SPEXOUT).table(k, header) for k in "123"}
+    opened = []
+
+    def reopen():
+        opened.append(_open(method))
+        return opened[-1]
+
+    index = KPointIndex(_open(method), reopen=reopen)
+    # the index pass ended behind the tables, they are read from a new stream
+    assert index.tables(["3", "1", "2"], header) == reference
+    assert len(opened) == 1
+    index.close()
+
+
+def test_kpoint_index_stream_without_reopen():
+    """A stream which can not be reopened can not be read backwards."""
+    pytest.importorskip("zstandard")
+    index = KPointIndex(_open("zstd"))
+    with pytest.raises(ValueError, match="reopen"):
+        index.table("1", re.compile(r"\s*Bd"))
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# Copyright (c), Forschungszentrum Jülich GmbH, IAS-1/PGI-1, Germany.         #
+#                All rights reserved.                                         #
+# This file is part of the AiiDA-SPEX package.                               #
+#                                                                             #
+# The code is hosted on GitHub at https://github.com/JuDFTteam/aiida-spex     #
+# For further information on the license, see the LICENSE.txt file            #
+# For further information please visit http://www.flapw.de or                 #
+###############################################################################
+"""
+Import time guard of the submission path (SpexCalculation, make_spex_inp,
+check_parameters), based on ``python -X importtime``.
+
+Fails if a heavy library (pandas, pydantic, aiida-fleur, ...) is imported, or
+if the modules imported on top of aiida-core take longer than the budget.
+"""
+import subprocess
+import sys
+
+import pytest
+
+SUBMISSION_IMPORTS = (
+    "import aiida_spex.calculations.spex; "
+    "from aiida_spex.tools.spexinp_utils import make_spex_inp, check_parameters"
+)
+BASELINE_IMPORTS = "import aiida.engine, aiida.orm, aiida.common, aiida.plugins"
+FORBIDDEN = ["pandas", "pydantic", "aiida_fleur", "masci_tools", "matplotlib", "scipy"]
+# import time of the modules imported on top of aiida-core
+BUDGET_MS = 150.0
+
+
+def import_times(statement):
+    """
+    Return {module: self time in us} of all modules imported by `statement`,
+    or None if it fails.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        return None
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(self_us)
+    return times
+
+
+@pytest.fixture(scope="module")
+def submission_imports():
+    """{module: self time in us} of the modules imported on top of aiida-core."""
+    baseline = import_times(BASELINE_IMPORTS)
+    if baseline is None:
+        pytest.skip("aiida-core is not installed")
+    submission = import_times(SUBMISSION_IMPORTS)
+    assert submission is not None, "the submission imports failed"
+    return {name: time for name, time in submission.items() if name not in baseline}
+
+
+def test_no_heavy_imports(submission_imports):
+    """The submission path does not import pandas, pydantic, aiida-fleur, ..."""
+    heavy = sorted(
+        name for name in submission_imports if name.split(".")[0] in FORBIDDEN
+    )
+    assert heavy == []
+
+
+def test_import_time_budget(submission_imports):
+    """The modules imported on top of aiida-core stay within the budget."""
+    total_ms = sum(submission_imports.values()) / 1000.0
+    slowest = sorted(submission_imports.items(), key=lambda item: -item[1])[:10]
+    assert total_ms <= BUDGET_MS, "import time {:.1f} ms, slowest: {}".format(
+        total_ms, slowest
+    )
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# Copyright (c), Forschungszentrum Jülich GmbH, IAS-1/PGI-1, Germany.         #
+#                All rights reserved.                                         #
+# This file is part of the AiiDA-SPEX package.                               #
+#                                                                             #
+# The code is hosted on GitHub at https://github.com/JuDFTteam/aiida-spex     #
+# For further information on the license, see the LICENSE.txt file            #
+# For further information please visit http://www.flapw.de or                 #
+###############################################################################
+"""
+Tests of splitting the k points of a JOB into chunks.
+"""
+import numpy as np
+
+from aiida_spex.tools.add_results import merge_add_results, renumber_kpoints
+from aiida_spex.tools.geometry import internal_to_cartesian, reciprocal_lattice
+from aiida_spex.tools.kpoint_chunks import split_kpoints, splits_kptpath
+
+# fcc Si, a = 5.43 Angstrom
+SI_CELL = [[0.0, 2.715, 2.715], [2.715, 0.0, 2.715], [2.715, 2.715, 0.0]]
+KPT = {"L": [0.5, 0.5, 0.5], "X": [0.0, 0.5, 0.5], "W": [0.25, 0.75, 0.5]}
+PARAMETERS = {
+    "KPT": KPT,
+    "KPTPATH": {"path": ["L", "1", "X", "W"], "npoints": 60},
+    "JOB": {"GW": {"+": [[1, 8]], "1": [[1, 8]]}},
+}
+
+
+def test_split_by_reciprocal_length():
+    """the points follow the cartesian length of the sub-paths"""
+    chunks = split_kpoints(PARAMETERS, 2, lattice=SI_CELL)
+    paths = [chunk["KPTPATH"]["path"] for chunk in chunks]
+    assert paths == [["L", "1"], ["1", "X", "W"]]
+    assert splits_kptpath(PARAMETERS)
+
+    points = [(0.5, 0.5, 0.5), (0, 0, 0), (0, 0.5, 0.5), (0.25, 0.75, 0.5)]
+    cartesian = internal_to_cartesian(points, reciprocal_lattice(SI_CELL))
+    lengths = np.linalg.norm(np.diff(cartesian, axis=0), axis=1)
+    # L-Gamma is shorter than Gamma-X-W, the shared Gamma point counts twice
+    npoints = [chunk["KPTPATH"]["npoints"] for chunk in chunks]
+    assert sum(npoints) == 61
+    assert npoints[0] == round(61 * lengths[0] / lengths.sum())
+    assert chunks[0]["KPT"] == KPT and chunks[1]["KPT"] == KPT
+    assert chunks[0]["JOB"] == PARAMETERS["JOB"]
+    assert chunks[1]["JOB"] == {"GW": {"+": [[1, 8]]}}
+
+
+def test_split_without_lattice():
+    """without the lattice every segment counts the same"""
+    chunks = split_kpoints(PARAMETERS, 3)
+    assert [chunk["KPTPATH"] for chunk in chunks] == [
+        {"path": ["L", "1"], "npoints": 21},
+        {"path": ["1", "X"], "npoints": 21},
+        {"path": ["X", "W"], "npoints": 20},
+    ]
+
+
+def test_renumber_shared_kpoints():
+    """the shared end points are kept once and numbered along the path"""
+    results = [
+        {"real": {"kpoint": [1, 1, 2, 2, 3, 3], "band": [1, 2] * 3}},
+        {"real": {"kpoint": [1, 1, 2, 2], "band": [1, 2] * 2}},
+    ]
+    renumber_kpoints(results, shared_boundaries=True)
+    merged = merge_add_results(results)
+    assert merged["real"]["kpoint"] == [1, 1, 2, 2, 3, 3, 4, 4]
+    assert merged["real"]["chunk"] == [0] * 6 + [1] * 2
+
+    results = [{"real": {"kpoint": [1, 2]}}, {"real": {"kpoint": [1, 2]}}]
+    renumber_kpoints(results)
+    assert merge_add_results(results)["real"]["kpoint"] == [1, 2, 3, 4]
+
+
+def test_split_without_coordinates():
+    """without the coordinates every segment counts the same"""
+    parameters = {
+        "KPTPATH": {"path": ["A", "B", "C", "D"], "npoints": 10},
+        "JOB": {"GW": {"+": [[1, 2]]}},
+    }
+    chunks = split_kpoints(parameters, 2)
+    assert [chunk["KPTPATH"] for chunk in chunks] == [
+        {"path": ["A", "B", "C"], "npoints": 7},
+        {"path": ["C", "D"], "npoints": 4},
+    ]
+
+
+def test_split_labels():
+    """the k-point labels of a JOB without KPTPATH are split evenly"""
+    parameters = {"JOB": {"GW": {"1": [[4, 12]], "R": [[4, 12]], "X": [[4, 12]]}}}
+    chunks = split_kpoints(parameters, 2)
+    assert [list(chunk["JOB"]["GW"]) for chunk in chunks] == [["1", "R"], ["X"]]
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# Copyright (c), Forschungszentrum Jülich GmbH, IAS-1/PGI-1, Germany.         #
+#                All rights reserved.                                         #
+# This file is part of the AiiDA-SPEX package.                               #
+#                                                                             #
+# The code is hosted on GitHub at https://github.com/JuDFTteam/aiida-spex     #
+# For further information on the license, see the LICENSE.txt file            #
+# For further information please visit http://www.flapw.de or                 #
+###############################################################################
+"""
+Tests of the registry of the additional parsers.
+"""
+from aiida_spex.tools.parser_registry import (
+    get_parser_files,
+    get_parser_names,
+    run_parser,
+)
+
+
+def test_builtin_parsers():
+    """all parsers of aiida-spex are available with their files"""
+    names = get_parser_names()
+    for name in ["project", "gw", "ks", "dos", "dielec", "plussoc"]:
+        assert name in names
+    assert get_parser_files("dos") == ["spex.dos"]
+    assert get_parser_files("dielec") == ["dielecR", "dielec"]
+
+
+def test_dos_parser_is_a_no_op():
+    """spex.dos is retrieved, the parser returns an empty dictionary"""
+    assert run_parser("dos", ["# dos\n0.0 1.0\n"], {}) == {}
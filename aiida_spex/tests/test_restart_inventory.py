@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# Copyright (c), Forschungszentrum Jülich GmbH, IAS-1/PGI-1, Germany.         #
+#                All rights reserved.                                         #
+# This file is part of the AiiDA-SPEX package.                               #
+#                                                                             #
+# The code is hosted on GitHub at https://github.com/JuDFTteam/aiida-spex     #
+# For further information on the license, see the LICENSE.txt file            #
+# For further information please visit http://www.flapw.de or                 #
+###############################################################################
+"""
+Tests of the inventory of the RESTART files.
+"""
+import hashlib
+import re
+import shutil
+import subprocess
+
+import pytest
+
+from aiida_spex.tools.restart_inventory import (
+    file_fingerprint,
+    inventory_script,
+    parse_inventory,
+    restart_parameters,
+    select_restart_files,
+)
+
+PATTERN = re.compile("spex.sigc|spex.sigc.[0-9]+|spex.wcou|spex.cor")
+DEPENDENCIES = {
+    "spex.sigc": ["BZ", "NBAND", "JOB"],
+    "spex.wcou": ["BZ", "NBAND"],
+}
+SHA = "ab" * 32
+
+
+def test_parse_inventory():
+    """both inventory formats, other files and broken lines are skipped"""
+    content = (
+        "1024 mtime:1700000000  spex.sigc.2\n"
+        f"2048 {SHA}  spex.wcou\n"
+        f"512 {SHA} *spex.cor\n"
+        "100 mtime:1700000000  spex.out\n"
+        "garbage\n"
+        "\n"
+    )
+    inventory = parse_inventory(content, PATTERN)
+    assert inventory == {
+        "spex.sigc.2": {"size": 1024, "mtime": 1700000000},
+        "spex.wcou": {"size": 2048, "sha256": SHA},
+        "spex.cor": {"size": 512, "sha256": SHA},
+    }
+    assert file_fingerprint(inventory["spex.wcou"]) == SHA
+    assert file_fingerprint(inventory["spex.sigc.2"]) == "size:1024 mtime:1700000000"
+
+
+@pytest.mark.skipif(shutil.which("bash") is None, reason="needs bash")
+@pytest.mark.parametrize("checksum", [False, True])
+def test_inventory_script(tmp_path, checksum):
+    """the inventory written by the shell snippet is read back"""
+    (tmp_path / "spex.sigc.1").write_bytes(b"sigc")
+    (tmp_path / "spex.wcou").write_bytes(b"wcou data")
+    (tmp_path / "spex.out").write_bytes(b"out")
+    script = inventory_script(["spex.sigc*", "spex.wcou", "spex.cor"], "inv", checksum)
+    subprocess.run(["bash", "-c", script], cwd=tmp_path, check=True)
+    inventory = parse_inventory((tmp_path / "inv").read_text(), PATTERN)
+    assert sorted(inventory) == ["spex.sigc.1", "spex.wcou"]
+    assert inventory["spex.wcou"]["size"] == 9
+    if checksum:
+        expected = hashlib.sha256(b"wcou data").hexdigest()
+        assert inventory["spex.wcou"]["sha256"] == expected
+    else:
+        mtime = int((tmp_path / "spex.wcou").stat().st_mtime)
+        assert inventory["spex.wcou"]["mtime"] == mtime
+
+
+def test_select_restart_files():
+    """only files whose parameters did not change are reused"""
+    old = {"bz": [4, 4, 4], "NBAND": 80, "JOB": {"GW": {"1": [[1, 8]]}}}
+    inventory = {
+        filename: {"parameters": restart_parameters(old, DEPENDENCIES.get(family, []))}
+        for filename, family in [
+            ("spex.sigc.1", "spex.sigc"),
+            ("spex.wcou", "spex.wcou"),
+            ("spex.cor", "spex.cor"),
+        ]
+    }
+    assert inventory["spex.wcou"]["parameters"] == {"BZ": [4, 4, 4], "NBAND": 80}
+
+    # only the JOB changed: the screened interaction is reused, sigma is not
+    new = dict(old, JOB={"GW": {"X": [[1, 8]]}})
+    reusable, stale = select_restart_files(inventory, new, DEPENDENCIES)
+    assert reusable == ["spex.wcou", "spex.cor"]
+    assert stale == ["spex.sigc.1"]
+
+    # more bands: everything depending on NBAND is stale
+    new = dict(old, NBAND=120)
+    reusable, stale = select_restart_files(inventory, new, DEPENDENCIES)
+    assert reusable == ["spex.cor"]
+    assert stale == ["spex.sigc.1", "spex.wcou"]
+
+    # files without recorded parameters are not reused
+    reusable, stale = select_restart_files({"spex.wcou": {}}, old, DEPENDENCIES)
+    assert reusable == [] and stale == ["spex.wcou"]
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# Copyright (c), Forschungszentrum Jülich GmbH, IAS-1/PGI-1, Germany.         #
+#                All rights reserved.                                         #
+# This file is part of the AiiDA-SPEX package.                               #
+#                                                                             #
+# The code is hosted on GitHub at https://github.com/JuDFTteam/aiida-spex     #
+# For further information on the license, see the LICENSE.txt file            #
+# For further information please visit http://www.flapw.de or                 #
+###############################################################################
+"""
+Tests of the readers of SPEX output files.
+"""
+import os
+
+import numpy as np
+import pytest
+
+from aiida_spex.tools.spex_io import (
+    get_basic_info,
+    get_out_info,
+    get_run_info,
+    get_unitcell_info,
+    read_dielec,
+    spexout_parser,
+)
+
+SPEX_OUT = os.path.join(os.path.dirname(__file__), "files", "spex_gw.out")
+
+
+def regex_parser(content):
+    """The regex based parser, one full-text sweep per field."""
+    return {
+        **get_run_info(content),
+        **get_basic_info(content),
+        **get_unitcell_info(content),
+        **get_out_info(content),
+    }
+
+
+def assert_same(result, reference):
+    """Both parsers return the same dictionary, in the same order."""
+    assert list(result) == list(reference)
+    for key, val in reference.items():
+        if isinstance(val, np.ndarray):
+            np.testing.assert_array_equal(result[key], val, err_msg=key)
+        else:
+            assert result[key] == val, key
+
+
+@pytest.fixture(name="content")
+def fixture_content():
+    with open(SPEX_OUT, encoding="utf-8") as handle:
+        return handle.read()
+
+
+def test_scan_spexout_matches_regex_parser(content):
+    """the single pass scanner reads the same fields as the regex functions"""
+    result = spexout_parser(content)
+    assert_same(result, regex_parser(content))
+    assert result["number_of_k_points"] == 2
+    np.testing.assert_array_equal(result["fermi_energy"], [0.18463, 0.19012])
+
+
+def test_scan_spexout_streamed(content):
+    """an open file is read line by line with the same result"""
+    with open(SPEX_OUT, encoding="utf-8") as handle:
+        assert_same(spexout_parser(handle), regex_parser(content))
+
+
+def test_scan_spexout_without_optional_fields(content):
+    """energy gap and maximal energy are only there if SPEX writes them"""
+    content = "".join(
+        line
+        for line in content.splitlines(keepends=True)
+        if "Energy gap" not in line and "Maximal energy" not in line
+    )
+    result = spexout_parser(content)
+    assert_same(result, regex_parser(content))
+    assert "energy_gap" not in result and "maximal_energy" not in result
+
+
+def test_scan_spexout_missing_field(content):
+    """a missing mandatory field is an error"""
+    content = content.replace("Number of spins", "Number of spin channels")
+    with pytest.raises(ValueError, match="spins"):
+        spexout_parser(content)
+
+
+DIELEC = """\
+# Dielectric function
+# lattvec: 0 0 0
+# k point: 0.0 0.0 0.0
+# k index: 1
+# spin: 1
+  0.0000  1.5  0.0
+  0.1000  1.6  0.1
+  0.2000  1.7  0.2
+
+# k point: 0.5 0.0 0.0
+# k index: 2
+# spin: 1
+  0.0000  2.5
+  0.1000  2.6
+"""
+
+
+@pytest.mark.parametrize("as_file", [False, True])
+def test_read_dielec_ragged_blocks(tmp_path, as_file):
+    """shorter and narrower blocks are padded with NaN"""
+    if as_file:
+        # files on disk are memory-mapped
+        path = tmp_path / "dielec"
+        path.write_text(DIELEC)
+        with open(path, "rb") as handle:
+            spectra = read_dielec(handle)
+    else:
+        spectra = read_dielec(DIELEC)
+    assert spectra["n_frequencies"].tolist() == [3, 2]
+    assert spectra["n_columns"].tolist() == [3, 2]
+    np.testing.assert_array_equal(
+        spectra["frequency"], [[0.0, 0.1, 0.2], [0.0, 0.1, np.nan]]
+    )
+    assert spectra["spectrum"].shape == (2, 3, 2)
+    np.testing.assert_array_equal(spectra["spectrum"][1, :2, 0], [2.5, 2.6])
+    assert np.isnan(spectra["spectrum"][1, :, 1]).all()
+    assert np.isnan(spectra["spectrum"][1, 2]).all()
+    assert spectra["blocks"][0] == {
+        "lattvec": "0 0 0",
+        "kpoint": "0.0 0.0 0.0",
+        "kindex": "1",
+        "spin": "1",
+    }
+    assert spectra["blocks"][1]["kindex"] == "2"
+
+
+def test_read_dielec_empty():
+    """a file without numbers gives empty arrays"""
+    spectra = read_dielec("# Dielectric function\n")
+    assert spectra["frequency"].shape == (0, 0)
+    assert spectra["blocks"] == []
+
+
+@pytest.mark.parametrize(
+    "rows",
+    [
+        "  0.0  1.5  0.0\n  0.1  1.6\n",
+        "  0.0  1.5  0.0\n  0.1  x  0.1\n  0.2  1.7  0.2\n",
+        "  0.0  1.5  0.0\n  0.1  1.6  0.1\n  0.2  1.7  nope\n",
+    ],
+)
+def test_read_dielec_malformed(rows):
+    """rows with missing columns or text are errors"""
+    with pytest.raises(ValueError, match="Malformed block 1"):
+        read_dielec("# k index: 1\n" + rows)
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# Copyright (c), Forschungszentrum Jülich GmbH, IAS-1/PGI-1, Germany.         #
+#                All rights reserved.                                         #
+# This file is part of the AiiDA-SPEX package.                               #
+#                                                                             #
+# The code is hosted on GitHub at https://github.com/JuDFTteam/aiida-spex     #
+# For further information on the license, see the LICENSE.txt file            #
+# For further information please visit http://www.flapw.de or                 #
+###############################################################################
+"""
+Tests of reading spex.inp files back into parameters.
+"""
+import io
+
+import pytest
+
+from aiida_spex.tools.spexinp_utils import (
+    canonical_hash,
+    canonical_parameters,
+    dump_energy_inp,
+    make_energy_inp,
+    make_spex_inp,
+    parse_spex_inp,
+)
+from aiida_spex.tools.spexinp_validator import validate_parameters
+
+PARAMETERS = {
+    "BZ": [4, 4, 4],
+    "NBAND": 80,
+    "GAUSS": [0.01, 0.02],
+    "KPT": {"R": [0.5, 0.5, 0.5], "X": [0.0, 0.5, 0.5]},
+    "JOB": {"GW": {"1": [[4, 12]], "X": [[4, 12]]}},
+    "MBASIS": {"GCUT": "2.9"},
+    "WRITE": None,
+}
+
+
+def test_round_trip():
+    """parameters -> spex.inp -> parameters keeps the file, validity and hash"""
+    content = make_spex_inp(PARAMETERS)
+    parameters = parse_spex_inp(content)
+    assert parameters["GAUSS"] == [0.01, 0.02]
+    assert parameters["BZ"] == [4, 4, 4]
+    assert validate_parameters(parameters) == []
+    assert canonical_hash(parameters) == canonical_hash(PARAMETERS)
+    assert make_spex_inp(parameters) == content
+
+
+def test_list_keyword_of_integers():
+    """integer GAUSS values are read as floats, as the validator expects"""
+    parameters = parse_spex_inp("BZ 2 2 2\nGAUSS 1\n")
+    assert parameters["GAUSS"] == [1.0]
+    assert validate_parameters(parameters) == []
+
+
+def test_invalid_list_keyword_is_kept_verbatim():
+    """values which are not of the type of the keyword go to CUSTOM"""
+    parameters = parse_spex_inp("BZ 2 2 2\nGAUSS small\n")
+    assert "GAUSS" not in parameters
+    assert parameters["CUSTOM"] == "GAUSS small"
+
+
+def test_canonical_parameters_of_equivalent_inputs():
+    """keyword case, key order and band ranges do not change the canonical form"""
+    other = {
+        "job": {"gw": {"X": [[8, 12], [4, 7]], "1": [[4, 12]]}},
+        "mbasis": {"gcut": " 2.9"},
+        "Write": None,
+        "kpt": {"X": [0.0, 0.5, 0.5], "R": [0.5, 0.5, 0.5]},
+        "nband": 80,
+        "gauss": [0.01, 0.02],
+        "bz": [4, 4, 4],
+    }
+    canonical = canonical_parameters(PARAMETERS)
+    assert canonical_parameters(other) == canonical
+    assert canonical["JOB"] == {"GW": {"1": [[4, 12]], "X": [[4, 12]]}}
+    # the canonical form is a valid input writing the same jobs
+    assert validate_parameters(canonical) == []
+    assert "JOB GW 1:(4-12) X:(4-12)" in make_spex_inp(canonical)
+    assert canonical_parameters(canonical) == canonical
+
+
+def _body(content):
+    """spex.inp without the header line with the aiida-spex version"""
+    return content.split("\n", 1)[1]
+
+
+def test_job_spectra_are_separated():
+    """every k point of a spectrum gets its own word on the JOB line"""
+    content = make_spex_inp(
+        {
+            "BZ": [2, 2, 2],
+            "JOB": {
+                "DIELEC": {
+                    "1": {"range": [0, 1], "step": 0.01},
+                    "X": {"range": [0, 1], "step": 0.01},
+                }
+            },
+        }
+    )
+    # written as "1:{0:1,0.01}X:{0:1,0.01}" before
+    assert _body(content) == "BZ 2 2 2\nJOB DIELEC 1:{0:1,0.01} X:{0:1,0.01} \n"
+
+
+def test_job_keeps_all_band_ranges():
+    """all band ranges of a k point are written, not only the last one"""
+    content = make_spex_inp({"BZ": [2, 2, 2], "JOB": {"GW": {"1": [[1, 4], [6, 8]]}}})
+    # written as "1:(6-8)" before
+    assert _body(content) == "BZ 2 2 2\nJOB GW 1:(1-4,6-8) \n"
+    assert parse_spex_inp(content)["JOB"] == {"GW": {"1": [[1, 4], [6, 8]]}}
+
+
+def test_kptpath_as_list():
+    """a KPTPATH given as list of labels is written, it was dropped before"""
+    content = make_spex_inp({"BZ": [2, 2, 2], "KPTPATH": ["L", "1", "X"]})
+    assert _body(content) == "BZ 2 2 2\nKPTPATH (L,1,X) \n"
+    content = make_spex_inp(
+        {"BZ": [2, 2, 2], "KPTPATH": {"path": ["L", "1", "X"], "npoints": 50}}
+    )
+    assert _body(content) == "BZ 2 2 2\nKPTPATH (L,1,X) 50\n"
+
+
+ENERGIES = {
+    "results": {
+        "real": {
+            "Bd": [1, 2, 3, 1, 2, 3, 1],
+            "kpoint": [1, 1, 1, 2, 2, 2, 10],
+            "spin": [1, 1, 1, 1, 1, 1, 2],
+            "KS": [-5.1, 0.25, 3.123456, -4.9, 0.5, 3.2, 1.0],
+            "GW": [-5.3, 0.15, 3.5, -5.0, 0.4, 3.654321, -12.0],
+        }
+    }
+}
+
+
+@pytest.mark.parametrize("with_e", ["GW", "KS"])
+def test_energy_inp(with_e):
+    """the column-wise writer gives the rows of the former row by row writer"""
+    real = ENERGIES["results"]["real"]
+    expected = "".join(
+        f"  {band:d} {kpoint:2d} {spin:d} {energy:9.5f}\n"
+        for band, kpoint, spin, energy in zip(
+            real["Bd"], real["kpoint"], real["spin"], real[with_e]
+        )
+    )
+    content = make_energy_inp(ENERGIES, with_e=with_e)
+    header, rows = content.split("#  n  k s    Energy\n")
+    assert header.startswith("# ENERGY input file generated by aiida-spex")
+    assert rows == expected
+
+    # written in chunks straight into a file
+    handle = io.StringIO()
+    dump_energy_inp(ENERGIES, handle, with_e=with_e, chunk_size=3)
+    assert handle.getvalue() == content
+
+
+def test_energy_inp_errors():
+    """missing results or energies and columns of different lengths are errors"""
+    with pytest.raises(ValueError, match="results not found"):
+        make_energy_inp({})
+    with pytest.raises(ValueError, match="No Energy_real part"):
+        make_energy_inp({"results": {"imag": {}}})
+    with pytest.raises(ValueError, match="HF is not in the parsed output file"):
+        make_energy_inp(ENERGIES, with_e="HF")
+    real = dict(ENERGIES["results"]["real"], GW=[-5.3, 0.15])
+    with pytest.raises(ValueError, match="different lengths"):
+        make_energy_inp({"results": {"real": real}})
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# Copyright (c), Forschungszentrum Jülich GmbH, IAS-1/PGI-1, Germany.         #
+#                All rights reserved.                                         #
+# This file is part of the AiiDA-SPEX package.                               #
+#                                                                             #
+# The code is hosted on GitHub at https://github.com/JuDFTteam/aiida-spex     #
+# For further information on the license, see the LICENSE.txt file            #
+# For further information please visit http://www.flapw.de or                 #
+###############################################################################
+"""
+Tests of the validation of the spex.inp parameters.
+"""
+import pytest
+
+from aiida_spex.tools import spexinp_validator
+from aiida_spex.tools.spexinp_validator import (
+    validate_parameters,
+    validate_parameters_batch,
+)
+
+PARAMETERS = {
+    "BZ": [4, 4, 4],
+    "NBAND": 80,
+    "GAUSS": [0.01],
+    "KPTPATH": {"path": ["L", "1", "X"], "npoints": 50},
+    "JOB": {"GW": {"1": [[4, 12]]}},
+    "MBASIS": {"GCUT": "2.9"},
+    "WRITE": None,
+}
+
+
+def test_valid_parameters():
+    """valid parameters have no errors, keywords are case insensitive"""
+    assert validate_parameters(PARAMETERS) == []
+    assert validate_parameters({"bz": [2, 2, 2], "mbasis": {"gcut": "2.9"}}) == []
+
+
+def test_unknown_keywords():
+    """unknown keywords, also inside a section, are reported"""
+    parameters = dict(PARAMETERS, NOPE=1, MBASIS={"GCUT": "2.9", "WRONG": "1"})
+    assert sorted(validate_parameters(parameters)) == [
+        "'NOPE' not a valid keyword",
+        "'WRONG' is not a valid keyword for the section MBASIS",
+    ]
+
+
+def test_missing_and_empty_keywords():
+    """BZ is necessary, KPT and the sections can not be empty"""
+    assert validate_parameters({}) == ["No parameters provided"]
+    assert validate_parameters({"NBAND": 10, "KPT": {}}) == [
+        "'BZ' is necessary",
+        "KPT cannot be empty",
+    ]
+
+
+@pytest.mark.parametrize(
+    "key, value, expected",
+    [
+        ("BZ", [4.0, 4, 4], "a list of integers"),
+        ("BZ", [True, 4, 4], "a list of integers"),
+        ("GAUSS", [1], "a list of floats"),
+        ("GAUSS", "0.01", "a list of floats"),
+        ("WRITE", "yes", "empty (None)"),
+        ("NBAND", [80], "a number or string"),
+        ("KPTPATH", {"npoints": 50}, "a list of strings or a dict with the 'path'"),
+        ("KPT", {"X": [0, "0.5", 0.5]}, "a dict of lists of numbers"),
+        ("MBASIS", "GCUT 2.9", "a dict"),
+    ],
+)
+def test_wrong_types(key, value, expected):
+    """values of the wrong type are reported, unless types are not checked"""
+    parameters = dict(PARAMETERS, **{key: value})
+    assert validate_parameters(parameters) == [
+        f"{key} must be {expected}, got {value!r}"
+    ]
+    if key != "MBASIS":
+        assert validate_parameters(parameters, check_types=False) == []
+
+
+def test_batch_validates_duplicates_once(monkeypatch):
+    """parameters with the same canonical hash are validated once"""
+    calls = []
+    validate = spexinp_validator._validate  # pylint: disable=protected-access
+
+    def _counting_validate(parameters, check_types):
+        calls.append(parameters)
+        return validate(parameters, check_types)
+
+    monkeypatch.setattr(spexinp_validator, "_validate", _counting_validate)
+    monkeypatch.setattr(spexinp_validator, "_VALIDATION_CACHE", {})
+    same = {key.lower(): val for key, val in PARAMETERS.items()}
+    wrong = dict(PARAMETERS, GAUSS="0.01")
+    errors = validate_parameters_batch([PARAMETERS, same, wrong, PARAMETERS, {}])
+    assert errors[:2] == [[], []] and errors[3] == []
+    assert errors[2] == ["GAUSS must be a list of floats, got '0.01'"]
+    assert errors[4] == ["No parameters provided"]
+    assert len(calls) == 3
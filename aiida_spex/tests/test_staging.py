@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# Copyright (c), Forschungszentrum Jülich GmbH, IAS-1/PGI-1, Germany.         #
+#                All rights reserved.                                         #
+# This file is part of the AiiDA-SPEX package.                               #
+#                                                                             #
+# The code is hosted on GitHub at https://github.com/JuDFTteam/aiida-spex     #
+# For further information on the license, see the LICENSE.txt file            #
+# For further information please visit http://www.flapw.de or                 #
+###############################################################################
+"""
+Tests of the staging of the files of a parent calculation. The remote
+computer is the local one, the commands run with bash.
+"""
+import os
+import shutil
+import subprocess
+import time
+
+import pytest
+from aiida.common.exceptions import InputValidationError
+
+from aiida_spex.tools import staging
+
+needs_bash = pytest.mark.skipif(
+    shutil.which("bash") is None or shutil.which("flock") is None,
+    reason="needs bash and flock",
+)
+
+
+class LocalTransport:
+    """The part of an aiida transport used by the staging, on this computer."""
+
+    def __init__(self):
+        self.cwd = os.getcwd()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def chdir(self, path):
+        self.cwd = path
+
+    def exec_command_wait(self, command):
+        result = subprocess.run(
+            ["bash", "-c", command],
+            cwd=self.cwd,
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        return result.returncode, result.stdout, result.stderr
+
+    def getfile(self, remote_path, local_path):
+        shutil.copyfile(remote_path, local_path)
+
+    def remove(self, path):
+        os.remove(path)
+
+
+class LocalFolder:
+    """A RemoteData of a folder on this computer."""
+
+    def __init__(self, path):
+        self.path = str(path)
+
+    def get_authinfo(self):
+        return self
+
+    def get_transport(self):
+        return LocalTransport()
+
+    def get_remote_path(self):
+        return self.path
+
+
+def _archive(cache_dir, name, size, last_use):
+    path = os.path.join(cache_dir, name)
+    with open(path, "wb") as handle:
+        handle.write(b"x" * size)
+    os.utime(path, (last_use, last_use))
+    return path
+
+
+def test_prune_cache_least_recently_used(tmp_path):
+    """the oldest archives go first, kept archives and fresh downloads stay"""
+    now = time.time()
+    archives = [_archive(tmp_path, f"{i}.tar.gz", 100, now - 100 + i) for i in range(5)]
+    abandoned = _archive(tmp_path, "old.tar.gz.part", 1, now - 2 * 24 * 3600)
+    running = _archive(tmp_path, "new.tar.gz.part", 1, now)
+    other = _archive(tmp_path, "notes.txt", 1000, 0)
+
+    # the kept archive counts, the next oldest ones are removed instead
+    removed = staging.prune_cache(tmp_path, max_bytes=250, keep=[archives[0]])
+    assert sorted(removed) == sorted([abandoned] + archives[1:4])
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        ["0.tar.gz", "4.tar.gz", "new.tar.gz.part", "notes.txt"]
+    )
+
+    assert staging.prune_cache(tmp_path, max_bytes=1000) == []
+    removed = staging.prune_cache(tmp_path, max_bytes=0)
+    assert sorted(removed) == sorted([archives[0], archives[4]])
+    assert os.path.isfile(running) and os.path.isfile(other)
+    assert staging.prune_cache(tmp_path / "missing", max_bytes=0) == []
+
+
+@needs_bash
+def test_fetch_parent_files_cache(tmp_path):
+    """the archive is fetched once, a cache hit makes it the most recent one"""
+    parent = tmp_path / "parent"
+    parent.mkdir()
+    (parent / "inp.xml").write_text("<fleurInput/>")
+    (parent / "cdn1").write_text("density")
+    cache_dir = str(tmp_path / "cache")
+    os.makedirs(cache_dir)
+    old = _archive(cache_dir, "old.tar.gz", 10**6, time.time() - 1000)
+
+    archive, packed = staging.fetch_parent_files(
+        LocalFolder(parent), ["inp.xml", "cdn*", "missing"], cache_dir, max_bytes=10**6
+    )
+    assert packed == ["cdn1", "inp.xml"]
+    # the new archive is kept, the old one is evicted
+    assert sorted(os.listdir(cache_dir)) == [os.path.basename(archive)]
+    assert not os.path.exists(old)
+
+    os.utime(archive, (0, 0))
+    again, _ = staging.fetch_parent_files(
+        LocalFolder(parent), ["inp.xml", "cdn*"], cache_dir
+    )
+    assert again == archive
+    assert os.stat(archive).st_mtime > time.time() - 60
+
+    unpacked = tmp_path / "unpacked"
+    unpacked.mkdir()
+    subprocess.run(["tar", "-xzf", archive], cwd=unpacked, check=True)
+    assert (unpacked / "cdn1").read_text() == "density"
+
+
+def _job(tmp_path, ref, staging_dir):
+    """Working directory of a job linking the shared staging directory."""
+    workdir = tmp_path / ref
+    workdir.mkdir()
+    (workdir / staging.SHARED_STAGING_MARKER).write_text(staging_dir)
+    return LocalFolder(workdir)
+
+
+@needs_bash
+def test_shared_staging_references(tmp_path):
+    """the directory is filled once and removed with its last reference"""
+    parent = tmp_path / "parent"
+    parent.mkdir()
+    (parent / "inp.xml").write_text("<fleurInput/>")
+    (parent / "eig.hdf").write_text("eig")
+    root = str(tmp_path / "staging")
+
+    jobs = []
+    for ref in ["job1", "job2"]:
+        staging_dir, staged = staging.fill_shared_staging(
+            LocalFolder(parent), ["*.xml", "*.hdf"], "KEY", ref, root=root
+        )
+        jobs.append(_job(tmp_path, ref, staging_dir))
+        assert staged == ["eig.hdf", "inp.xml"]
+    assert sorted(os.listdir(os.path.join(staging_dir, ".refs"))) == ["job1", "job2"]
+
+    # a later fill does not copy again, even if the parent is gone
+    (parent / "inp.xml").unlink()
+    staging.fill_shared_staging(
+        LocalFolder(parent), ["*.xml"], "KEY", "job3", root=root
+    )
+    assert (tmp_path / "staging" / "KEY" / "inp.xml").read_text() == "<fleurInput/>"
+    jobs.append(_job(tmp_path, "job3", staging_dir))
+
+    assert not staging.release_shared_staging(jobs[0], "job1")
+    assert not staging.release_shared_staging(jobs[0], "job1")
+    assert not staging.release_shared_staging(jobs[2], "job3")
+    assert os.path.isdir(staging_dir)
+    assert staging.release_shared_staging(jobs[1], "job2")
+    assert not os.path.exists(staging_dir)
+    # the lock file stays next to the removed directory
+    assert os.listdir(root) == [".KEY.lock"]
+
+
+@needs_bash
+def test_shared_staging_errors(tmp_path):
+    """a missing parent folder fails, a job without marker releases nothing"""
+    with pytest.raises(InputValidationError, match="staging directory failed"):
+        staging.fill_shared_staging(
+            LocalFolder(tmp_path / "gone"),
+            ["*.xml"],
+            "KEY",
+            "job1",
+            root=str(tmp_path / "staging"),
+        )
+    assert not os.path.exists(tmp_path / "staging" / "KEY")
+    assert not staging.release_shared_staging(LocalFolder(tmp_path), "job1")
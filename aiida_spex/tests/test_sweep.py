@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# Copyright (c), Forschungszentrum Jülich GmbH, IAS-1/PGI-1, Germany.         #
+#                All rights reserved.                                         #
+# This file is part of the AiiDA-SPEX package.                               #
+#                                                                             #
+# The code is hosted on GitHub at https://github.com/JuDFTteam/aiida-spex     #
+# For further information on the license, see the LICENSE.txt file            #
+# For further information please visit http://www.flapw.de or                 #
+###############################################################################
+"""
+Tests of the generation and planning of parameter sweeps.
+"""
+import types
+
+import pytest
+
+from aiida_spex.tools import sweep
+from aiida_spex.tools.sweep import plan_sweep, sweep_points
+
+BASE = {
+    "BZ": [2, 2, 2],
+    "NBAND": 100,
+    "JOB": {"GW": {"1": [[1, 5]]}},
+    "MBASIS": {"GCUT": "2.9"},
+}
+
+
+def test_sweep_points_product():
+    """all combinations, in order, keywords matched case insensitive"""
+    axes = {
+        "NBAND": [100, 200],
+        "mbasis/gcut": ["2.9", "3.4"],
+        ("WFPROD", "LCUT"): ["5"],
+    }
+    points = list(sweep_points(BASE, axes))
+    assert [values for values, _ in points] == [
+        {"NBAND": 100, "mbasis/gcut": "2.9", ("WFPROD", "LCUT"): "5"},
+        {"NBAND": 100, "mbasis/gcut": "3.4", ("WFPROD", "LCUT"): "5"},
+        {"NBAND": 200, "mbasis/gcut": "2.9", ("WFPROD", "LCUT"): "5"},
+        {"NBAND": 200, "mbasis/gcut": "3.4", ("WFPROD", "LCUT"): "5"},
+    ]
+    parameters = points[3][1]
+    assert parameters["NBAND"] == 200
+    assert parameters["MBASIS"] == {"GCUT": "3.4"}
+    # missing sections are created with upper case keywords
+    assert parameters["WFPROD"] == {"LCUT": "5"}
+    # the base and the points do not share nested values
+    assert BASE["MBASIS"] == {"GCUT": "2.9"} and "WFPROD" not in BASE
+    assert points[0][1]["MBASIS"] is not points[1][1]["MBASIS"]
+
+
+def test_sweep_points_zip():
+    """the n-th values of all axes go together"""
+    points = list(
+        sweep_points(BASE, {"NBAND": [100, 200], "BZ": [[2, 2, 2], [4, 4, 4]]}, "zip")
+    )
+    assert [(p["NBAND"], p["BZ"]) for _, p in points] == [
+        (100, [2, 2, 2]),
+        (200, [4, 4, 4]),
+    ]
+
+
+def test_sweep_points_errors():
+    """axes of a zip must have the same length, the mode must be known"""
+    with pytest.raises(ValueError, match="same length"):
+        list(sweep_points(BASE, {"NBAND": [100, 200], "BZ": [[2, 2, 2]]}, "zip"))
+    with pytest.raises(ValueError, match="Unknown sweep mode"):
+        list(sweep_points(BASE, {"NBAND": [100]}, "grid"))
+
+
+def test_plan_sweep(monkeypatch):
+    """duplicates, invalid and finished points are not submitted"""
+    queried = []
+
+    def _finished_calculations(hashes, parent_folder=None):
+        queried.append(list(hashes))
+        return {hashes[0]: "uuid-of-finished"}
+
+    monkeypatch.setattr(sweep, "finished_calculations", _finished_calculations)
+    parent = types.SimpleNamespace(uuid="parent")
+    plan = plan_sweep(
+        BASE,
+        {"NBAND": [100, 200, "many", 100, 300], "BZ": [[2, 2, 2]] * 4 + [[2.5, 2, 2]]},
+        mode="zip",
+        parent_folder=parent,
+    )
+    assert [point.values["NBAND"] for point in plan["new"]] == [200, "many"]
+    assert [point.values["NBAND"] for point in plan["duplicate"]] == [100]
+    assert [point.values["NBAND"] for point, _ in plan["finished"]] == [100]
+    assert plan["finished"][0][1] == "uuid-of-finished"
+    ((point, errors),) = plan["invalid"]
+    assert point.values["NBAND"] == 300
+    assert errors == ["BZ must be a list of integers, got [2.5, 2, 2]"]
+    # one query with the valid points only
+    assert len(queried) == 1 and len(queried[0]) == 3
+
+    plan = plan_sweep(BASE, {"NBAND": [100]}, skip_finished=False)
+    assert len(plan["new"]) == 1 and len(queried) == 1
@@ -13,84 +13,290 @@ from aiida.orm import Dict
 from aiida.common.exceptions import NotExistent
 import re
 import numpy as np
-import pandas as pd
-from io import StringIO
-
-# Parser registry defines a parser_name and a file/list of files to be parsed.
-# The parser name is used to identify the parser in the SpecificParser class.
-parser_registry = {
-    "project": ["spex.binfo"],
-    "gw": ["spex.out"],
-    "ks": ["spex.out"],
-    "dos": ["spex.dos"],
-    "dielec": ["dielecR", "dielec"],
-    "plussoc": ["spex.out"],
-}
 
+from aiida_spex.tools import geometry
+from aiida_spex.tools.spex_io import KPointIndex, iter_lines, read_dielec
+from aiida_spex.tools.parser_registry import (
+    _BUILTIN_PARSERS,
+    run_parser,
+    spex_parser,
+)
+
+
+_BINFO_CHANNELS = ["s", "p", "d", "f", "g"]
+_BINFO_KPOINT = re.compile(r"k point \d+: \((.*)\)")
+
+
+def _projection_columns(elements, options):
+    """
+    Columns of spex.binfo (after band and energy) to keep and how to sum them.
 
-def project_parser(parser_name, contents, out_dict=None):
+    :param elements: the element of every atom, in the order of spex.binfo
+    :param options: the project parser options, see `project_parser`
+    :return: (columns, starts, names), the columns are ordered such that the
+        output column i is the sum of columns[starts[i]:starts[i+1]]
+    """
+    atoms = options.get("atoms")
+    channels = options.get("channels", _BINFO_CHANNELS)
+    summation = options.get("sum")
+    for channel in channels:
+        if channel not in _BINFO_CHANNELS:
+            raise ValueError(
+                f"Unknown l channel '{channel}', valid are {_BINFO_CHANNELS}"
+            )
+
+    selected = []
+    for i, element in enumerate(elements):
+        if atoms is None or (i + 1) in atoms or element in atoms:
+            selected.append(i)
+    # atoms of an element which is there more than once are numbered
+    labels = [
+        element if elements.count(element) == 1 else f"{element}{i + 1}"
+        for i, element in enumerate(elements)
+    ]
+
+    def _column(atom, channel):
+        return atom * len(_BINFO_CHANNELS) + _BINFO_CHANNELS.index(channel)
+
+    groups = {}  # output name -> columns
+    for atom in selected:
+        for channel in channels:
+            if summation is None:
+                name = f"{labels[atom]}_{channel}"
+            elif summation == "species":
+                name = f"{elements[atom]}_{channel}"
+            elif summation == "atom":
+                name = labels[atom]
+            elif summation == "channel":
+                name = channel
+            else:
+                raise ValueError(
+                    f"Unknown sum '{summation}', valid are "
+                    "None, 'species', 'atom' and 'channel'"
+                )
+            groups.setdefault(name, []).append(_column(atom, channel))
+
+    columns = np.array(sum(groups.values(), []), dtype=int)
+    starts = np.cumsum([0] + [len(group) for group in groups.values()])[:-1]
+    return columns, starts, list(groups.keys())
+
+
+@spex_parser(files=["spex.binfo"], temporary=True)
+def project_parser(
+    parser_name, contents, out_dict=None, kpoint_index=None, options=None
+):
     """
     Parses the spex.binfo file for a project calculation.
+
+    The file is read in chunks of rows, only the selected projections are kept
+    so the memory is bounded by the chunk size and the size of the result.
+    The `options` (``settings["parser_options"]["project"]``) are:
+
+        * ``atoms``: atom indices (starting at 1) and/or elements to keep
+        * ``channels``: l channels to keep, subset of s, p, d, f, g
+        * ``sum``: sum the kept projections per ``species`` (element and l),
+          per ``atom`` or per l ``channel``
+        * ``chunk_size``: number of rows converted at once (default 10000)
     """
-    return_dict = {}
-    atoms = np.array(out_dict["unitcell_geometry"])[:, 2]
-    content = contents[0]
-    binfo = pd.read_csv(
-        StringIO(content),
-        delim_whitespace=True,
-        comment="#",
-        skip_blank_lines=True,
-        header=None,
-    )
-    binfo.columns = ["band", "energy"] + [
-        f"{i}_{l}"
-        for i, l in [(i, l) for i in atoms for l in ["s", "p", "d", "f", "g"]]
+    options = options or {}
+    elements = [
+        str(element) for element in np.array(out_dict["unitcell_geometry"])[:, 2]
     ]
-    pattern = re.compile(r"k point \d+: \((.*)\)")
-    kpoints = pattern.findall(content)
+    columns, starts, names = _projection_columns(elements, options)
+    chunk_size = options.get("chunk_size", 10000)
+    n_columns = 2 + len(_BINFO_CHANNELS) * len(elements)
+
+    kpoints = []
+    bands, energies, kpoint_numbers, projections = [], [], [], []
+    chunk, chunk_kpoints = [], []
+
+    def _convert_chunk():
+        rows = np.array(" ".join(chunk).split(), dtype=float).reshape(-1, n_columns)
+        bands.append(rows[:, 0].astype(int))
+        energies.append(rows[:, 1])
+        kpoint_numbers.append(np.array(chunk_kpoints, dtype=int))
+        selection = rows[:, 2:][:, columns]
+        if len(columns) and len(starts) < len(columns):
+            selection = np.add.reduceat(selection, starts, axis=1)
+        projections.append(selection)
+        chunk.clear()
+        chunk_kpoints.clear()
+
+    for line in iter_lines(contents[0]):
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if stripped.startswith("#"):
+            if "k point" in line:
+                kpoints.extend(_BINFO_KPOINT.findall(line))
+            continue
+        chunk.append(stripped)
+        chunk_kpoints.append(len(kpoints))
+        if len(chunk) == chunk_size:
+            _convert_chunk()
+    if chunk or not projections:
+        _convert_chunk()
+
+    projections = np.concatenate(projections)
+    results = {
+        "band": np.concatenate(bands).tolist(),
+        "energy": np.concatenate(energies).tolist(),
+        "kpoint": np.concatenate(kpoint_numbers).tolist(),
+    }
+    for i, name in enumerate(names):
+        results[name] = projections[:, i].tolist()
     kpoints = [list(map(float, kpoint.split(","))) for kpoint in kpoints]
 
     return_dict = {
-        "results": binfo.to_dict("list"),
+        "results": results,
         "kpoints": kpoints,
         "parser": parser_name,
     }
+    if kpoints and out_dict.get("reciprocal_vectors") is not None:
+        # distances along the k path and the positions of its labels for fat bands
+        cartesian = geometry.internal_to_cartesian(
+            kpoints, out_dict["reciprocal_vectors"]
+        )
+        return_dict["kpath"] = geometry.kpath_distances(cartesian).tolist()
+        return_dict["kpath_breaks"] = geometry.kpath_breaks(cartesian).tolist()
 
     return return_dict
 
 
-def get_gw_energies(kpt_energies, k_point, out_dict=None):
+_GW_TABLE_HEADER = re.compile(
+    r"\sBd\s+vxc\s+sigmax\s+sigmac\s+Z\s+KS\s+HF\s+GW\s+lin/dir\s\n"
+)
+_KS_TABLE_HEADER = re.compile(r"\sBd\s+vxc\s+KS\n")
+
+
+def read_kpoint_tables(kpoint_index, table_header, k_points):
     """
-    Create a dataframe from the gw energies.
+    Read the table following `table_header` in the K POINT blocks of spex.out.
+
+    :param kpoint_index: a `KPointIndex` of spex.out
+    :param table_header: compiled pattern of the table header line
+    :param k_points: the k points (as in `list_of_k_points`) to read
+    :return: a dictionary with the table (as a string) of each k point
     """
-    df = pd.read_csv(StringIO(kpt_energies), sep="\s+", header=None)
-    diag_r = pd.DataFrame()
-    diag_i = pd.DataFrame()
-    diag_r[
-        ["Bd", "vxc", "sigmax", "sigmac", "Z", "KS", "HF", "GW", "lin/dir"]
-    ] = df.iloc[::2]
-    diag_i[["sigmac", "Z", "GW", "lin/dir"]] = df.iloc[1::2].dropna(axis=1, how="all")
-    diag_i.reset_index(drop=True, inplace=True)
-    diag_r.reset_index(drop=True, inplace=True)
-    diag_r["Bd"] = diag_r["Bd"].astype(int)
-    diag_i["Bd"] = diag_r["Bd"]
-    diag_r["kpoint"] = int(k_point)
-    diag_i["kpoint"] = int(k_point)
-    if int(out_dict["number_of_spins"]) == 2:
-        spins = np.ones(diag_r.shape[0], dtype=int)
-        spins[1::2] += 1
-        diag_r["spin"] = spins
-        diag_i["spin"] = spins
+    tables = kpoint_index.tables(k_points, table_header)
+    missing = [k_point for k_point in k_points if k_point not in tables]
+    if missing:
+        raise ValueError(
+            "Could not find the energies of the k point(s) {} in the output file.".format(
+                ", ".join(missing)
+            )
+        )
+    return tables
+
+
+# Columns of the DIAGONAL ELEMENTS tables. Every band has a row with the real
+# parts followed by a row with the imaginary parts (only used for GW).
+GW_REAL_FIELDS = ["Bd", "vxc", "sigmax", "sigmac", "Z", "KS", "HF", "GW", "lin/dir"]
+GW_IMAG_FIELDS = ["sigmac", "Z", "GW", "lin/dir"]
+KS_REAL_FIELDS = ["Bd", "vxc", "KS"]
+
+
+def _decode_rows(rows, fields):
+    """
+    Convert the text rows of a table into a (rows, fields) float array at once.
+    """
+    values = np.array(" ".join(rows).split(), dtype=float)
+    if values.size != len(rows) * len(fields):
+        raise ValueError(
+            "Unexpected number of columns in the table, expected {}".format(fields)
+        )
+    return values.reshape(len(rows), len(fields))
+
+
+def _structured(columns, fields, bands, kpoint, spin):
+    """
+    Fill a structured array with the given columns, the band, k point and spin.
+    """
+    names = [name for name in fields if name != "Bd"]
+    dtype = [(name, np.float64) for name in names]
+    if "Bd" in fields:
+        dtype.insert(0, ("Bd", np.int64))
     else:
-        diag_r["spin"] = 1
-        diag_i["spin"] = 1
+        dtype.append(("Bd", np.int64))
+    dtype += [("kpoint", np.int64), ("spin", np.int64)]
+
+    array = np.empty(len(kpoint), dtype=dtype)
+    for i, name in enumerate(fields):
+        if name != "Bd":
+            array[name] = columns[:, i]
+    array["Bd"] = bands
+    array["kpoint"] = kpoint
+    array["spin"] = spin
+    return array
+
+
+def decode_diagonal_tables(
+    tables, k_points, number_of_spins, real_fields, imag_fields=None
+):
+    """
+    Decode the DIAGONAL ELEMENTS tables of all k points in one batched operation.
+
+    The rows of all tables are converted at once into contiguous structured
+    arrays, one row per band (and spin) with the fields of the table plus
+    `kpoint` and `spin`. With two spins the rows of a table alternate between
+    spin up and down.
+
+    :param tables: a dictionary with the table rows (as a string) of each k point
+    :param k_points: the k points to decode, in the order of the result
+    :param number_of_spins: number of spins of the calculation
+    :param real_fields: the columns of the rows with the real parts
+    :param imag_fields: the columns of the rows with the imaginary parts,
+        if given these rows are returned as a second array aligned with the first
+    :return: the real array, or a tuple (real, imag) if `imag_fields` is given
+    """
+    real_rows = []
+    imag_rows = []
+    counts = []
+    for k_point in k_points:
+        rows = [row for row in tables[k_point].splitlines() if row.strip()]
+        real_rows.extend(rows[::2])
+        counts.append(len(rows[::2]))
+        if imag_fields is not None:
+            if len(rows[1::2]) != counts[-1]:
+                raise ValueError(
+                    f"Missing imaginary parts in the table of k point {k_point}"
+                )
+            imag_rows.extend(rows[1::2])
+
+    counts = np.array(counts, dtype=np.int64)
+    kpoint = np.repeat(np.array(k_points, dtype=np.int64), counts)
+    # position of every row inside the table of its k point
+    local_row = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    if int(number_of_spins) == 2:
+        spin = local_row % 2 + 1
+    else:
+        spin = np.ones(len(local_row), dtype=np.int64)
 
-    return diag_r, diag_i
+    real_columns = _decode_rows(real_rows, real_fields)
+    bands = real_columns[:, real_fields.index("Bd")].astype(np.int64)
+    real = _structured(real_columns, real_fields, bands, kpoint, spin)
+    if imag_fields is None:
+        return real
 
+    imag_columns = _decode_rows(imag_rows, imag_fields)
+    imag = _structured(imag_columns, imag_fields, bands, kpoint, spin)
+    return real, imag
 
-def gw_parser(parser_name, contents, out_dict=None):
+
+def structured_to_dict(array):
+    """
+    Convert a structured array into a dictionary of lists, one per field.
+    """
+    return {name: array[name].tolist() for name in array.dtype.names}
+
+
+@spex_parser(files=["spex.out"], kpoint_index=True)
+def gw_parser(
+    parser_name, contents, out_dict=None, kpoint_index=None, options=None
+):
     """
     Parses the spex.out file for a GW calculation.
+    A `KPointIndex` of spex.out can be given to share it with other parsers.
     """
     energy_eigenvalues = {}
     content = contents[0]
@@ -102,25 +308,20 @@ def gw_parser(parser_name, contents, out_dict=None):
 
 
     # Energy eigen values
-    r_energies = []
-    i_energies = []
-    for k_point in list_of_k_points[:, 0]:
-        pattern = re.compile(
-            r"#{2,}\n#{2,} K POINT:\s+"
-            + k_point
-            + r"\s+#{2,}\n#{2,}\n{3}-{3}\sDIAGONAL ELEMENTS \[eV\] -{3}\n{2}\sBd\s+vxc\s+sigmax\s+sigmac\s+Z\s+KS\s+HF\s+GW\s+lin/dir\s\n((.+\n)*)",
-            re.MULTILINE,
-        )
-        kpt_energies = pattern.search(content).group(1)
-        rdf, idf = get_gw_energies(kpt_energies, k_point, out_dict)
-        r_energies.append(rdf)
-        i_energies.append(idf)
-
-    energies_real = pd.concat(r_energies, axis=0, ignore_index=True)
-    energies_imag = pd.concat(i_energies, axis=0, ignore_index=True)
+    k_points = list_of_k_points[:, 0]
+    if kpoint_index is None:
+        kpoint_index = KPointIndex(content)
+    tables = read_kpoint_tables(kpoint_index, _GW_TABLE_HEADER, k_points)
+    energies_real, energies_imag = decode_diagonal_tables(
+        tables,
+        k_points,
+        out_dict["number_of_spins"],
+        GW_REAL_FIELDS,
+        GW_IMAG_FIELDS,
+    )
 
-    energy_eigenvalues["real"] = energies_real.to_dict("list")
-    energy_eigenvalues["imag"] = energies_imag.to_dict("list")
+    energy_eigenvalues["real"] = structured_to_dict(energies_real)
+    energy_eigenvalues["imag"] = structured_to_dict(energies_imag)
     
     # DO NOT change the attributes since they are used in the make_energy_inp function
     return_dict = {
@@ -130,29 +331,13 @@ def gw_parser(parser_name, contents, out_dict=None):
     return return_dict
 
 
-def get_ks_energies(kpt_energies, k_point, out_dict=None):
-    """
-    Create a dataframe from the ks energies.
-    """
-    df = pd.read_csv(StringIO(kpt_energies), sep="\s+", header=None)
-    diag_r = pd.DataFrame()
-    diag_r[["Bd", "vxc", "KS"]] = df.iloc[::2]
-    diag_r.reset_index(drop=True, inplace=True)
-    diag_r["Bd"] = diag_r["Bd"].astype(int)
-    diag_r["kpoint"] = int(k_point)
-    if int(out_dict["number_of_spins"]) == 2:
-        spins = np.ones(diag_r.shape[0], dtype=int)
-        spins[1::2] += 1
-        diag_r["spin"] = spins
-    else:
-        diag_r["spin"] = 1
-
-    return diag_r
-
-
-def ks_parser(parser_name, contents, out_dict=None):
+@spex_parser(files=["spex.out"], kpoint_index=True)
+def ks_parser(
+    parser_name, contents, out_dict=None, kpoint_index=None, options=None
+):
     """
     Parser for the KS energies
+    A `KPointIndex` of spex.out can be given to share it with other parsers.
     """
     energy_eigenvalues = {}
     content = contents[0]
@@ -162,20 +347,14 @@ def ks_parser(parser_name, contents, out_dict=None):
     else:
         raise ValueError("Could not find the k-point list in the output file/output dictionary.")
 
-    r_energies = []
-    for k_point in list_of_k_points[:, 0]:
-        pattern = re.compile(
-            r"#{2,}\n#{2,} K POINT:\s+"
-            + k_point
-            + r"\s+#{2,}\n#{2,}\n{3}-{3}\sDIAGONAL ELEMENTS \[eV\] -{3}\n{2}\sBd\s+vxc\s+KS\n((.+\n)*)",
-            re.MULTILINE,
-        )
-        kpt_energies = pattern.search(content).group(1)
-        rdf = get_ks_energies(kpt_energies, k_point, out_dict)
-        r_energies.append(rdf)
-
-    energies_real = pd.concat(r_energies, axis=0, ignore_index=True)
-    energy_eigenvalues["real"] =energies_real.to_dict("list")
+    k_points = list_of_k_points[:, 0]
+    if kpoint_index is None:
+        kpoint_index = KPointIndex(content)
+    tables = read_kpoint_tables(kpoint_index, _KS_TABLE_HEADER, k_points)
+    energies_real = decode_diagonal_tables(
+        tables, k_points, out_dict["number_of_spins"], KS_REAL_FIELDS
+    )
+    energy_eigenvalues["real"] = structured_to_dict(energies_real)
 
     # DO NOT change the attributes since they are used in the make_energy_inp function
     return_dict = {
@@ -185,110 +364,165 @@ def ks_parser(parser_name, contents, out_dict=None):
     return return_dict
 
 
-def dielec_parser(parser_name, contents, out_dict=None):
+@spex_parser(files=["dielecR", "dielec"], temporary=True)
+def dielec_parser(
+    parser_name, contents, out_dict=None, kpoint_index=None, options=None
+):
     """
-    Parses the dielectric function from the dielecR output file.
+    Parses the dielectric function from the dielecR/dielec output files.
+    Every ``#`` header block of a file (k point, spin, ...) is kept as a
+    separate entry of the ``frequency`` and ``spectrum`` (re/im) lists.
     """
-    # content = contents[0]
-    dielec=[]
-
-    for content in contents:
-        dielec_dict_t ={}
-        dielec_df = pd.read_csv(
-            StringIO(content),
-            sep="\s+",
-            header=None,
-            comment="#",
-            names=["Frequency", "Real", "Imaginary"],
-        )
-
-        p_lattvec = re.compile(r"# lattvec:\s*(.*)")
-        match = p_lattvec.search(content)
-        lattvec = match.group(1)
-
-        p_kpoint = re.compile(r"# k point:\s*(.*)")
-        match = p_kpoint.findall(content)
-        kpoint = match
-        if not kpoint:
-            kpoint = []
-
-        p_kindex = re.compile(r"# k index:\s*(.*)")
-        match = p_kindex.findall(content)
-        kindex = match
-        if not kindex:
-            kindex = []
-
-        p_spin = re.compile(r"# spin:\s*(.*)")
-        match = p_spin.findall(content)
-        spin = match
-        if not spin:
-            spin = []
-        
-        dielec_dict_t["data"] = dielec_df.to_dict("list")
-        dielec_dict_t["lattvec"] = lattvec
-        dielec_dict_t["kpoint"] = kpoint
-        dielec_dict_t["kindex"] = kindex
-        dielec_dict_t["spin"] = spin
-
-        dielec.append(dielec_dict_t)
+    filenames = dielec_parser.spex_parser_files
+    dielec = {}
+    for i, content in enumerate(contents):
+        spectra = read_dielec(content)
+        blocks = spectra["blocks"]
+        lattvecs = [block["lattvec"] for block in blocks if "lattvec" in block]
+        # without the NaN padding, the blocks may have different lengths
+        rows = spectra["n_frequencies"].tolist()
+        columns = spectra["n_columns"].tolist()
+        dielec_dict_t = {
+            "frequency": [
+                spectra["frequency"][j, :n].tolist() for j, n in enumerate(rows)
+            ],
+            "spectrum": [
+                spectra["spectrum"][j, : rows[j], : columns[j] - 1].tolist()
+                for j in range(len(rows))
+            ],
+            "lattvec": lattvecs[0] if lattvecs else None,
+        }
+        for key in ["kpoint", "kindex", "spin"]:
+            dielec_dict_t[key] = [block[key] for block in blocks if key in block]
+        filename = filenames[i] if i < len(filenames) else f"{parser_name}_{i}"
+        dielec[filename] = dielec_dict_t
 
     return_dict = {
-        "results": {"dielecR": dielec[0], "dielec": dielec[1]},
+        "results": dielec,
         "parser": parser_name,
     }
     return return_dict
 
 
-def plussoc_parser(parser_name, contents, out_dict=None):
+@spex_parser(files=["spex.dos"])
+def dos_parser(
+    parser_name, contents, out_dict=None, kpoint_index=None, options=None
+):
     """
-    Parses the PLUSSOC output file.
+    The spex.dos file is retrieved and stored, but not parsed (yet).
+    :return: an empty dictionary.
     """
-    content = contents[0]
+    return {}
 
-    pattern = re.compile(r"K point\s+(\d+)\s+->\s+\d+\n((?:\s+\d.*\n){1,})((?:.+\n)*)")
-    matches = pattern.findall(content)
-    kpt, eq_kpt, eigenvalues = [], [], []
-    for match in matches:
-        t_match = [re.sub("\ +|\n", " ", w) for w in match]
-        kpt.append(int(t_match[0].strip()))
-        eq_kpt.append(t_match[1].strip())
-        eigenvalues.append(t_match[2].strip())
-    plussoc_df = pd.DataFrame(
-        data={
-            "k_point_number": kpt,
-            "equivalant_k_points": eq_kpt,
-            "eigenvalues": eigenvalues,
-        }
-    )
-    plussoc_df["k_point_number"] = plussoc_df["k_point_number"].astype(int)
-    plussoc_df["equivalant_k_points"] = plussoc_df["equivalant_k_points"].apply(
-        lambda x: np.array(x.split()).reshape(-1, 4)
-    )
-    plussoc_df["eigenvalues"] = plussoc_df["eigenvalues"].apply(
-        lambda x: np.array(x.split()).astype(float)
+
+_PLUSSOC_KPOINT = re.compile(r"K point\s+(\d+)\s+->\s+\d+\n")
+_PLUSSOC_EQ_LINE = re.compile(r"\s+\d")
+
+
+def _padded(values, counts):
+    """
+    Put the concatenated rows of length `counts` into a 2-D array, the
+    shorter rows are padded with NaN.
+    """
+    width = max(counts, default=0)
+    padded = np.full((len(counts), width), np.nan)
+    padded[np.arange(width) < np.array(counts, dtype=int)[:, None]] = values
+    return padded
+
+
+@spex_parser(files=["spex.out"], output="array")
+def plussoc_parser(
+    parser_name, contents, out_dict=None, kpoint_index=None, options=None
+):
+    """
+    Parses the PLUSSOC output file.
+
+    The spin-orbit eigenvalues are returned as one (k point, band) array,
+    padded with NaN as the number of bands may differ between the k points,
+    with the number of bands of every k point in ``n_bands``. The equivalent
+    k points are one integer table whose first column is the k point they
+    belong to. The results are stored as arrays by default, in a Dict the
+    padding is stored as None.
+    """
+    kpt, eq_counts, eig_counts = [], [], []
+    eq_tokens, eig_tokens = [], []
+
+    # a K point block: the header line, the lines with the equivalent k points,
+    # the eigenvalue lines and an empty line
+    k_point = None
+    in_eq = False
+    block_eq, block_eig = [], []
+
+    def _close_block():
+        if k_point is None or not block_eq:
+            return
+        kpt.append(k_point)
+        tokens = " ".join(block_eq).split()
+        eq_counts.append(len(tokens) // 4)
+        eq_tokens.extend(tokens)
+        tokens = " ".join(block_eig).split()
+        eig_counts.append(len(tokens))
+        eig_tokens.extend(tokens)
+
+    for line in iter_lines(contents[0]):
+        if k_point is not None:
+            if line == "\n" or not line.endswith("\n"):
+                _close_block()
+                k_point = None
+            elif in_eq and _PLUSSOC_EQ_LINE.match(line):
+                block_eq.append(line)
+            else:
+                in_eq = False
+                block_eig.append(line)
+            continue
+        if "K point" in line:
+            match = _PLUSSOC_KPOINT.search(line)
+            if match:
+                k_point = int(match.group(1))
+                in_eq = True
+                block_eq, block_eig = [], []
+    _close_block()
+
+    eq_table = np.array(eq_tokens, dtype=int).reshape(-1, 4)
+    eq_table = np.column_stack(
+        [np.repeat(np.array(kpt, dtype=int), eq_counts), eq_table]
     )
+    eigenvalues = _padded(np.array(eig_tokens, dtype=float), eig_counts)
 
     return_dict = {
-        "results": plussoc_df.to_dict("list"),
+        "results": {
+            "k_point_number": kpt,
+            "equivalant_k_points": eq_table.tolist(),
+            "eigenvalues": eigenvalues.tolist(),
+            "n_bands": eig_counts,
+        },
         "parser": parser_name,
     }
     return return_dict
 
 
-def spexfile_parse(parser_name, contents, out_dict=None):
+def spexfile_parse(
+    parser_name, contents, out_dict=None, kpoint_index=None, options=None
+):
     """
-    Using the parser_name provided to the class, this function calles the method that corresponds to the parser_name and returns a dictionary of results
+    Run the additional parser registered as `parser_name`, see
+    `aiida_spex.tools.parser_registry`.
+    Kept for backwards compatibility, use `parser_registry.run_parser`.
     :return: a dictionary.
     """
-    if parser_name == "project":
-        return project_parser(parser_name, contents, out_dict)
-    elif parser_name == "gw":
-        return gw_parser(parser_name, contents, out_dict)
-    elif parser_name == "ks":
-        return ks_parser(parser_name, contents, out_dict)
-    elif parser_name == "dielec":
-        return dielec_parser(parser_name, contents, out_dict)
-    elif parser_name == "plussoc":
-        return plussoc_parser(parser_name, contents, out_dict)
-    else:
-        return {}
+    return run_parser(parser_name, contents, out_dict, kpoint_index, options)
+
+
+# the parsers of this module, by their name in the registry
+_PARSERS = {
+    name: globals()[path.split(":")[1]] for name, path in _BUILTIN_PARSERS.items()
+}
+
+# Files of the parsers shipped with aiida-spex, kept for backwards compatibility.
+# The registry of all parsers is `aiida_spex.tools.parser_registry`.
+parser_registry = {name: parser.spex_parser_files for name, parser in _PARSERS.items()}
+
+# Parsers reading the K POINT blocks of spex.out, they share one KPointIndex.
+kpoint_parsers = [
+    name for name, parser in _PARSERS.items() if parser.spex_parser_kpoint_index
+]
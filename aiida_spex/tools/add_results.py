@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# Copyright (c), Forschungszentrum Jülich GmbH, IAS-1/PGI-1, Germany.         #
+#                All rights reserved.                                         #
+# This file is part of the AiiDA-SPEX package.                               #
+#                                                                             #
+# The code is hosted on GitHub at https://github.com/JuDFTteam/aiida-spex     #
+# For further information on the license, see the LICENSE.txt file            #
+# For further information please visit http://www.flapw.de or                 #
+###############################################################################
+"""
+Helpers to store the results of the additional parsers as arrays.
+
+With ``settings["output_format"] = "array"`` the numeric columns of the results
+(GW/KS energies, spectra, projections, ...) go into an ``ArrayData`` node
+(``output_arrays_add``), i.e. into the repository as ``.npy`` files, and the
+``output_parameters_add`` Dict only keeps the small scalar data together with a
+reference to every array. The readers below put both back together and load
+only the arrays that are asked for.
+"""
+import re
+
+import numpy as np
+
+# key of the references to the arrays in the summary dictionary
+ARRAY_KEY = "__array__"
+
+
+def _array_name(path, arrays):
+    """Unique name of the array stored under `path` (list of keys)."""
+    name = re.sub(r"[^0-9a-zA-Z_]", "_", "__".join(path))
+    unique_name = name
+    i = 1
+    while unique_name in arrays:
+        unique_name = f"{name}_{i}"
+        i += 1
+    return unique_name
+
+
+def _as_numeric_array(value):
+    """Return `value` as a numeric array, or None if it is not one."""
+    if not isinstance(value, (list, tuple, np.ndarray)) or len(value) == 0:
+        return None
+    try:
+        array = np.asarray(value)
+    except ValueError:  # ragged
+        return None
+    if array.dtype.kind not in "biuf":
+        return None
+    return array
+
+
+def split_add_results(add_dict):
+    """
+    Split the results of the additional parsers into a summary and arrays.
+
+    Every numeric list/array in `add_dict` is replaced by a reference
+    ``{"__array__": name, "shape": ..., "dtype": ...}`` to an entry of the
+    returned arrays, everything else stays in the summary.
+
+    :param add_dict: dictionary with the results of the additional parsers
+    :return: a tuple (summary, arrays), where arrays maps names to numpy arrays
+    """
+    arrays = {}
+
+    def _split(value, path):
+        if isinstance(value, dict):
+            return {key: _split(val, path + [str(key)]) for key, val in value.items()}
+        array = _as_numeric_array(value)
+        if array is None:
+            return value
+        name = _array_name(path, arrays)
+        arrays[name] = array
+        return {
+            ARRAY_KEY: name,
+            "shape": list(array.shape),
+            "dtype": str(array.dtype),
+        }
+
+    return _split(add_dict, []), arrays
+
+
+def nan_to_none(value):
+    """
+    Replace NaN (the padding of arrays) in the lists of `value` by None, which
+    can be stored in a Dict.
+    """
+    if isinstance(value, dict):
+        return {key: nan_to_none(val) for key, val in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [nan_to_none(val) for val in value]
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+def is_array_reference(value):
+    """True if `value` is a reference to an array made by `split_add_results`."""
+    return isinstance(value, dict) and ARRAY_KEY in value
+
+
+def resolve_add_results(summary, array_node):
+    """
+    Replace the array references in `summary` by the arrays of `array_node`.
+    Only the arrays referenced in (this part of) the summary are loaded.
+
+    :param summary: (part of) the output_parameters_add dictionary
+    :param array_node: the output_arrays_add ArrayData node
+    """
+    if is_array_reference(summary):
+        return array_node.get_array(summary[ARRAY_KEY])
+    if isinstance(summary, dict):
+        return {
+            key: resolve_add_results(val, array_node) for key, val in summary.items()
+        }
+    return summary
+
+
+def load_add_results(calc, parser_name=None):
+    """
+    Return the results of the additional parsers of a SPEX calculation,
+    independent of whether they were stored as Dict or as arrays.
+
+    :param calc: a finished SpexCalculation node
+    :param parser_name: if given only the results of this parser are returned
+        (and only its arrays are loaded)
+    :raises KeyError: if there are no results of the parser
+    """
+    summary = calc.outputs.output_parameters_add.get_dict()
+    if parser_name is not None:
+        summary = summary[parser_name]
+    if not hasattr(calc.outputs, "output_arrays_add"):
+        return summary
+    return resolve_add_results(summary, calc.outputs.output_arrays_add)
+
+
+def _is_table(value):
+    """True if `value` is a dictionary of columns (sequences of equal length)."""
+    if not isinstance(value, dict) or not value:
+        return False
+    if not all(isinstance(val, (list, tuple, np.ndarray)) for val in value.values()):
+        return False
+    return len({len(val) for val in value.values()}) == 1
+
+
+def _as_list(value):
+    return value.tolist() if isinstance(value, np.ndarray) else list(value)
+
+
+def _kpoint_tables(value, column):
+    """All tables (see `_is_table`) with the column `column` in `value`."""
+    if _is_table(value):
+        return [value] if column in value else []
+    if isinstance(value, dict):
+        return [
+            table for val in value.values() for table in _kpoint_tables(val, column)
+        ]
+    return []
+
+
+def renumber_kpoints(results_list, shared_boundaries=False, column="kpoint"):
+    """
+    Number the k points of the tables of the results of calculations on
+    consecutive k points (the chunks of `SpexKpointWorkChain`) continuously,
+    so the merged rows are told apart by their k point alone. The k points of
+    every calculation are numbered in their order, after the k points of the
+    calculations before it. The tables are changed in place.
+
+    :param results_list: list of results, as returned by `load_add_results`
+    :param shared_boundaries: the first k point of every calculation but the
+        first is the last k point of the calculation before it (sub-paths of a
+        KPTPATH), its rows are dropped
+    :param column: the column of the tables with the k point
+    :return: `results_list`
+    """
+    offset = 0
+    for index, results in enumerate(results_list):
+        tables = _kpoint_tables(results, column)
+        k_points = sorted(
+            {int(k_point) for table in tables for k_point in table[column]}
+        )
+        if shared_boundaries and index > 0 and k_points:
+            k_points = k_points[1:]
+        numbers = {k_point: offset + i + 1 for i, k_point in enumerate(k_points)}
+        for table in tables:
+            keep = np.array([int(k_point) in numbers for k_point in table[column]])
+            for key, val in table.items():
+                table[key] = np.asarray(val)[keep]
+            table[column] = np.array(
+                [numbers[int(k_point)] for k_point in table[column]], dtype=np.int64
+            )
+        offset += len(k_points)
+    return results_list
+
+
+def _is_padded(value):
+    """True if `value` is a 2-D float array, which may be padded with NaN."""
+    return isinstance(value, np.ndarray) and value.ndim == 2 and value.dtype.kind == "f"
+
+
+def _concatenate_padded(arrays):
+    """Concatenate 2-D arrays row-wise, padding the narrower ones with NaN."""
+    width = max(array.shape[1] for array in arrays)
+    return np.concatenate(
+        [
+            np.pad(array, ((0, 0), (0, width - array.shape[1])), constant_values=np.nan)
+            for array in arrays
+        ]
+    )
+
+
+def merge_add_results(results_list, chunk_key="chunk"):
+    """
+    Merge the results of the additional parsers of calculations on different
+    k points (e.g. the chunks of `SpexKpointWorkChain`) into one dictionary.
+
+    Tables (dictionaries of columns, like the "real" GW energies) are
+    concatenated row-wise and get the column `chunk_key` with the index of
+    the calculation in `results_list`, other lists are concatenated and all
+    other values are taken from the first calculation that has them. 2-D
+    float arrays (like the NaN-padded PLUSSOC eigenvalues) of different
+    widths are padded with NaN to the widest one.
+
+    :param results_list: list of results, as returned by `load_add_results`
+    :return: the merged results, with lists instead of arrays
+    """
+
+    def _merge(values):
+        present = [(i, val) for i, val in enumerate(values) if val is not None]
+        if not present:
+            return None
+        first = present[0][1]
+        if _is_table(first):
+            columns = []
+            for _, val in present:
+                columns.extend(col for col in val if col not in columns)
+            merged = {col: [] for col in columns + [chunk_key]}
+            padded = [
+                col
+                for col in columns
+                if all(col in val and _is_padded(val[col]) for _, val in present)
+            ]
+            for col in padded:
+                merged[col] = _as_list(
+                    _concatenate_padded([val[col] for _, val in present])
+                )
+            for i, val in present:
+                n_rows = len(next(iter(val.values())))
+                for col in columns:
+                    if col not in padded:
+                        merged[col].extend(
+                            _as_list(val[col]) if col in val else [None] * n_rows
+                        )
+                merged[chunk_key].extend([i] * n_rows)
+            return merged
+        if isinstance(first, dict):
+            keys = []
+            for _, val in present:
+                if isinstance(val, dict):
+                    keys.extend(key for key in val if key not in keys)
+            return {
+                key: _merge(
+                    [val.get(key) if isinstance(val, dict) else None for val in values]
+                )
+                for key in keys
+            }
+        if all(_is_padded(val) for _, val in present):
+            return _as_list(_concatenate_padded([val for _, val in present]))
+        if isinstance(first, (list, tuple, np.ndarray)):
+            merged = []
+            for _, val in present:
+                merged.extend(_as_list(val))
+            return merged
+        return first
+
+    return _merge(list(results_list))
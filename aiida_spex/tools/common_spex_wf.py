@@ -12,6 +12,8 @@
 from aiida.orm import Bool, Node, load_node
 from aiida.plugins import CalculationFactory, DataFactory
 
+from aiida_spex.tools.spexinp_utils import canonical_parameters
+
 
 def is_code(code):
     """
@@ -54,6 +56,33 @@ def is_code(code):
         return None
 
 
+def canonical_settings(settings):
+    """
+    Canonical form of the settings of a SpexCalculation: settings with their
+    default value are dropped, lists of file and parser names are sorted
+    without duplicates and compress_outputs=True is "gzip".
+    """
+    SpexCalculation = CalculationFactory("spex.spex")
+    canonical = {}
+    for key, val in settings.items():
+        if val is None or val == SpexCalculation._settings_defaults.get(key, None):
+            continue
+        if key in SpexCalculation._unordered_settings and isinstance(val, list):
+            val = sorted(set(val))
+        elif key == "compress_outputs" and val is True:
+            val = "gzip"
+        canonical[key] = val
+    return canonical
+
+
+def _canonical_node(node, canonical):
+    """`node` if it has the content `canonical`, else a new Dict of it."""
+    Dict = DataFactory("dict")
+    if isinstance(node, Dict) and node.get_dict() == canonical:
+        return node
+    return Dict(dict=canonical)
+
+
 def get_inputs_spex(
     spexcode,
     remote,
@@ -74,6 +103,10 @@ def get_inputs_spex(
     :param description: a string setting a description of the CalcJob in the DB
     :param params: input parameters for spex code of Dict type
 
+    The parameters and the settings are stored in canonical form
+    (`canonical_parameters`, `canonical_settings`), so equivalent inputs have
+    the same hash and are taken from the cache.
+
     Example of use::
 
         inputs_build = get_inputs_spex(spexinp_parameters, spexcode, options, label,
@@ -116,16 +149,18 @@ def get_inputs_spex(
     options["custom_scheduler_commands"] = custom_commands
 
     if settings:
-        if isinstance(settings, Dict):
-            inputs["settings"] = settings
+        settings_dict = settings.get_dict() if isinstance(settings, Dict) else settings
+        settings_dict = canonical_settings(settings_dict)
+        if settings_dict:
+            inputs["settings"] = _canonical_node(settings, settings_dict)
         else:
-            inputs["settings"] = Dict(dict=settings)
-            
+            inputs.pop("settings")
+
     if params:
-        if isinstance(params, Dict):
-            inputs["parameters"] = params
-        else:
-            inputs["parameters"] = Dict(dict=params)
+        params_dict = params.get_dict() if isinstance(params, Dict) else params
+        inputs["parameters"] = _canonical_node(
+            params, canonical_parameters(params_dict)
+        )
 
     if options:
         inputs["options"] = Dict(dict=options)
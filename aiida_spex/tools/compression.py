@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# Copyright (c), Forschungszentrum Jülich GmbH, IAS-1/PGI-1, Germany.         #
+#                All rights reserved.                                         #
+# This file is part of the AiiDA-SPEX package.                               #
+#                                                                             #
+# The code is hosted on GitHub at https://github.com/JuDFTteam/aiida-spex     #
+# For further information on the license, see the LICENSE.txt file            #
+# For further information please visit http://www.flapw.de or                 #
+###############################################################################
+"""
+Compression of the SPEX output files on the remote computer before they are
+retrieved (``settings["compress_outputs"]``), and streaming decompression
+when they are parsed.
+
+zstd needs the ``zstd`` command on the remote computer and the
+``zstandard`` package where the parser runs (``pip install aiida-spex[zstd]``),
+gzip (the default) needs neither.
+"""
+import gzip
+import io
+
+# method: (suffix of the compressed file, command compressing a file in place)
+COMPRESSORS = {
+    "gzip": (".gz", "gzip -f"),
+    "zstd": (".zst", "zstd -q -f --rm"),
+}
+
+
+def compressed_name(filename, method):
+    """Name of `filename` compressed with `method`."""
+    return filename + COMPRESSORS[method][0]
+
+
+def uncompressed_name(filename):
+    """
+    Split a retrieved file name into the original name and the compression
+    method, (filename, None) if it is not compressed.
+    """
+    for method, (suffix, _) in COMPRESSORS.items():
+        if filename.endswith(suffix):
+            return filename[: -len(suffix)], method
+    return filename, None
+
+
+def compress_script(filenames, method):
+    """Shell snippet compressing the existing files of `filenames` in place."""
+    if method not in COMPRESSORS:
+        raise ValueError(
+            f"Unknown compression '{method}', use one of {list(COMPRESSORS)}"
+        )
+    return (
+        f"for f in {' '.join(filenames)}; do\n"
+        f'  if [ -f "$f" ]; then {COMPRESSORS[method][1]} "$f"; fi\n'
+        "done\n"
+    )
+
+
+def decompressing_reader(fileobj, method):
+    """
+    Binary file object reading the decompressed content of the (binary)
+    `fileobj`, chunk by chunk. The file is never inflated as a whole.
+    """
+    if method is None:
+        return fileobj
+    if method == "gzip":
+        return gzip.GzipFile(fileobj=fileobj, mode="rb")
+    if method == "zstd":
+        try:
+            import zstandard
+        except ImportError as exc:
+            raise ImportError(
+                "Reading zstd compressed files needs the zstandard package"
+            ) from exc
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(fileobj))
+    raise ValueError(f"Unknown compression '{method}'")
@@ -12,23 +12,27 @@
 from __future__ import absolute_import
 import numpy as np
 
+from aiida_spex.tools import geometry
+
 
 def inverse(bravais_matrix):
     return np.linalg.inv(bravais_matrix)
 
 
 def cartesian_to_internal(coordinate_vectors, bravais_matrix):
-    result = []
-    for coordinate_vector in coordinate_vectors:
-        result.append(np.inner(bravais_matrix, coordinate_vector))
-    return result
+    """
+    Apply `bravais_matrix` (usually the inverse of the Bravais matrix) to all
+    coordinate vectors at once, returns an (N, 3) array.
+    """
+    return geometry.internal_to_cartesian(coordinate_vectors, np.transpose(bravais_matrix))
 
 
 def internal_to_cartesian(coordinate_vectors, bravais_matrix):
-    result = []
-    for coordinate_vector in coordinate_vectors:
-        result.append(np.dot(coordinate_vector, bravais_matrix))
-    return result
+    """
+    Convert all internal coordinate vectors to cartesian ones at once,
+    returns an (N, 3) array.
+    """
+    return geometry.internal_to_cartesian(coordinate_vectors, bravais_matrix)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# Copyright (c), Forschungszentrum Jülich GmbH, IAS-1/PGI-1, Germany.         #
+#                All rights reserved.                                         #
+# This file is part of the AiiDA-SPEX package.                               #
+#                                                                             #
+# The code is hosted on GitHub at https://github.com/JuDFTteam/aiida-spex     #
+# For further information on the license, see the LICENSE.txt file            #
+# For further information please visit http://www.flapw.de or                 #
+###############################################################################
+"""
+Geometry helpers working on whole (N, 3) batches of vectors: reciprocal
+lattice, coordinate conversions and k-path distances.
+
+Lattices are (3, 3) arrays with the lattice vectors as rows, as the
+``primitive_vectors`` and ``reciprocal_vectors`` parsed from spex.out.
+"""
+import numpy as np
+
+
+def reciprocal_lattice(lattice):
+    """
+    Reciprocal lattice vectors (rows) of `lattice`, b_i . a_j = 2 pi delta_ij.
+    Also works for a stack (..., 3, 3) of lattices.
+    """
+    lattice = np.asarray(lattice, dtype=float)
+    return 2 * np.pi * np.swapaxes(np.linalg.inv(lattice), -1, -2)
+
+
+def internal_to_cartesian(vectors, lattice):
+    """
+    Convert internal (fractional) coordinates to cartesian ones.
+
+    :param vectors: (N, 3) internal coordinates
+    :param lattice: (3, 3) lattice vectors as rows
+    :return: (N, 3) cartesian coordinates
+    """
+    return np.asarray(vectors, dtype=float) @ np.asarray(lattice, dtype=float)
+
+
+def cartesian_to_internal(vectors, lattice):
+    """
+    Convert cartesian coordinates to internal (fractional) ones.
+
+    :param vectors: (N, 3) cartesian coordinates
+    :param lattice: (3, 3) lattice vectors as rows
+    :return: (N, 3) internal coordinates
+    """
+    return np.linalg.solve(
+        np.asarray(lattice, dtype=float).T, np.asarray(vectors, dtype=float).T
+    ).T
+
+
+def kpath_breaks(points, tol=1e-6):
+    """
+    Indices of the high-symmetry points of a k path given as (N, 3) points:
+    the first and last point, every point where the direction of the path
+    changes and every point repeated to start a new (disconnected) segment.
+
+    :param tol: tolerance on the step length and on 1 - cos(angle)
+    """
+    points = np.asarray(points, dtype=float)
+    if len(points) < 2:
+        return np.arange(len(points))
+    steps = np.diff(points, axis=0)
+    lengths = np.linalg.norm(steps, axis=1)
+    moving = lengths > tol
+    directions = np.zeros_like(steps)
+    directions[moving] = steps[moving] / lengths[moving, None]
+    cosines = np.einsum("ij,ij->i", directions[:-1], directions[1:])
+    # point i + 1 is a corner if the steps before and after differ in direction
+    corners = np.flatnonzero(moving[:-1] & moving[1:] & (cosines < 1 - tol)) + 1
+    repeated = np.flatnonzero(~moving) + 1
+    breaks = np.concatenate([[0], corners, repeated - 1, repeated, [len(points) - 1]])
+    return np.unique(breaks)
+
+
+def kpath_distances(points, offset=0.0):
+    """
+    Cumulative distances along a k path given as (N, 3) cartesian points.
+
+    :param offset: distance of the first point
+    :return: (N,) array
+    """
+    steps = np.linalg.norm(np.diff(np.asarray(points, dtype=float), axis=0), axis=1)
+    return offset + np.concatenate([[0.0], np.cumsum(steps)])
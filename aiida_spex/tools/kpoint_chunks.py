@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# Copyright (c), Forschungszentrum Jülich GmbH, IAS-1/PGI-1, Germany.         #
+#                All rights reserved.                                         #
+# This file is part of the AiiDA-SPEX package.                               #
+#                                                                             #
+# The code is hosted on GitHub at https://github.com/JuDFTteam/aiida-spex     #
+# For further information on the license, see the LICENSE.txt file            #
+# For further information please visit http://www.flapw.de or                 #
+###############################################################################
+"""
+Splitting of the k points of a SPEX JOB into chunks, which can run as
+independent calculations, see `SpexKpointWorkChain`.
+
+The k-point labels of the JOB (``JOB GW 1:(4-12) X:(4-12)``) are divided
+into contiguous chunks. A JOB on the k points of the KPTPATH (label ``+``)
+is divided along the path instead: every chunk gets a sub-path of
+consecutive segments of about the same length and the number of points of
+the KPTPATH in proportion to the length of its sub-path. The lengths are
+cartesian lengths in reciprocal space, computed from the internal
+coordinates of the KPT labels (``1`` is the Gamma point) with the lattice
+of the structure; without the lattice every segment counts the same.
+Consecutive sub-paths share their end point, the merged results keep it once
+(see `add_results.renumber_kpoints`).
+"""
+import copy
+
+import numpy as np
+
+from aiida_spex.tools.geometry import internal_to_cartesian, reciprocal_lattice
+
+# label of the JOB for all k points of the KPTPATH
+KPTPATH_LABEL = "+"
+# label of the Gamma point, which is defined without KPT
+GAMMA_LABEL = "1"
+
+
+def _find_key(parameters, key):
+    """Key of `parameters` matching `key` case insensitive, None if missing."""
+    return next((k for k in parameters if k.upper() == key), None)
+
+
+def _split_evenly(items, n_chunks):
+    """Split `items` into at most `n_chunks` contiguous, non-empty chunks."""
+    n_chunks = max(1, min(n_chunks, len(items)))
+    size, rest = divmod(len(items), n_chunks)
+    chunks = []
+    start = 0
+    for i in range(n_chunks):
+        end = start + size + (1 if i < rest else 0)
+        chunks.append(items[start:end])
+        start = end
+    return chunks
+
+
+def job_kpoints(job):
+    """k-point labels of all jobs of the JOB dictionary, in order of appearance."""
+    labels = []
+    for val2 in job.values():
+        if isinstance(val2, dict):
+            labels.extend(label for label in val2 if label not in labels)
+    return labels
+
+
+def _select_job(job, labels):
+    """JOB dictionary with only the k points `labels`."""
+    selected = {}
+    for key2, val2 in job.items():
+        if not isinstance(val2, dict):
+            continue
+        val2 = {label: val3 for label, val3 in val2.items() if label in labels}
+        if val2:
+            selected[key2] = val2
+    return selected
+
+
+def _split_weighted(weights, n_chunks):
+    """
+    Split the indices of `weights` into at most `n_chunks` contiguous,
+    non-empty chunks of about the same total weight.
+    """
+    n_chunks = max(1, min(n_chunks, len(weights)))
+    total = sum(weights)
+    chunks = []
+    start = 0
+    cumulative = 0.0
+    for i in range(1, n_chunks):
+        # leave at least one item for every remaining chunk
+        end = start + 1
+        cumulative += weights[start]
+        while (
+            end < len(weights) - (n_chunks - i)
+            and cumulative + weights[end] / 2 <= total * i / n_chunks
+        ):
+            cumulative += weights[end]
+            end += 1
+        chunks.append(list(range(start, end)))
+        start = end
+    chunks.append(list(range(start, len(weights))))
+    return chunks
+
+
+def _distribute(npoints, weights):
+    """Split `npoints` in proportion to `weights` (largest remainders)."""
+    total = sum(weights)
+    shares = [npoints * weight / total for weight in weights]
+    counts = [int(share) for share in shares]
+    remainders = sorted(range(len(shares)), key=lambda i: counts[i] - shares[i])
+    for i in remainders[: npoints - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+
+def _coordinates(kpt, label):
+    """Internal coordinates of the k point `label` of KPT, None if unknown."""
+    if label == GAMMA_LABEL:
+        return (0.0, 0.0, 0.0)
+    point = kpt.get(label) if isinstance(kpt, dict) else None
+    try:
+        point = tuple(float(val) for val in point)
+    except (TypeError, ValueError):
+        return None
+    return point if len(point) == 3 else None
+
+
+def _segment_lengths(path, kpt, lattice):
+    """
+    Cartesian lengths of the segments of `path` in reciprocal space, equal
+    lengths if the lattice or a coordinate is unknown.
+    """
+    points = [_coordinates(kpt or {}, label) for label in path]
+    if lattice is None or any(point is None for point in points):
+        return [1.0] * (len(path) - 1)
+    cartesian = internal_to_cartesian(points, reciprocal_lattice(lattice))
+    lengths = np.linalg.norm(np.diff(cartesian, axis=0), axis=1).tolist()
+    if not all(lengths):
+        return [1.0] * (len(path) - 1)
+    return lengths
+
+
+def _sub_paths(kptpath, n_chunks, kpt=None, lattice=None):
+    """
+    Split the KPTPATH value (list of labels or dict with "path" and
+    "npoints") into KPTPATH values of consecutive segments.
+
+    :param kpt: the KPT dictionary with the coordinates of the labels
+    :param lattice: (3, 3) lattice vectors (rows) of the structure
+    """
+    if isinstance(kptpath, dict):
+        path = list(kptpath["path"])
+        npoints = kptpath.get("npoints")
+    else:
+        path = list(kptpath)
+        npoints = None
+    lengths = _segment_lengths(path, kpt, lattice)
+    chunks = _split_weighted(lengths, n_chunks)
+    weights = [sum(lengths[i] for i in chunk) for chunk in chunks]
+    counts = None
+    if isinstance(npoints, int):
+        # the shared end points are counted by both sub-paths
+        counts = _distribute(npoints + len(chunks) - 1, weights)
+
+    sub_paths = []
+    for index, chunk in enumerate(chunks):
+        sub_path = path[chunk[0] : chunk[-1] + 2]
+        if isinstance(kptpath, dict):
+            value = dict(kptpath, path=sub_path)
+            if counts is not None:
+                value["npoints"] = max(1, counts[index])
+            sub_paths.append(value)
+        else:
+            sub_paths.append(sub_path)
+    return sub_paths
+
+
+def _kptpath(parameters):
+    """(key, value) of the KPTPATH, if the JOB is split along it, else None."""
+    job_key = _find_key(parameters, "JOB")
+    job = parameters.get(job_key) if job_key is not None else None
+    if not isinstance(job, dict) or KPTPATH_LABEL not in job_kpoints(job):
+        return None
+    kptpath_key = _find_key(parameters, "KPTPATH")
+    kptpath = parameters.get(kptpath_key) if kptpath_key is not None else None
+    if isinstance(kptpath, dict):
+        path = kptpath.get("path") or []
+    else:
+        path = kptpath or []
+    if len(path) <= 2:
+        return None
+    return kptpath_key, kptpath
+
+
+def splits_kptpath(parameters):
+    """
+    True if `split_kpoints` splits the JOB of `parameters` along the KPTPATH,
+    i.e. consecutive chunks share the end points of their sub-paths.
+    """
+    return _kptpath(parameters) is not None
+
+
+def split_kpoints(parameters, n_chunks, lattice=None):
+    """
+    Split the k points of the JOB of the `spex.inp` parameters into at most
+    `n_chunks` parameter dictionaries, which differ only in the JOB (and the
+    KPTPATH). Parameters which can not be split are returned as one chunk.
+
+    :param parameters: dictionary of the parameters
+    :param n_chunks: number of chunks
+    :param lattice: (3, 3) lattice vectors (rows) of the structure, to split
+                    a KPTPATH by the length of its segments
+    :return: list of the parameter dictionaries of the chunks
+    """
+    job_key = _find_key(parameters, "JOB")
+    job = parameters.get(job_key) if job_key is not None else None
+    if not isinstance(job, dict):
+        return [copy.deepcopy(parameters)]
+    labels = job_kpoints(job)
+    kpt_key = _find_key(parameters, "KPT")
+    kpt = parameters.get(kpt_key) if kpt_key is not None else None
+
+    chunks = []
+    kptpath = _kptpath(parameters)
+    if kptpath is not None:
+        kptpath_key, kptpath = kptpath
+        # the other k points go with the first part of the path
+        other_labels = [label for label in labels if label != KPTPATH_LABEL]
+        sub_paths = _sub_paths(kptpath, n_chunks, kpt=kpt, lattice=lattice)
+        for i, sub_path in enumerate(sub_paths):
+            chunk_labels = [KPTPATH_LABEL] + (other_labels if i == 0 else [])
+            chunk = copy.deepcopy(parameters)
+            chunk[job_key] = _select_job(job, chunk_labels)
+            chunk[kptpath_key] = sub_path
+            chunks.append(chunk)
+    else:
+        for chunk_labels in _split_evenly(labels, n_chunks):
+            chunk = copy.deepcopy(parameters)
+            chunk[job_key] = _select_job(job, chunk_labels)
+            chunks.append(chunk)
+    return chunks or [copy.deepcopy(parameters)]
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# Copyright (c), Forschungszentrum Jülich GmbH, IAS-1/PGI-1, Germany.         #
+#                All rights reserved.                                         #
+# This file is part of the AiiDA-SPEX package.                               #
+#                                                                             #
+# The code is hosted on GitHub at https://github.com/JuDFTteam/aiida-spex     #
+# For further information on the license, see the LICENSE.txt file            #
+# For further information please visit http://www.flapw.de or                 #
+###############################################################################
+"""
+Registry of the additional parsers (``settings["parsers"]``) of a SPEX calculation.
+
+The parsers are registered in the ``aiida_spex.parsers`` entry point group, e.g.
+in the ``setup.json`` of a plugin::
+
+    "aiida_spex.parsers": ["myparser = my_package.parsers:my_parser"]
+
+and decorated with `spex_parser` to declare the files they need. A parser is
+only imported when a calculation asks for it.
+"""
+import importlib
+from functools import lru_cache
+
+from aiida.plugins.entry_point import get_entry_point_names, load_entry_point
+
+ENTRY_POINT_GROUP = "aiida_spex.parsers"
+
+# the parsers shipped with aiida-spex, used if the entry points are not
+# (yet) registered, e.g. in a development install
+_BUILTIN_PARSERS = {
+    "project": "aiida_spex.tools.add_parsers:project_parser",
+    "gw": "aiida_spex.tools.add_parsers:gw_parser",
+    "ks": "aiida_spex.tools.add_parsers:ks_parser",
+    "dos": "aiida_spex.tools.add_parsers:dos_parser",
+    "dielec": "aiida_spex.tools.add_parsers:dielec_parser",
+    "plussoc": "aiida_spex.tools.add_parsers:plussoc_parser",
+}
+
+
+def spex_parser(files, output="dict", kpoint_index=False, temporary=False):
+    """
+    Decorator to declare a function as additional parser of SPEX output.
+
+    The parser is called as
+    ``parser(parser_name, contents, out_dict, kpoint_index=None, options=None)``
+    where `contents` holds the content (or open file object) of each of the
+    `files`, `out_dict` is the parsed spex.out and `options` are the entries of
+    ``settings["parser_options"][parser_name]``. It returns a dictionary.
+
+    :param files: list of the (retrieved) files the parser reads
+    :param output: ``"dict"`` or ``"array"``, the output format used if it is
+        not given in ``settings["output_format"]``
+    :param kpoint_index: if True the parser is given the `KPointIndex` of its
+        first file, shared with the other parsers reading the same file
+    :param temporary: if True the `files` are only needed by the parser, they
+        are retrieved into a temporary folder and not stored in the repository
+    """
+    if output not in ["dict", "array"]:
+        raise ValueError(f"Unknown output format '{output}', use 'dict' or 'array'")
+
+    def decorator(func):
+        func.spex_parser_files = list(files)
+        func.spex_parser_output = output
+        func.spex_parser_kpoint_index = kpoint_index
+        func.spex_parser_temporary = temporary
+        return func
+
+    return decorator
+
+
+@lru_cache(maxsize=None)
+def get_parser_names():
+    """Names of all available additional parsers (nothing is imported)."""
+    names = set(_BUILTIN_PARSERS)
+    names.update(get_entry_point_names(ENTRY_POINT_GROUP))
+    return tuple(sorted(names))
+
+
+@lru_cache(maxsize=None)
+def load_parser(parser_name):
+    """
+    Import and return the parser function registered as `parser_name`.
+
+    :raises ValueError: if there is no such parser
+    """
+    if parser_name in get_entry_point_names(ENTRY_POINT_GROUP):
+        parser = load_entry_point(ENTRY_POINT_GROUP, parser_name)
+    elif parser_name in _BUILTIN_PARSERS:
+        module_name, func_name = _BUILTIN_PARSERS[parser_name].split(":")
+        parser = getattr(importlib.import_module(module_name), func_name)
+    else:
+        raise ValueError(
+            f"Unknown parser '{parser_name}', available are {get_parser_names()}"
+        )
+    if not hasattr(parser, "spex_parser_files"):
+        raise ValueError(
+            f"Parser '{parser_name}' is not decorated with spex_parser"
+        )
+    return parser
+
+
+def get_parser_files(parser_name):
+    """The files needed by the parser `parser_name`."""
+    return load_parser(parser_name).spex_parser_files
+
+
+def is_parser_temporary(parser_name):
+    """True if the files of the parser `parser_name` are retrieved temporarily."""
+    return getattr(load_parser(parser_name), "spex_parser_temporary", False)
+
+
+def run_parser(parser_name, contents, out_dict=None, kpoint_index=None, options=None):
+    """
+    Run the parser `parser_name` on `contents`.
+
+    :return: a dictionary with the results
+    """
+    parser = load_parser(parser_name)
+    if not parser.spex_parser_kpoint_index:
+        kpoint_index = None
+    return parser(
+        parser_name, contents, out_dict, kpoint_index=kpoint_index, options=options
+    )
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# Copyright (c), Forschungszentrum Jülich GmbH, IAS-1/PGI-1, Germany.         #
+#                All rights reserved.                                         #
+# This file is part of the AiiDA-SPEX package.                               #
+#                                                                             #
+# The code is hosted on GitHub at https://github.com/JuDFTteam/aiida-spex     #
+# For further information on the license, see the LICENSE.txt file            #
+# For further information please visit http://www.flapw.de or                 #
+###############################################################################
+"""
+Inventory of the RESTART files of a SPEX calculation.
+
+At the end of the job a small shell snippet writes the size and modification
+time of every restart file into an inventory file, which is retrieved and
+stored by the parser together with the parameters each file depends on. A
+calculation restarting from it stages only the files whose parameters did
+not change. The FLEUR files of the job are listed as well, their fingerprints
+identify the parent files in the cache key of a calculation restarting from
+it. The sha256 of the files is only computed on request
+(``settings["restart_inventory"] = "sha256"``), it reads all the files
+(several GB) within the walltime of the job.
+"""
+import re
+
+_SUFFIX = re.compile(r"\.[0-9]+$")
+
+
+def restart_family(filename):
+    """Name of a restart file without its numbered suffix (spex.sigc.2 -> spex.sigc)."""
+    return _SUFFIX.sub("", filename)
+
+
+def _upper_keys(value):
+    """Upper case all (nested) keys of a spex.inp parameter value."""
+    if isinstance(value, dict):
+        return {str(key).upper(): _upper_keys(val) for key, val in value.items()}
+    return value
+
+
+def restart_parameters(parameters, keys):
+    """
+    The values of the spex.inp `parameters` (keys in any case) a restart
+    file depends on, missing keys are None.
+    """
+    parameters = _upper_keys(parameters or {})
+    return {key: parameters.get(key) for key in keys}
+
+
+def inventory_script(globs, inventory_filename, checksum=False):
+    """
+    Shell snippet writing '<size> mtime:<modification time>  <name>' of every
+    existing file matching `globs` into `inventory_filename`, or
+    '<size> <sha256>  <name>' if `checksum` is True. Symlinks are followed.
+    """
+    if checksum:
+        line = '"$(stat -L -c %s "$f") $(sha256sum "$f")"'
+    else:
+        line = '"$(stat -L -c \'%s mtime:%Y\' "$f")  $f"'
+    return (
+        f"for f in {' '.join(globs)}; do\n"
+        f'  if [ -f "$f" ]; then echo {line}; fi\n'
+        f"done > {inventory_filename}\n"
+    )
+
+
+def parse_inventory(content, pattern):
+    """
+    Parse an inventory file written by `inventory_script`.
+
+    :param pattern: compiled pattern of the restart file names (full match)
+    :return: dictionary {filename: {"size": ..., "mtime": ...}}, with "sha256"
+        instead of "mtime" for an inventory with checksums
+    """
+    inventory = {}
+    for line in content.splitlines():
+        fields = line.split(None, 2)
+        if len(fields) != 3:
+            continue
+        size, fingerprint, filename = fields
+        filename = filename.strip().lstrip("*")
+        if not pattern.fullmatch(filename):
+            continue
+        if fingerprint.startswith("mtime:"):
+            entry = {"size": int(size), "mtime": int(fingerprint[len("mtime:") :])}
+        else:
+            entry = {"size": int(size), "sha256": fingerprint}
+        inventory[filename] = entry
+    return inventory
+
+
+def file_fingerprint(entry):
+    """sha256 of an inventory entry, or its size and modification time."""
+    if "sha256" in entry:
+        return entry["sha256"]
+    return "size:{} mtime:{}".format(entry.get("size"), entry.get("mtime"))
+
+
+def select_restart_files(inventory, parameters, dependencies):
+    """
+    The files of `inventory` that can be reused with the new `parameters`.
+
+    :param inventory: dictionary {filename: {"parameters": ..., ...}}
+    :param parameters: spex.inp parameters of the new calculation
+    :param dependencies: {restart family: [parameter keys]}
+    :return: (reusable, stale) lists of file names
+    """
+    reusable, stale = [], []
+    for filename, entry in inventory.items():
+        keys = dependencies.get(restart_family(filename), [])
+        if entry.get("parameters") == restart_parameters(parameters, keys):
+            reusable.append(filename)
+        else:
+            stale.append(filename)
+    return reusable, stale
@@ -9,11 +9,12 @@
 # For further information please visit http://www.flapw.de or                 #
 ###############################################################################
 
+import mmap
 import re
-# from io import StringIO
+import warnings
+from io import BytesIO, StringIO
 
 import numpy as np
-import pandas as pd
 
 
 def get_run_info(contents):
@@ -119,6 +120,8 @@ def get_unitcell_info(contents):
     match = pattern.findall(contents)
 
     if match:
+        import pandas as pd
+
         k_points_in_ibz = np.array(match)
         k_points_in_ibz = pd.DataFrame(k_points_in_ibz, columns=['k_point_number', 'k_point_coordinates', 'k_point_rlat', 'equivalant_k_points'])
 
@@ -200,15 +203,581 @@ def get_out_info(content):
     return out_info
 
 
+def _clean(value):
+    """
+    Collapse the whitespace of a matched value the same way the regex based
+    ``get_*_info`` functions do.
+    """
+    return re.sub(" +|\n", " ", value.strip())
+
+
+# (key, trigger, pattern) of the fields where only the first occurrence counts.
+# The trigger is a plain substring that has to be in the line before the
+# (more expensive) pattern is tried. Patterns ending with ``(.*)`` take the
+# next non-blank line if nothing follows the label, like ``\s*(.*)`` does.
+_FIRST_MATCH_FIELDS = [
+    ("version", "Version", re.compile(r"Version\s*(\d+[.]\d+\s* \(.*\))")),
+    ("execution_time", "Execution time:", re.compile(r"Execution time:\s*(.*)")),
+    ("compiler", "Compiler:", re.compile(r"Compiler:\s*(.*)")),
+    ("hostname", "Hostname:", re.compile(r"Hostname:\s*(.*)")),
+    ("interfaced_to", "Interfaced to ", re.compile(r"Interfaced to \s*(.*)")),
+    ("mpi", "MPI:", re.compile(r"MPI:\s*(.*)")),
+    ("walltime", "Timing:", re.compile(r"Timing:\s*([0-9]+)\n")),
+    ("number_of_spins", "Number of spins", re.compile(r"Number of spins\s*=\s*(\d+)")),
+    ("number_of_centers", "centers", re.compile(r"centers\s*=\s*(\d+)")),
+    ("number_of_types", "types", re.compile(r"types\s*=\s*(\d+)")),
+    ("equivalent_atoms", "equivalent atoms", re.compile(r"equivalent atoms\s*=\s*(.*)")),
+    ("lattice_parameter", "Lattice parameter", re.compile(r"Lattice parameter\s*=\s*(\d+.\d+)")),
+    ("unit_cell_volume", "Unit-cell volume", re.compile(r"Unit-cell volume\s*=\s*(\d+.\d+)")),
+    ("reciprocal_volume", "Reciprocal volume", re.compile(r"Reciprocal volume\s*=\s*(\d+.\d+)")),
+    ("reciprocal_cutoff", "Reciprocal cutoff", re.compile(r"Reciprocal cutoff\s*=\s*(\d+.\d+)")),
+    (
+        "number_of_symmetry_operations",
+        "Number of symmetry operations",
+        re.compile(r"Number of symmetry operations\s*=\s*(\d+)"),
+    ),
+    (
+        "number_of_valence_electrons",
+        "Number of valence electrons:",
+        re.compile(r"Number of valence electrons:\s*(\d+)"),
+    ),
+    ("number_of_k_points", "Number of k points:", re.compile(r"Number of k points:\s+(\d+)")),
+    ("number_of_k_points_in_ibz", "in IBZ:", re.compile(r"in IBZ:\s+(\d+)")),
+]
+
+# (key, trigger, pattern) of the multi-line blocks, the value is made of the
+# next ``n`` non-blank line segments following the match.
+_BLOCK_FIELDS = [
+    ("primitive_vectors", "Primitive vectors", re.compile(r"Primitive vectors\s*=")),
+    ("reciprocal_vectors", "Reciprocal vectors", re.compile(r"Reciprocal vectors\s*=")),
+    ("unitcell_geometry", "Coord", re.compile(r"#\s+Ty\s+El\s+Coord.\s*")),
+]
+
+# (key, pattern) of the fields where all occurrences are collected.
+_ENERGY_FIELDS = [
+    ("energy_gap", re.compile(r"Energy gap:\s+(-?\d+\.\d+)\s+Ha")),
+    ("fermi_energy", re.compile(r"Fermi energy:\s+(-?\d+\.\d+)\s+Ha")),
+    ("maximal_energy", re.compile(r"Maximal energy:\s+(-?\d+\.\d+)\s+Ha")),
+]
+
+_CONTINUATION_PATTERN = re.compile(r"\s*(.+)")
+_KLIST_PATTERN = re.compile(r"List of k points\s")
+_IBZ_PATTERN = re.compile(
+    r"(\d+)\s+\(((?:-?\d+\.\d+\,?){3})\)\s+\[\s?((?:\s?-?\d+\.\d+\,?\s?){3})\]\s+eq:\s+(\d+)\n"
+)
+_IBZ_COLUMNS = [
+    "k_point_number",
+    "k_point_coordinates",
+    "k_point_rlat",
+    "equivalant_k_points",
+]
+
+
+def scan_spexout(lines):
+    """
+    Single pass, line oriented scanner for the SPEX output file.
+
+    Every header, unit-cell, k-point and energy field of ``get_run_info``,
+    ``get_basic_info``, ``get_unitcell_info`` and ``get_out_info`` is picked up
+    while reading the lines once, instead of sweeping the whole text with one
+    regex per field.
+
+    :param lines: an iterable of lines (with line endings), e.g. an open file
+    :return: a dictionary with the parsed data, same as ``spexout_parser``
+    """
+    found = {}
+    first_match = list(_FIRST_MATCH_FIELDS)
+    blocks = list(_BLOCK_FIELDS)
+    pending = []  # [key, pattern] waiting for the value on a following line
+    collecting = []  # [key, number of segments, collected segments]
+    klist = None  # None: not found, list: collecting, tuple: done
+    energies = {key: [] for key, _ in _ENERGY_FIELDS}
+    ibz = []
+
+    for line in lines:
+        is_blank = not line.strip()
+
+        if pending and not is_blank:
+            for entry in pending[:]:
+                key, pattern = entry
+                pending.remove(entry)
+                match = pattern.match(line)
+                if match and key not in found:
+                    found[key] = _clean(match.group(1))
+
+        if collecting and not is_blank:
+            for entry in collecting[:]:
+                entry[2].append(line)
+                if len(entry[2]) == entry[1]:
+                    found[entry[0]] = _clean(" ".join(entry[2]))
+                    collecting.remove(entry)
+
+        if isinstance(klist, list):
+            if line.endswith("\n") and (klist or not is_blank):
+                if line == "\n":
+                    klist = tuple(klist)
+                else:
+                    klist.append(line)
+            elif not is_blank:
+                klist = tuple(klist)
+
+        if is_blank:
+            continue
+
+        matched = []
+        for field in first_match:
+            key, trigger, pattern = field
+            if trigger not in line:
+                continue
+            match = pattern.search(line if line.endswith("\n") else line + "\n")
+            if not match:
+                continue
+            matched.append(field)
+            value = match.group(1)
+            if value.strip() or not pattern.pattern.endswith("(.*)"):
+                found[key] = _clean(value)
+            else:
+                pending.append([key, _CONTINUATION_PATTERN])
+        for field in matched:
+            first_match.remove(field)
+
+        for field in blocks[:]:
+            key, trigger, pattern = field
+            if trigger not in line:
+                continue
+            match = pattern.search(line)
+            if not match:
+                continue
+            if key == "unitcell_geometry":
+                if "number_of_centers" not in found:
+                    continue
+                n_segments = int(found["number_of_centers"])
+            else:
+                n_segments = 3
+            blocks.remove(field)
+            entry = [key, n_segments, []]
+            rest = line[match.end() :]
+            if rest.strip():
+                entry[2].append(rest)
+            if len(entry[2]) == n_segments:
+                found[key] = _clean(" ".join(entry[2]))
+            else:
+                collecting.append(entry)
+
+        if klist is None and "List of k points" in line:
+            match = _KLIST_PATTERN.search(line)
+            if match:
+                klist = []
+                rest = line[match.end() :]
+                if rest.strip():
+                    klist.append(rest)
+
+        if "eq:" in line:
+            ibz.extend(
+                _IBZ_PATTERN.findall(line if line.endswith("\n") else line + "\n")
+            )
+
+        if "Ha" in line:
+            for key, pattern in _ENERGY_FIELDS:
+                energies[key].extend(pattern.findall(line))
+
+    missing = [
+        key
+        for key in [
+            "walltime",
+            "number_of_spins",
+            "number_of_centers",
+            "number_of_types",
+            "primitive_vectors",
+            "unit_cell_volume",
+            "reciprocal_vectors",
+            "reciprocal_volume",
+            "unitcell_geometry",
+            "number_of_symmetry_operations",
+            "number_of_valence_electrons",
+            "number_of_k_points",
+            "number_of_k_points_in_ibz",
+        ]
+        if key not in found
+    ]
+    if missing:
+        raise ValueError(
+            "Could not find {} in the SPEX output file".format(", ".join(missing))
+        )
+
+    run_info = {
+        key: found.get(key)
+        for key in [
+            "version",
+            "execution_time",
+            "compiler",
+            "hostname",
+            "interfaced_to",
+            "mpi",
+            "walltime",
+        ]
+    }
+    run_info["walltime"] = int(run_info["walltime"])
+
+    basic_info = {
+        key: found.get(key)
+        for key in [
+            "number_of_spins",
+            "number_of_centers",
+            "number_of_types",
+            "equivalent_atoms",
+            "lattice_parameter",
+            "primitive_vectors",
+            "unit_cell_volume",
+            "reciprocal_vectors",
+            "reciprocal_volume",
+            "reciprocal_cutoff",
+        ]
+    }
+    basic_info["primitive_vectors"] = np.array(
+        basic_info["primitive_vectors"].split(), dtype=float
+    ).reshape(3, 3)
+    basic_info["reciprocal_vectors"] = np.array(
+        basic_info["reciprocal_vectors"].split(), dtype=float
+    ).reshape(3, 3)
+    basic_info["number_of_spins"] = int(basic_info["number_of_spins"])
+    basic_info["number_of_centers"] = int(basic_info["number_of_centers"])
+    basic_info["number_of_types"] = int(basic_info["number_of_types"])
+    basic_info["unit_cell_volume"] = float(basic_info["unit_cell_volume"])
+    basic_info["reciprocal_volume"] = float(basic_info["reciprocal_volume"])
+
+    list_of_k_points = []
+    if klist is not None:
+        list_of_k_points = np.array(_clean(" ".join(klist)).split()).reshape(-1, 4)
+
+    unitcell_info = {
+        "unitcell_geometry": np.array(found["unitcell_geometry"].split()).reshape(
+            -1, 6
+        ),
+        "number_of_symmetry_operations": int(found["number_of_symmetry_operations"]),
+        "number_of_valence_electrons": int(found["number_of_valence_electrons"]),
+        "number_of_k_points": int(found["number_of_k_points"]),
+        "number_of_k_points_in_ibz": int(found["number_of_k_points_in_ibz"]),
+        "list_of_k_points": list_of_k_points,
+        "k_points_in_ibz": {
+            column: [match[i] for match in ibz]
+            for i, column in enumerate(_IBZ_COLUMNS)
+        },
+    }
+
+    out_info = {}
+    for key, _ in _ENERGY_FIELDS:
+        if energies[key]:
+            out_info[key] = np.array(energies[key]).astype(float)
+    # the regex version always reports the unit, see get_out_info
+    out_info["energy_unit"] = "Ha"
+
+    return {**run_info, **basic_info, **unitcell_info, **out_info}
+
+
+def iter_lines(content):
+    """
+    Iterate over the lines of a file given either as its content (a string)
+    or as an open file object/any iterable of lines. The latter is consumed
+    lazily, so only one line at a time has to be in memory.
+    """
+    if isinstance(content, str):
+        return StringIO(content)
+    return iter(content)
+
 
 def spexout_parser(spexout_file):
     """
-    spexout_file: a file object
+    spexout_file: the content of the file as a string, or any iterable of lines
+        (e.g. an open file object, which is then streamed)
     returns: a dictionary with the parsed data
     Parse SPEX output file and return a dictionary with the data.
+    The file is read only once, see ``scan_spexout``.
     """
-    run_info = get_run_info(spexout_file)
-    basic_info = get_basic_info(spexout_file)
-    unitcell_info = get_unitcell_info(spexout_file)
-    out_info = get_out_info(spexout_file)
-    return {**run_info, **basic_info, **unitcell_info, **out_info}
+    return scan_spexout(iter_lines(spexout_file))
+
+
+_KPOINT_HEADER = re.compile(r"#{2,} K POINT:\s+(\S+)\s+#{2,}")
+
+
+class KPointIndex:
+    """
+    Index of the K POINT blocks of spex.out and of the DIAGONAL ELEMENTS tables
+    inside them, built in a single pass over the file.
+
+    Only the offsets are kept: character offsets if the content is a string,
+    byte offsets if it is an open file. A table is read from the content only
+    when it is asked for, so the GW, KS and any other per k point parser can
+    share one index and the whole parse stays linear in file size.
+
+    A file which can not seek (e.g. a decompressing stream) is read forward
+    only: the tables are read in the order of the file, skipping the text in
+    between, and the file is reopened with `reopen` only if a table before
+    the current position is asked for.
+    """
+
+    def __init__(self, content, reopen=None):
+        """
+        :param content: spex.out as a string/bytes or as an open file object
+        :param reopen: callable returning a new file object of the content;
+            if given, the file objects are only read forward
+        """
+        if hasattr(content, "buffer"):
+            # text file objects can not seek to computed positions
+            content = content.buffer
+        self._streaming = reopen is not None or (
+            hasattr(content, "seekable") and not content.seekable()
+        )
+        if hasattr(content, "seek") and not self._streaming:
+            content.seek(0)
+        self.content = content
+        self._reopen = reopen
+        # file objects opened with reopen, closed by close()
+        self._reopened = None
+        # k point -> {"start": ..., "end": ..., "tables": [(header, start, end)]}
+        self.blocks = {}
+        self._position = self._build()
+
+    def _lines(self):
+        """Yield (offset, size, line) for every line of the content."""
+        content = self.content
+        if isinstance(content, str):
+            lines = StringIO(content)
+        elif isinstance(content, bytes):
+            lines = BytesIO(content)
+        else:
+            lines = content
+        offset = 0
+        for line in lines:
+            size = len(line)
+            if isinstance(line, bytes):
+                line = line.decode("utf-8", "replace")
+            yield offset, size, line
+            offset += size
+
+    def _build(self):
+        block = None
+        table = None  # [header, start, end]
+        after_title = False
+        end = size = 0
+        line = ""
+        for offset, size, line in self._lines():
+            end = offset + size
+            if table is not None:
+                if line.endswith("\n") and line != "\n":
+                    continue
+                table[2] = offset
+                block["tables"].append(tuple(table))
+                table = None
+            if "K POINT:" in line:
+                match = _KPOINT_HEADER.search(line)
+                if match:
+                    if block is not None:
+                        block["end"] = offset
+                    block = None
+                    after_title = False
+                    if match.group(1) not in self.blocks:
+                        # only the first block of every k point counts
+                        block = {"start": offset, "end": None, "tables": []}
+                        self.blocks[match.group(1)] = block
+                    continue
+            if block is None:
+                continue
+            if "DIAGONAL ELEMENTS" in line:
+                after_title = True
+            elif after_title and line.strip():
+                after_title = False
+                table = [line, end, None]
+        if table is not None:
+            table[2] = end if line.endswith("\n") else end - size
+            block["tables"].append(tuple(table))
+        if block is not None:
+            block["end"] = end
+        return end
+
+    def _read_forward(self, start, end):
+        """Read the bytes between `start` and `end` of a forward only file."""
+        if start < self._position:
+            if self._reopen is None:
+                raise ValueError(
+                    "The file can not be read backwards, the K POINT index "
+                    "needs a `reopen` function for it"
+                )
+            self.close()
+            self._reopened = self.content = self._reopen()
+            self._position = 0
+        skip = start - self._position
+        while skip > 0:
+            data = self.content.read(min(skip, 1 << 20))
+            if not data:
+                break
+            skip -= len(data)
+        data = self.content.read(end - start)
+        self._position = end
+        return data
+
+    def read(self, start, end):
+        """Return the text between the offsets `start` and `end`."""
+        if isinstance(self.content, str):
+            return self.content[start:end]
+        if isinstance(self.content, bytes):
+            return self.content[start:end].decode("utf-8", "replace")
+        if self._streaming:
+            data = self._read_forward(start, end)
+        else:
+            self.content.seek(start)
+            data = self.content.read(end - start)
+        return data.decode("utf-8", "replace")
+
+    def close(self):
+        """Close the file object opened by the index, if any."""
+        if self._reopened is not None:
+            self._reopened.close()
+            self._reopened = None
+
+    @property
+    def k_points(self):
+        """The indexed k points, in the order they appear in the file."""
+        return list(self.blocks.keys())
+
+    def _table_span(self, k_point, header_pattern):
+        """Offsets of the table of `k_point` matching `header_pattern`, or None."""
+        block = self.blocks.get(k_point)
+        if block is None:
+            return None
+        for header, start, end in block["tables"]:
+            if header_pattern.match(header):
+                return start, end
+        return None
+
+    def table(self, k_point, header_pattern):
+        """
+        Return the rows of the first DIAGONAL ELEMENTS table of `k_point`
+        whose header line matches `header_pattern`, or None if there is none.
+        """
+        span = self._table_span(k_point, header_pattern)
+        if span is None:
+            return None
+        return self.read(*span)
+
+    def tables(self, k_points, header_pattern):
+        """
+        Return the rows of the tables of `k_points` (see `table`) as dictionary
+        of the k points which have one. The tables are read in the order of
+        the file, so a forward only file is read once.
+        """
+        spans = []
+        for k_point in k_points:
+            span = self._table_span(k_point, header_pattern)
+            if span is not None:
+                spans.append((span, k_point))
+        return {k_point: self.read(*span) for span, k_point in sorted(spans)}
+
+
+_DIELEC_KEY = re.compile(r"#\s*([^:]+):\s*(.*)")
+_NOT_BLANK = {str: re.compile(r"\S"), bytes: re.compile(rb"\S")}
+
+
+def _map_content(content):
+    """
+    Return `content` as str/bytes. Open files are memory-mapped if possible,
+    the second return value is the mmap to close or None.
+    """
+    if isinstance(content, (str, bytes)):
+        return content, None
+    handle = getattr(content, "buffer", content)
+    try:
+        mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, OSError, ValueError):
+        # no real file (in memory, remote repository) or an empty file
+        handle.seek(0)
+        return handle.read(), None
+    return mapped, mapped
+
+
+def read_dielec(content):
+    """
+    Read a dielecR/dielec spectrum file of SPEX.
+
+    The file is split into blocks at its ``#`` header lines, the numbers of
+    every block are converted in one go with numpy.
+
+    :param content: the file as str/bytes or as an open file object,
+        files on disk are memory-mapped instead of read
+    :return: a dictionary with the arrays ``frequency`` (block, frequency) and
+        ``spectrum`` (block, frequency, re/im) and the list ``blocks`` with the
+        ``key: value`` pairs of the header lines of every block. Blocks with
+        less frequencies (or columns) than the others are padded with NaN,
+        the arrays ``n_frequencies`` and ``n_columns`` give the actual size
+        of every block.
+    :raises ValueError: if a row of a block has text which is not a number
+        or less columns than the first row of the block
+    """
+    data, mapped = _map_content(content)
+    kind = str if isinstance(data, str) else bytes
+    comment, newline = ("#", "\n") if kind is str else (b"#", b"\n")
+    not_blank = _NOT_BLANK[kind]
+    tables, blocks = [], []
+    headers = []
+
+    def _add_block(start, end):
+        first = not_blank.search(data, start, end)
+        if first is None:
+            return
+        first_end = data.find(newline, first.start(), end)
+        first_end = end if first_end < 0 else first_end
+        n_columns = len(data[first.start() : first_end].split())
+        try:
+            with warnings.catch_warnings():
+                # older numpy only warns about text it can not read
+                warnings.simplefilter("error", DeprecationWarning)
+                values = np.fromstring(data[start:end], dtype=float, sep=" ")
+            values = values.reshape(-1, n_columns)
+        except (DeprecationWarning, ValueError) as exc:
+            raise ValueError(
+                f"Malformed block {len(tables) + 1} of the spectrum: {exc}"
+            ) from exc
+        tables.append(values)
+        block = {}
+        for header in headers:
+            if kind is bytes:
+                header = header.decode("utf-8", "replace")
+            match = _DIELEC_KEY.match(header.strip())
+            if match:
+                key = match.group(1).strip().lower().replace(" ", "")
+                block[key] = match.group(2).strip()
+        blocks.append(block)
+        headers.clear()
+
+    try:
+        position = 0
+        size = len(data)
+        while position < size:
+            hash_position = data.find(comment, position)
+            if hash_position < 0:
+                break
+            line_start = data.rfind(newline, position, hash_position) + 1
+            line_start = max(line_start, position)
+            _add_block(position, line_start)
+            line_end = data.find(newline, hash_position)
+            line_end = size if line_end < 0 else line_end + 1
+            headers.append(data[line_start:line_end])
+            position = line_end
+        _add_block(position, size)
+    finally:
+        if mapped is not None:
+            mapped.close()
+
+    n_frequencies = max((len(table) for table in tables), default=0)
+    n_columns = max((table.shape[1] for table in tables), default=1)
+    values = np.full((len(tables), n_frequencies, n_columns), np.nan)
+    for i, table in enumerate(tables):
+        values[i, : table.shape[0], : table.shape[1]] = table
+
+    return {
+        "frequency": values[:, :, 0],
+        "spectrum": values[:, :, 1:],
+        "blocks": blocks,
+        "n_frequencies": np.array([table.shape[0] for table in tables], dtype=int),
+        "n_columns": np.array([table.shape[1] for table in tables], dtype=int),
+    }
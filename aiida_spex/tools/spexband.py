@@ -11,29 +11,30 @@
 
 """
 extracts band data from spex_???.out files
+
+Can be used as a library::
+
+    lat, rlat, nqpts, kcoord = getInfo("data/spex/spex_001.out", "data/spex/qpts")
+    kpts = kpath(kcoord, rlat)
+    spexReBand, spexImBand = spexBand(nqpts, directory="data/spex")
+    writeBand("spexband.csv", kpts, spexReBand, spexImBand, fermiKS, fermiGW)
+
+or from the command line (``spexband --help``).
 """
-import numpy as np
-import csv
-import re
 import argparse
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from aiida_spex.tools import geometry
 
-parser = argparse.ArgumentParser(
-    description="process info which is not available in the metadata"
-)
-parser.add_argument(
-    "--fermiKS",
-    type=float,
-    help="provide fermi energy corresponding to the k-path",
-    required=False,
-)
-parser.add_argument(
-    "--fermiGW",
-    type=float,
-    help="provide fermi energy corresponding to the k-path",
-    required=False,
-)
-
-args = parser.parse_args()
+_LATTICE_START = "Lattice parameter"
+_LATTICE_END = "Unit-cell volume"
+_LATTICE_STRIP = re.compile("[A-Za-z=]*")
+_TABLE_START = "Bd"
+_TABLE_END = re.compile(r"Timing \(quasiparticle equation\)")
 
 
 def reciprocalLattice(lat):
@@ -43,12 +44,7 @@ def reciprocalLattice(lat):
     Returns:
         [array] -- (3X3 numpy) list of reciprocal lattice vectors
     """
-    unitCellVolume = lat[0].dot(np.cross(lat[1], lat[2]))
-    b0 = 2 * np.pi * np.cross(lat[1], lat[2]) / unitCellVolume
-    b1 = 2 * np.pi * np.cross(lat[2], lat[0]) / unitCellVolume
-    b2 = 2 * np.pi * np.cross(lat[0], lat[1]) / unitCellVolume
-    rlat = np.array([b0, b1, b2])
-    return rlat
+    return geometry.reciprocal_lattice(lat)
 
 
 def getInfo(spexOutFileName, qptsFilename):
@@ -64,39 +60,29 @@ def getInfo(spexOutFileName, qptsFilename):
         nqpts -- number of qpts (points in the kpath)
         kcoord -- k-path coordinates
     """
-    START_PATTERN = "Lattice parameter"
-    END_PATTERN = "Unit-cell volume"
     lat = []
     with open(spexOutFileName, "rt") as file:
         match = False
         for line in file:
-            if re.search(START_PATTERN, line):
+            if _LATTICE_START in line:
                 match = True
-                continue
-            elif re.search(END_PATTERN, line):
+            elif _LATTICE_END in line:
                 match = False
-                continue
             elif match:
-                lat.append(
-                    (re.sub("[A-Za-z=]*", "", line)).strip(" ").rstrip("\n").split()
-                )
+                lat.append(_LATTICE_STRIP.sub("", line).split())
 
     lat = np.array(lat).astype(float)
     rlat = reciprocalLattice(lat)
-    qpts = []
-    with open(qptsFilename, "rt") as _qpts:
-        for line in _qpts:
-            qpts.append(line.rstrip("\n").strip(" "))
-
-    qpts = np.array(qpts)
-    nqpts = int(qpts[0].split()[0])
-    scaleqpts = float(qpts[0].split()[1])
 
-    # create k-path from k-coordinates
-    kcoord = []
-    for i in range(1, nqpts + 1):
-        kcoord.append([float(j) / scaleqpts for j in qpts[i].split()[0:3]])
-    kcoord = np.array(kcoord)
+    with open(qptsFilename, "rt") as _qpts:
+        header = _qpts.readline().split()
+        nqpts = int(header[0])
+        scaleqpts = float(header[1])
+        # create k-path from k-coordinates
+        kcoord = np.array(
+            [_qpts.readline().split()[0:3] for _ in range(nqpts)], dtype=float
+        )
+    kcoord = kcoord / scaleqpts
 
     return lat, rlat, nqpts, kcoord
 
@@ -108,105 +94,160 @@ def kpath(kcoord, reciprocalCell):
     Returns:
         [list] -- kpath
     """
-    nkpt = kcoord.shape[0]
-    kpts = np.zeros(nkpt)
-    kpts[0] = np.linalg.norm(reciprocalCell.dot(kcoord[0]))
-    for i in range(1, nkpt):
-        kpts[i] = kpts[i - 1] + np.linalg.norm(
-            reciprocalCell.dot(kcoord[i]) - reciprocalCell.dot(kcoord[i - 1])
-        )
+    cartesian = geometry.internal_to_cartesian(kcoord, np.transpose(reciprocalCell))
+    return geometry.kpath_distances(cartesian, offset=np.linalg.norm(cartesian[0]))
+
+
+def kpathBreaks(kcoord, reciprocalCell):
+    """indices of the high-symmetry points (label positions) of the k-path"""
+    return geometry.kpath_breaks(
+        geometry.internal_to_cartesian(kcoord, np.transpose(reciprocalCell))
+    )
+
+
+def readDiagonal(fileName):
+    """Read the diagonal elements table of one spex_???.out file
+
+    Arguments:
+        fileName {string} -- the spex_???.out file
+    Returns:
+        reDiag, imDiag -- (bands X columns) arrays of the real and imaginary rows
+    """
+    rows = []
+    with open(fileName, "rt") as file:
+        match = False
+        for line in file:
+            if _TABLE_START in line:
+                match = True
+            elif _TABLE_END.search(line):
+                match = False
+            elif match and line.strip():
+                rows.append(line)
+
+    reRows, imRows = rows[0::2], rows[1::2]
+    reDiag = np.array(" ".join(reRows).split(), dtype=float).reshape(len(reRows), -1)
+    imDiag = np.array(" ".join(imRows).split(), dtype=float).reshape(len(imRows), -1)
+    return reDiag, imDiag
 
-    return kpts
-
-
-def spexBand(nqpts):
-    """Collect band informations from the spex_???.out files"""
-    spexReBand = []
-    spexImBand = []
-    START_PATTERN = "Bd"
-    END_PATTERN = "Timing \(quasiparticle equation\)"
-
-    for i in range(1, nqpts + 1):
-        spexOutName = "spex_" + "{0:03}".format(i) + ".out"
-        fileName = "data/spex/" + spexOutName
-        # print(fileName)
-        _diag = []
-        with open(fileName, "rt") as file:
-            match = False
-            for line in file:
-                if re.search(START_PATTERN, line):
-                    match = True
-                    continue
-                elif re.search(END_PATTERN, line):
-                    match = False
-                    continue
-                elif match:
-                    _diag.append(line.rstrip("\n"))
-
-        _diag = np.array(_diag)
-        # twice the number of bands + includes an empty...
-        nbands2 = len(_diag) - 1
-        # ...line line at the end(hence the -1 to remove it)
-
-        reDiag = []
-        imDiag = []
-        for i in range(0, nbands2):
-            if i % 2 == 0:
-                reDiag.append([float(j) for j in _diag[i].split()])
-            if i % 2 != 0:
-                imDiag.append([float(j) for j in _diag[i].split()])
-
-        reDiag = np.array(reDiag)
-        spexReBand.append(reDiag)
-        spexImBand.append(imDiag)
-
-    spexReBand = np.array(spexReBand)
-    spexImBand = np.array(spexImBand)
+
+def spexBand(nqpts, directory="data/spex", processes=None):
+    """Collect band informations from the spex_???.out files
+
+    The files are read in parallel by a pool of `processes` processes
+    (default: number of CPUs, 1 reads them in this process).
+
+    Returns:
+        spexReBand, spexImBand -- (qpts X bands X columns) arrays
+    """
+    fileNames = [
+        os.path.join(directory, "spex_{0:03}.out".format(i)) for i in range(1, nqpts + 1)
+    ]
+
+    if processes == 1:
+        tables = map(readDiagonal, fileNames)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=processes)
+        tables = pool.map(readDiagonal, fileNames, chunksize=max(1, nqpts // 64))
+
+    try:
+        spexReBand = spexImBand = None
+        for iq, (reDiag, imDiag) in enumerate(tables):
+            if spexReBand is None:
+                spexReBand = np.empty((nqpts,) + reDiag.shape)
+                spexImBand = np.empty((nqpts,) + imDiag.shape)
+            spexReBand[iq] = reDiag
+            spexImBand[iq] = imDiag
+    finally:
+        if pool is not None:
+            pool.shutdown()
 
     return spexReBand, spexImBand
 
 
-def writeBand(
-    fileName,
-    kpts,
-    spexReBand,
-    spexImBand,
-):
+def _bandColumns(kpts, spexReBand, spexImBand, fermiKS, fermiGW):
+    """band, k, eKS, eGW, imGW as (bands X k) arrays (the last k point is omitted)"""
+    nkpt = len(kpts) - 1
+    bands = spexReBand[0, :, 0].astype(int)
+    reBand = spexReBand[:nkpt].transpose(1, 0, 2)
+    imBand = spexImBand[:nkpt].transpose(1, 0, 2)
+    return (
+        np.repeat(bands[:, None], nkpt, axis=1),
+        np.broadcast_to(np.asarray(kpts)[:nkpt], (len(bands), nkpt)),
+        reBand[:, :, 5] - fermiKS,
+        reBand[:, :, 7] - fermiGW,
+        imBand[:, :, -2],
+    )
+
+
+def writeBand(fileName, kpts, spexReBand, spexImBand, fermiKS=0.0, fermiGW=0.0):
     """Write to a csv file
     Arguments:
         fileName {string} -- name of the output file
         kpts {list} -- k-path
+        fermiKS, fermiGW {float} -- Fermi energies subtracted from the KS/GW energies
     """
-    iband = int(spexReBand[0][0][0])  # initial band
-    fband = int(spexReBand[0][-1][0])  # final band
-    nkpt = len(kpts)
-    with open(fileName, "w") as csvFile:
-        bandWriter = csv.writer(
-            csvFile, delimiter=",", quotechar="|", quoting=csv.QUOTE_MINIMAL
+    columns = _bandColumns(kpts, spexReBand, spexImBand, fermiKS, fermiGW)
+    values = np.stack([np.ravel(column).astype(object) for column in columns], axis=1)
+    rowFormat = "%d,%.3f,%.3f,%.3f,%.3f\r\n"
+    with open(fileName, "w", newline="") as csvFile:
+        csvFile.write("jband,k,eKS,eGW,imGW\r\n")
+        csvFile.write((rowFormat * len(values)) % tuple(values.ravel()))
+
+
+def writeBandNpz(fileName, kpts, spexReBand, spexImBand, fermiKS=0.0, fermiGW=0.0):
+    """Write the same data as `writeBand` as (bands X k) arrays to a npz file"""
+    band, k, eKS, eGW, imGW = _bandColumns(
+        kpts, spexReBand, spexImBand, fermiKS, fermiGW
+    )
+    np.savez_compressed(
+        fileName, jband=band[:, 0], k=k[0], eKS=eKS, eGW=eGW, imGW=imGW
+    )
+
+
+def main(argv=None):
+    """Command line interface"""
+    parser = argparse.ArgumentParser(
+        description="extracts band data from spex_???.out files"
+    )
+    parser.add_argument(
+        "--fermiKS",
+        type=float,
+        default=0.0,
+        help="provide fermi energy corresponding to the k-path",
+    )
+    parser.add_argument(
+        "--fermiGW",
+        type=float,
+        default=0.0,
+        help="provide fermi energy corresponding to the k-path",
+    )
+    parser.add_argument(
+        "--directory",
+        default="data/spex",
+        help="directory with the spex_???.out and qpts files",
+    )
+    parser.add_argument("--output", default="spexband.csv", help="csv output file")
+    parser.add_argument("--npz", default=None, help="additional npz output file")
+    parser.add_argument(
+        "--processes", type=int, default=None, help="number of reading processes"
+    )
+    args = parser.parse_args(argv)
+
+    lat, rlat, nqpts, kcoord = getInfo(
+        os.path.join(args.directory, "spex_001.out"),
+        os.path.join(args.directory, "qpts"),
+    )
+    kpts = kpath(kcoord, rlat)
+    spexReBand, spexImBand = spexBand(
+        nqpts, directory=args.directory, processes=args.processes
+    )
+    writeBand(args.output, kpts, spexReBand, spexImBand, args.fermiKS, args.fermiGW)
+    if args.npz:
+        writeBandNpz(
+            args.npz, kpts, spexReBand, spexImBand, args.fermiKS, args.fermiGW
         )
-        bandWriter.writerow(["jband", "k", "eKS", "eGW", "imGW"])
-        irun = 0
-        for i in range(iband, fband + 1):
-            for ikpt in range(nkpt - 1):
-                bandWriter.writerow(
-                    [
-                        i,
-                        "{:.3f}".format(kpts[ikpt]),
-                        "{:.3f}".format(spexReBand[ikpt][irun][5] - fermiKS),
-                        "{:.3f}".format(spexReBand[ikpt][irun][7] - fermiGW),
-                        "{:.3f}".format(spexImBand[ikpt][irun][-2]),
-                    ]
-                )
-            irun += 1
-
-
-# EXTRACT
-
-fermiKS = 2.04996
-fermiGW = 2.274363447
-# fermiKS = args.fermiKS
-# fermiGW = args.fermiGW
-lat, rlat, nqpts, kcoord = getInfo("data/spex/spex_001.out", "data/spex/qpts")
-kpts = kpath(kcoord, rlat)
-spexReBand, spexImBand = spexBand(nqpts)
-writeBand("spexband.csv", kpts, spexReBand, spexImBand)
+
+
+if __name__ == "__main__":
+    main()
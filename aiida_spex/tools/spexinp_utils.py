@@ -9,20 +9,16 @@
 # For further information please visit http://www.flapw.de or                 #
 ###############################################################################
 
+import hashlib
+import io
+import json
+import re
 import sys
+
+import numpy as np
+
 from aiida_spex import __version__ as aiida_spex_version
-import pandas as pd
 from aiida.common.exceptions import InputValidationError
-from pydantic import (
-    BaseModel,
-    ValidationError,
-    validator,
-    StrictStr,
-    StrictInt,
-    StrictFloat,
-    Extra,
-)
-from typing import Deque, Dict, FrozenSet, List, Optional, Sequence, Set, Tuple, Union
 
 keyword_reference = {
     "global": [
@@ -121,38 +117,19 @@ keyword_reference = {
 necessary_keys = ["BZ"]
 nonempty_keys = ["BZ", "KPT", "KPTPATH"] + list(keyword_reference["sections"].keys())
 job_spectra = ["DIELEC", "SUSCEP", "SUSCEPR", "SCREEN", "SCREENW"]
+# keywords with a list of values: type of the values
+list_keywords = {"BZ": int, "GAUSS": float}
 
 
 def check_parameters(parameters):
     """
     Check that the given `spex.inp` parameters are valid
+    (keywords only, see `spexinp_validator.validate_parameters`)
     """
-    if parameters:
-        global_keys = list(map(lambda x: x.upper(), parameters.keys()))
-        if not all(elem in global_keys for elem in necessary_keys):
-            # print(f"Some parameters are missing check docuentation for  necessary parameters")
-            return False
-        for key in parameters:
-            key_upper = key.upper()
-            sections = keyword_reference["sections"]
-            sections_list = list(sections.keys())
-            if key_upper in nonempty_keys:
-                if not parameters[key]:
-                    # print(f"{key_upper} cannot be empty")
-                    return False
-
-            if key_upper not in keyword_reference["global"] + sections_list:
-                # print(f"'{key_upper}' not a valid keyword")
-                return False
-
-            if key_upper in sections:
-                for key2 in parameters[key]:
-                    key2_upper = key2.upper()
-                    if key2_upper not in sections[key_upper]:
-                        # print(f"'{key2_upper}' is not a vaid keyword for the section {key_upper}")
-                        return False
-        return True
+    from aiida_spex.tools.spexinp_validator import validate_parameters
 
+    if parameters:
+        return not validate_parameters(parameters, check_types=False)
     else:
         print("No parameters provided")
         return False
@@ -187,13 +164,13 @@ def format_job(val):
                             print(f"Spectral function {key2} must have a range")
                             sys.exit(1)
                         spectra_range += f",{val3['step']}" + "}"
-                        job_string += f"{key3.upper()}:{spectra_range}"
+                        job_string += f"{key3.upper()}:{spectra_range} "
                 else:
                     for key3, val3 in val2.items():  # key3=R, val3=[...]
                         if isinstance(val3, list):
+                            band_range = []
                             for val4 in val3:
-                                band_range = []
-                                if isinstance(val4, list):
+                                if isinstance(val4, (list, tuple)):
                                     start = str(val4[0])
                                     end = str(val4[1])
                                     band_range.append(f"{start}-{end}")
@@ -281,6 +258,10 @@ def format_spex_inp(key, val):
         if val:
             if key == "BZ":
                 spex_inp_string += f"{key} {val[0]} {val[1]} {val[2]}\n"
+            elif key == "KPTPATH":
+                spex_inp_string += format_kptpath({"path": val})
+            elif key in list_keywords:
+                spex_inp_string += f"{key} {' '.join(map(str, val))}\n"
         else:
             spex_inp_string += f"{key}\n"
     return spex_inp_string
@@ -314,21 +295,238 @@ def make_spex_inp(parameters):
     return spex_inp_string
 
 
-def make_energy_inp(energy_inp_dict, with_e="GW"):
+def normalize_parameters(parameters):
     """
-    Make a energy input file from a dictionary of parameters
-    parameters: dictionary of parameters
-    Returns: energy input file in a single string format
+    Canonical form of the `spex.inp` parameters: keys upper case where
+    `make_spex_inp` writes them upper case, section values upper case and
+    strings stripped. Parameters which give the same spex.inp (up to the
+    order of the keywords) have the same canonical form.
+    """
+    normalized = {}
+    for key, val in parameters.items():
+        key_upper = key.upper()
+        if key_upper == "CUSTOM":
+            normalized[key_upper] = val
+        elif key_upper in keyword_reference["sections"] and isinstance(val, dict):
+            normalized[key_upper] = {
+                key2.upper(): val2.strip().upper() if isinstance(val2, str) else val2
+                for key2, val2 in val.items()
+            }
+        elif key_upper == "JOB" and isinstance(val, dict):
+            normalized[key_upper] = {
+                key2: {key3.upper(): val3 for key3, val3 in val2.items()}
+                if isinstance(val2, dict)
+                else val2
+                for key2, val2 in val.items()
+            }
+        elif isinstance(val, str):
+            normalized[key_upper] = val.strip()
+        else:
+            normalized[key_upper] = val
+    return normalized
+
+
+_JOB_BANDS = re.compile(r"(\S+?):\(([^)]*)\)")
+_JOB_SPECTRUM = re.compile(r"(\S+?):\{([^:}]*):([^,}]*),([^}]*)\}")
+_KPT_POINT = re.compile(r"(\S+?)=\(([^)]*)\)")
+_KPTPATH = re.compile(r"\(([^)]*)\)\s*(\S*)")
+# keywords with a value which is not a number
+_STRING_KEYWORDS = frozenset(["DELTAEX", "ENERGY", "ITERATE", "MEM", "MPISPLIT"])
+
+
+def _number(text):
+    """int or float of `text` (also fractions like 1/2), else the text"""
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        if "/" in text:
+            numerator, denominator = text.split("/")
+            return float(numerator) / float(denominator)
+        return float(text)
+    except ValueError:
+        return text
+
+
+def _typed_list(text, item_type):
+    """Values of `text` as list of `item_type`, None if they are not of that type"""
+    values = [_number(val) for val in text.split()]
+    if item_type is int and all(isinstance(val, int) for val in values):
+        return values
+    if item_type is float and all(isinstance(val, (int, float)) for val in values):
+        return [float(val) for val in values]
+    return None
+
+
+def _parse_job(text):
+    """JOB line (without the keyword) to the JOB dictionary of make_spex_inp"""
+    job = {}
+    current = None
+    for token in re.split(r"\s+(?![^(){}]*[)}])", text.strip()):
+        if not token:
+            continue
+        if ":" not in token:
+            current = job.setdefault(token, {})
+            continue
+        if current is None:
+            current = job.setdefault("", {})
+        for key, start, end, step in _JOB_SPECTRUM.findall(token):
+            current[key] = {
+                "range": [_number(start), _number(end)],
+                "step": _number(step),
+            }
+        for key, bands in _JOB_BANDS.findall(token):
+            current[key] = [
+                [_number(part) for part in band.split("-", 1)]
+                if "-" in band
+                else _number(band)
+                for band in bands.split(",")
+                if band.strip()
+            ]
+    return job
+
+
+def parse_spex_inp(content):
+    """
+    Read a spex.inp file into the parameters dictionary of `make_spex_inp`,
+    i.e. make_spex_inp(parse_spex_inp(make_spex_inp(parameters))) gives the
+    same file. Keywords are upper case, lines which can not be represented
+    (e.g. a repeated keyword) are kept in "CUSTOM".
+
+    :param content: text of the spex.inp file
+    :return: dictionary of the parameters
+    """
+    parameters = {}
+    custom = []
+    section = None
+    for line in content.splitlines():
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        fields = line.split(None, 1)
+        key = fields[0].upper()
+        value = fields[1].strip() if len(fields) > 1 else ""
+
+        if section is not None:
+            if key == "END":
+                section = None
+            else:
+                section[key] = value
+            continue
+        if key == "SECTION":
+            section = parameters.setdefault(value.upper(), {})
+            continue
+        if key in parameters and key != "KPT":
+            custom.append(line)
+            continue
+
+        if not value:
+            parameters[key] = None
+        elif key in list_keywords:
+            values = _typed_list(value, list_keywords[key])
+            if values is None:
+                custom.append(line)
+                continue
+            parameters[key] = values
+        elif key == "JOB":
+            parameters[key] = _parse_job(value)
+        elif key == "KPT":
+            kpt = parameters.setdefault(key, {})
+            for label, point in _KPT_POINT.findall(value):
+                kpt[label] = [_number(val.strip()) for val in point.split(",")]
+        elif key == "KPTPATH":
+            match = _KPTPATH.match(value)
+            if match is None:
+                custom.append(line)
+                continue
+            path = [val.strip() for val in match.group(1).split(",")]
+            parameters[key] = {"path": path}
+            if match.group(2):
+                parameters[key]["npoints"] = _number(match.group(2))
+        elif key in _STRING_KEYWORDS:
+            parameters[key] = value
+        else:
+            parameters[key] = _number(value)
+    if custom:
+        parameters["CUSTOM"] = "\n".join(custom)
+    return parameters
+
+
+def _band_ranges(bands):
+    """
+    Bands and band ranges [[4, 6], 8, 7, 1] as sorted, merged band ranges
+    [1, [4, 8]], single bands as numbers.
+    """
+    expanded = set()
+    for band in bands:
+        if isinstance(band, (list, tuple)):
+            expanded.update(range(int(band[0]), int(band[1]) + 1))
+        else:
+            expanded.add(int(band))
+    ranges = []
+    for band in sorted(expanded):
+        if ranges and band == ranges[-1][1] + 1:
+            ranges[-1][1] = band
+        else:
+            ranges.append([band, band])
+    return [start if start == end else [start, end] for start, end in ranges]
+
+
+def _sorted_dict(value):
+    """`value` with all (nested) dictionaries sorted by key"""
+    if isinstance(value, dict):
+        return {key: _sorted_dict(value[key]) for key in sorted(value)}
+    if isinstance(value, (list, tuple)):
+        return [_sorted_dict(val) for val in value]
+    return value
+
+
+def canonical_parameters(parameters):
+    """
+    Canonical form of the `spex.inp` parameters to find equivalent inputs:
+    `normalize_parameters` with upper case job names, the bands of the jobs
+    as sorted, merged band ranges and all keys sorted. It writes a spex.inp
+    equivalent to the one of `parameters`.
     """
-    real_energy_inp_string = f"# ENERGY input file generated by aiida-spex v{aiida_spex_version}\n\n#  n  k s    Energy\n"
-    energy_keys_list = []
+    canonical = normalize_parameters(parameters)
+    job = canonical.get("JOB")
+    if isinstance(job, dict):
+        canonical["JOB"] = {
+            key2.upper(): {
+                key3: _band_ranges(val3)
+                if key2.upper() not in job_spectra and isinstance(val3, (list, tuple))
+                else val3
+                for key3, val3 in val2.items()
+            }
+            if isinstance(val2, dict)
+            else val2
+            for key2, val2 in job.items()
+        }
+    return _sorted_dict(canonical)
+
+
+def canonical_hash(parameters):
+    """sha256 of the canonical form of the `spex.inp` parameters."""
+    canonical = json.dumps(
+        canonical_parameters(parameters), sort_keys=True, default=str
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+_ENERGY_INP_ROW = "  %d %2d %d %9.5f\n"
 
+
+def _energy_inp_columns(energy_inp_dict, with_e):
+    """
+    The Bd, kpoint, spin and energy columns of the parsed results of the
+    parent calculation, as numpy arrays.
+    """
     if "results" in energy_inp_dict.keys():
         results = energy_inp_dict["results"]
         if "real" in results.keys():
             real_energy_inp_dict = results["real"]
-            real_energy_inp_df = pd.DataFrame.from_dict(real_energy_inp_dict)
-            energy_keys_list = list(real_energy_inp_df.columns)
+            energy_keys_list = list(real_energy_inp_dict.keys())
         else:
             raise ValueError(
                 "No Energy_real part found in dictionary(output_parameters_add) of the parent calculation"
@@ -341,50 +539,55 @@ def make_energy_inp(energy_inp_dict, with_e="GW"):
     if with_e not in energy_keys_list:
         raise ValueError(f"{with_e} is not in the parsed output file")
 
-    for i, row in real_energy_inp_df.iterrows():
-        real_energy_inp_string += f"  {int(row['Bd']):d} {int(row['kpoint']):2d} {int(row['spin']):d} {row[with_e]:9.5f}\n"
-    return real_energy_inp_string
-
-
-class SpexInputValidation(BaseModel, extra=Extra.forbid):
-    """
-    Validate the input parameters of the SpexInput class
-    """
-
-    bz: List[StrictInt]
-    chkmism: Optional[None] = None
-    chkolap: Optional[None] = None
-    coresoc: Optional[None] = None
-    cutzero: Optional[None] = None
-    deltaex: Optional[StrictStr] = None
-    energy: Optional[Union[Dict, StrictStr]] = None
-    fixphase: Optional[None] = None
-    gauss: Optional[List[StrictFloat]] = None
-    iterate: Optional[StrictStr] = None
-    kpt: Optional[Dict[StrictStr, List[Union[StrictFloat, StrictInt]]]] = None
-    kptpath: Optional[List[StrictStr]] = None
-    mem: Optional[StrictStr] = None
-    mpikpt: Optional[None] = None
-    mpisplit: Optional[StrictStr] = None
-    nband: Optional[Union[StrictInt, StrictStr, StrictFloat]] = None
-    nosym: Optional[None] = None
-    plussoc: Optional[None] = None
-    restart: Optional[None] = None
-    storebz: Optional[None] = None
-    timing: Optional[None] = None
-    trsoff: Optional[None] = None
-    write: Optional[None] = None
-    wrtkpt: Optional[None] = None
-    job: Optional[Dict] = None
-    analyze: Optional[Dict] = None
-    coulomb: Optional[Dict] = None
-    lapw: Optional[Dict] = None
-    mbasis: Optional[Dict] = None
-    senergy: Optional[Dict] = None
-    suscep: Optional[Dict] = None
-    wannier: Optional[Dict] = None
-    wfprod: Optional[Dict] = None
-    custom: Optional[StrictStr] = None
-
-
-ValidationError = ValidationError
+    keys = ["Bd", "kpoint", "spin", with_e]
+    columns = [np.asarray(real_energy_inp_dict[key], dtype=float) for key in keys]
+    lengths = {key: len(column) for key, column in zip(keys, columns)}
+    if len(set(lengths.values())) > 1:
+        raise ValueError(
+            f"The columns of the parsed energies have different lengths: {lengths}"
+        )
+    # int() of the former row by row writer truncates towards zero as astype
+    return [column.astype(int) for column in columns[:3]] + [columns[3]]
+
+
+def dump_energy_inp(energy_inp_dict, handle, with_e="GW", chunk_size=65536):
+    """
+    Write the energy input file of the parsed results `energy_inp_dict` of
+    the parent calculation into the open text file `handle`. The rows are
+    formatted column-wise, `chunk_size` rows at a time.
+    """
+    bands, kpoints, spins, energies = _energy_inp_columns(energy_inp_dict, with_e)
+    handle.write(
+        f"# ENERGY input file generated by aiida-spex v{aiida_spex_version}\n\n#  n  k s    Energy\n"
+    )
+    for start in range(0, len(energies), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        rows = np.empty((len(energies[chunk]), 4), dtype=object)
+        rows[:, 0] = bands[chunk]
+        rows[:, 1] = kpoints[chunk]
+        rows[:, 2] = spins[chunk]
+        rows[:, 3] = energies[chunk]
+        handle.write((_ENERGY_INP_ROW * len(rows)) % tuple(rows.ravel()))
+
+
+def make_energy_inp(energy_inp_dict, with_e="GW"):
+    """
+    Make a energy input file from a dictionary of parameters
+    parameters: dictionary of parameters
+    Returns: energy input file in a single string format
+    """
+    energy_inp = io.StringIO()
+    dump_energy_inp(energy_inp_dict, energy_inp, with_e=with_e)
+    return energy_inp.getvalue()
+
+
+def __getattr__(name):
+    """
+    The pydantic based input validation is only imported when it is used,
+    so that the submission path does not depend on pydantic.
+    """
+    if name in ["SpexInputValidation", "ValidationError"]:
+        from aiida_spex.tools import spexinp_validation
+
+        return getattr(spexinp_validation, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# Copyright (c), Forschungszentrum Jülich GmbH, IAS-1/PGI-1, Germany.         #
+#                All rights reserved.                                         #
+# This file is part of the AiiDA-SPEX package.                               #
+#                                                                             #
+# The code is hosted on GitHub at https://github.com/JuDFTteam/aiida-spex     #
+# For further information on the license, see the LICENSE.txt file            #
+# For further information please visit http://www.flapw.de or                 #
+###############################################################################
+"""
+pydantic model of the `spex.inp` parameters, imported on demand via
+`aiida_spex.tools.spexinp_utils`.
+"""
+from pydantic import (
+    BaseModel,
+    ValidationError,
+    validator,
+    StrictStr,
+    StrictInt,
+    StrictFloat,
+    Extra,
+)
+from typing import Dict, List, Optional, Union
+
+
+class SpexInputValidation(BaseModel, extra=Extra.forbid):
+    """
+    Validate the input parameters of the SpexInput class
+    """
+
+    bz: List[StrictInt]
+    chkmism: Optional[None] = None
+    chkolap: Optional[None] = None
+    coresoc: Optional[None] = None
+    cutzero: Optional[None] = None
+    deltaex: Optional[StrictStr] = None
+    energy: Optional[Union[Dict, StrictStr]] = None
+    fixphase: Optional[None] = None
+    gauss: Optional[List[StrictFloat]] = None
+    iterate: Optional[StrictStr] = None
+    kpt: Optional[Dict[StrictStr, List[Union[StrictFloat, StrictInt]]]] = None
+    kptpath: Optional[List[StrictStr]] = None
+    mem: Optional[StrictStr] = None
+    mpikpt: Optional[None] = None
+    mpisplit: Optional[StrictStr] = None
+    nband: Optional[Union[StrictInt, StrictStr, StrictFloat]] = None
+    nosym: Optional[None] = None
+    plussoc: Optional[None] = None
+    restart: Optional[None] = None
+    storebz: Optional[None] = None
+    timing: Optional[None] = None
+    trsoff: Optional[None] = None
+    write: Optional[None] = None
+    wrtkpt: Optional[None] = None
+    job: Optional[Dict] = None
+    analyze: Optional[Dict] = None
+    coulomb: Optional[Dict] = None
+    lapw: Optional[Dict] = None
+    mbasis: Optional[Dict] = None
+    senergy: Optional[Dict] = None
+    suscep: Optional[Dict] = None
+    wannier: Optional[Dict] = None
+    wfprod: Optional[Dict] = None
+    custom: Optional[StrictStr] = None
+
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# Copyright (c), Forschungszentrum Jülich GmbH, IAS-1/PGI-1, Germany.         #
+#                All rights reserved.                                         #
+# This file is part of the AiiDA-SPEX package.                               #
+#                                                                             #
+# The code is hosted on GitHub at https://github.com/JuDFTteam/aiida-spex     #
+# For further information on the license, see the LICENSE.txt file            #
+# For further information please visit http://www.flapw.de or                 #
+###############################################################################
+"""
+Validation of the `spex.inp` parameters for many inputs.
+
+The keywords of `keyword_reference` are compiled once into a trie of
+keyword paths (global keyword -> section keyword), the value types are the
+ones of the pydantic model `SpexInputValidation`. Keywords are case
+insensitive, as in `make_spex_inp`. The results are memoized by the
+canonical hash of the parameters, so parameters repeated in a batch (or
+validated again with their hash) are checked once.
+"""
+from aiida_spex.tools.spexinp_utils import (  # pylint: disable=unused-import
+    canonical_hash,
+    keyword_reference,
+    list_keywords,
+    necessary_keys,
+    nonempty_keys,
+)
+
+# keyword trie: global keyword -> frozenset of its section keywords (or None)
+_KEYWORD_TRIE = {key: None for key in keyword_reference["global"]}
+_KEYWORD_TRIE.update(
+    {key: frozenset(val) for key, val in keyword_reference["sections"].items()}
+)
+_NECESSARY_KEYS = frozenset(necessary_keys)
+_NONEMPTY_KEYS = frozenset(nonempty_keys)
+
+# errors by (canonical hash, check_types)
+_VALIDATION_CACHE = {}
+_VALIDATION_CACHE_SIZE = 65536
+
+
+def _is_int(val):
+    return isinstance(val, int) and not isinstance(val, bool)
+
+
+def _is_float(val):
+    return isinstance(val, float)
+
+
+def _is_str(val):
+    return isinstance(val, str)
+
+
+def _is_none(val):
+    return val is None
+
+
+def _list_of(check):
+    return lambda val: isinstance(val, (list, tuple)) and all(
+        check(item) for item in val
+    )
+
+
+def _optional(check):
+    return lambda val: val is None or check(val)
+
+
+# value types of SpexInputValidation, keywords without an entry accept any value
+_VALUE_TYPES = {
+    "DELTAEX": (_optional(_is_str), "a string"),
+    "ENERGY": (
+        _optional(lambda val: isinstance(val, (dict, str))),
+        "a dict or string",
+    ),
+    "ITERATE": (_optional(_is_str), "a string"),
+    "KPT": (
+        _optional(
+            lambda val: isinstance(val, dict)
+            and all(
+                _is_str(k) and _list_of(lambda x: _is_int(x) or _is_float(x))(v)
+                for k, v in val.items()
+            )
+        ),
+        "a dict of lists of numbers",
+    ),
+    "KPTPATH": (
+        _optional(
+            lambda val: _list_of(_is_str)(val)
+            or (isinstance(val, dict) and _list_of(_is_str)(val.get("path")))
+        ),
+        "a list of strings or a dict with the 'path'",
+    ),
+    "MEM": (_optional(_is_str), "a string"),
+    "MPISPLIT": (_optional(_is_str), "a string"),
+    "NBAND": (
+        _optional(lambda val: _is_int(val) or _is_float(val) or _is_str(val)),
+        "a number or string",
+    ),
+    "JOB": (_optional(lambda val: isinstance(val, dict)), "a dict"),
+    "CUSTOM": (_optional(_is_str), "a string"),
+}
+# the same list keywords as parse_spex_inp
+_ITEM_TYPES = {int: (_is_int, "integers"), float: (_is_float, "floats")}
+_VALUE_TYPES.update(
+    {
+        key: (
+            _optional(_list_of(_ITEM_TYPES[item_type][0])),
+            f"a list of {_ITEM_TYPES[item_type][1]}",
+        )
+        for key, item_type in list_keywords.items()
+    }
+)
+_VALUE_TYPES.update(
+    {
+        key: (_is_none, "empty (None)")
+        for key in [
+            "CHKMISM",
+            "CHKOLAP",
+            "CORESOC",
+            "CUTZERO",
+            "FIXPHASE",
+            "MPIKPT",
+            "NOSYM",
+            "PLUSSOC",
+            "RESTART",
+            "STOREBZ",
+            "TIMING",
+            "TRSOFF",
+            "WRITE",
+            "WRTKPT",
+        ]
+    }
+)
+_VALUE_TYPES.update(
+    {
+        key: (_optional(lambda val: isinstance(val, dict)), "a dict")
+        for key in keyword_reference["sections"]
+    }
+)
+
+
+def _validate(parameters, check_types):
+    """Errors of the parameters, see `validate_parameters`."""
+    if not parameters:
+        return ["No parameters provided"]
+    errors = []
+    keys = {key.upper() for key in parameters}
+    for key in sorted(_NECESSARY_KEYS - keys):
+        errors.append(f"'{key}' is necessary")
+    for key, val in parameters.items():
+        key_upper = key.upper()
+        if key_upper not in _KEYWORD_TRIE:
+            errors.append(f"'{key_upper}' not a valid keyword")
+            continue
+        if key_upper in _NONEMPTY_KEYS and not val:
+            errors.append(f"{key_upper} cannot be empty")
+            continue
+        if check_types and key_upper in _VALUE_TYPES:
+            check, expected = _VALUE_TYPES[key_upper]
+            if not check(val):
+                errors.append(f"{key_upper} must be {expected}, got {val!r}")
+                continue
+        section_keys = _KEYWORD_TRIE[key_upper]
+        if section_keys is not None and isinstance(val, dict):
+            for key2 in val:
+                if key2.upper() not in section_keys:
+                    errors.append(
+                        f"'{key2.upper()}' is not a valid keyword "
+                        f"for the section {key_upper}"
+                    )
+    return errors
+
+
+def validate_parameters(parameters, check_types=True, parameters_hash=None):
+    """
+    Validate the `spex.inp` parameters.
+
+    :param parameters: dictionary of the parameters
+    :param check_types: also check the types of the values
+    :param parameters_hash: `canonical_hash` of the parameters, if given the
+        errors are memoized by it (the errors do not change under
+        `canonical_parameters`). Validating a single dictionary is cheaper
+        than hashing it, so the hash is not computed here.
+    :return: list of error messages, empty if the parameters are valid
+    """
+    if parameters_hash is None:
+        return _validate(parameters, check_types)
+    key = (parameters_hash, check_types)
+    if key not in _VALIDATION_CACHE:
+        if len(_VALIDATION_CACHE) >= _VALIDATION_CACHE_SIZE:
+            _VALIDATION_CACHE.clear()
+        _VALIDATION_CACHE[key] = tuple(_validate(parameters, check_types))
+    return list(_VALIDATION_CACHE[key])
+
+
+def validate_parameters_batch(parameters_list, check_types=True, hashes=None):
+    """
+    Validate a list of `spex.inp` parameter dictionaries. Parameters with the
+    same canonical hash (e.g. of a parameter sweep) are validated once.
+
+    :param hashes: the `canonical_hash` of each item, computed if not given
+    :return: list with the list of error messages of each item
+    """
+    if hashes is None:
+        hashes = [
+            canonical_hash(parameters) if parameters else None
+            for parameters in parameters_list
+        ]
+    return [
+        validate_parameters(
+            parameters, check_types=check_types, parameters_hash=parameters_hash
+        )
+        for parameters, parameters_hash in zip(parameters_list, hashes)
+    ]
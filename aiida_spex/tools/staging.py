@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# Copyright (c), Forschungszentrum Jülich GmbH, IAS-1/PGI-1, Germany.         #
+#                All rights reserved.                                         #
+# This file is part of the AiiDA-SPEX package.                               #
+#                                                                             #
+# The code is hosted on GitHub at https://github.com/JuDFTteam/aiida-spex     #
+# For further information on the license, see the LICENSE.txt file            #
+# For further information please visit http://www.flapw.de or                 #
+###############################################################################
+"""
+Staging of the files of a parent calculation.
+
+Files of a parent on another computer are packed into one compressed
+archive there, fetched into a local cache and uploaded with the new
+calculation, which unpacks it before SPEX starts. The cached archives are
+named by the sha256 of the packed files, so the same parent files are
+fetched only once. The cache is limited in size, the least recently used
+archives are removed when it grows beyond it (``settings["staging_cache_size"]``,
+default `DEFAULT_CACHE_SIZE`). It can also be emptied by hand with
+``prune_cache(max_bytes=0)``.
+
+Parent files on the same computer can be shared instead: they are copied
+once into a staging directory named by the hash of the parent, every SPEX
+job links to it and leaves a reference marker (jobs restarting from a SPEX
+job which linked its files link the same staging directory), and the
+directory is removed when the last job releasing it is cleaned. Filling and
+releasing a staging directory hold a lock (``flock``) on it. The work chains
+clean their jobs with `clean_workdir` (``clean_workdir=True``); jobs cleaned
+by hand have to be cleaned with it as well, ``verdi calcjob cleanworkdir``
+does not release the reference and leaves the staging directory behind::
+
+    from aiida_spex.tools.staging import clean_workdir
+    clean_workdir(load_node(PK))
+"""
+import hashlib
+import os
+import shlex
+import shutil
+import time
+
+from aiida.common.exceptions import InputValidationError
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "aiida-spex", "staging"
+)
+# bytes
+DEFAULT_CACHE_SIZE = 10 * 1024**3
+# age in seconds after which a partial download is considered abandoned
+_PARTIAL_MAX_AGE = 24 * 60 * 60
+
+
+def parse_checksums(content):
+    """
+    Parse the output of sha256sum.
+
+    :return: sorted list of (filename, sha256)
+    """
+    checksums = []
+    for line in content.splitlines():
+        fields = line.split(None, 1)
+        if len(fields) == 2:
+            checksums.append((fields[1].strip().lstrip("*"), fields[0]))
+    return sorted(checksums)
+
+
+def manifest_key(checksums):
+    """Content hash of a set of files given as (filename, sha256) pairs."""
+    manifest = "".join(f"{sha256}  {filename}\n" for filename, sha256 in checksums)
+    return hashlib.sha256(manifest.encode("utf-8")).hexdigest()
+
+
+def _remote_checksums(transport, filenames):
+    """sha256 of the existing files of `filenames` in the current directory."""
+    # globs are expanded by the remote shell, missing files are ignored
+    _, stdout, _ = transport.exec_command_wait(
+        "sha256sum {} 2>/dev/null".format(" ".join(filenames))
+    )
+    return parse_checksums(stdout)
+
+
+def prune_cache(cache_dir=None, max_bytes=DEFAULT_CACHE_SIZE, keep=()):
+    """
+    Remove the least recently used archives of the staging cache until it
+    holds at most `max_bytes`, and abandoned partial downloads. Archives
+    already placed into an upload folder are hard links, they stay valid.
+
+    :param keep: paths of archives which are not removed
+    :return: list of the removed files
+    """
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    if not os.path.isdir(cache_dir):
+        return []
+    keep = {os.path.abspath(path) for path in keep}
+    now = time.time()
+    removed = []
+    archives = []
+    for entry in os.scandir(cache_dir):
+        if not entry.is_file():
+            continue
+        stat = entry.stat()
+        if entry.name.endswith(".part"):
+            if now - stat.st_mtime > _PARTIAL_MAX_AGE:
+                removed.append(entry.path)
+        elif entry.name.endswith(".tar.gz"):
+            archives.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in archives)
+    for _, size, path in sorted(archives):
+        if total <= max_bytes:
+            break
+        if os.path.abspath(path) in keep:
+            continue
+        removed.append(path)
+        total -= size
+
+    for path in removed:
+        try:
+            os.remove(path)
+        except FileNotFoundError:  # removed by a concurrent submission
+            pass
+    return removed
+
+
+def fetch_parent_files(
+    remote_folder, filenames, cache_dir=None, logger=None, max_bytes=None
+):
+    """
+    Pack the files `filenames` (glob patterns allowed) of the RemoteData
+    `remote_folder` into a tar.gz archive and fetch it into the local cache.
+    Missing files are skipped. Afterwards the cache is pruned to `max_bytes`
+    (default `DEFAULT_CACHE_SIZE`), see `prune_cache`.
+
+    :return: (path of the local archive, list of the packed file names)
+    """
+    if max_bytes is None:
+        max_bytes = DEFAULT_CACHE_SIZE
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+
+    with remote_folder.get_authinfo().get_transport() as transport:
+        transport.chdir(remote_folder.get_remote_path())
+        checksums = _remote_checksums(transport, filenames)
+        if not checksums:
+            raise InputValidationError(
+                "None of the files {} found in the parent folder {}".format(
+                    filenames, remote_folder.get_remote_path()
+                )
+            )
+        packed = [filename for filename, _ in checksums]
+        archive = os.path.join(cache_dir, manifest_key(checksums) + ".tar.gz")
+
+        if os.path.isfile(archive):
+            # the modification time orders the archives by their last use
+            os.utime(archive)
+            if logger:
+                logger.info(f"parent files found in the staging cache: {archive}")
+            return archive, packed
+
+        # the archive is written to a temporary file, the parent folder is not touched
+        retval, stdout, stderr = transport.exec_command_wait(
+            'archive=$(mktemp) && tar -czf "$archive" {} && echo "$archive"'.format(
+                " ".join(shlex.quote(filename) for filename in packed)
+            )
+        )
+        if retval != 0:
+            raise InputValidationError(
+                f"Packing the parent files failed: {stderr.strip()}"
+            )
+        remote_archive = stdout.strip().splitlines()[-1]
+        try:
+            transport.getfile(remote_archive, archive + ".part")
+        finally:
+            transport.remove(remote_archive)
+        os.replace(archive + ".part", archive)
+
+    if logger:
+        logger.info(f"parent files {packed} fetched into the staging cache: {archive}")
+    removed = prune_cache(cache_dir, max_bytes, keep=[archive])
+    if removed and logger:
+        logger.info(f"removed {len(removed)} files from the staging cache")
+    return archive, packed
+
+
+def place_archive(archive, path):
+    """Put a cached archive into the upload folder, as hard link if possible."""
+    try:
+        os.link(archive, path)
+    except OSError:
+        shutil.copyfile(archive, path)
+
+
+def unpack_script(archive_name):
+    """Shell snippet unpacking the uploaded archive in the working directory."""
+    return f"tar -xzf {archive_name} && rm -f {archive_name}\n"
+
+
+SHARED_STAGING_DIR = "aiida_spex_staging"
+# written into the working directory of a job using a shared staging directory
+SHARED_STAGING_MARKER = ".aiida_spex_staging"
+
+
+def _staging_lock(staging):
+    """Lock file of the staging directory `staging`, kept next to it."""
+    root, key = os.path.split(staging)
+    return os.path.join(root, f".{key}.lock")
+
+
+def fill_shared_staging(remote_folder, filenames, key, ref, root=None):
+    """
+    Copy the files `filenames` (glob patterns allowed) of the RemoteData
+    `remote_folder` once into the shared staging directory `key` on the same
+    computer, and add the reference marker `ref` to it. Missing files are
+    skipped. The directory is filled under a temporary name and renamed when
+    complete, so concurrent jobs never see a partial copy. The check and the
+    reference are done holding the lock of the directory, so a concurrent
+    `release_shared_staging` can not remove it in between.
+
+    :param root: parent directory of the staging directories, default
+                 ``aiida_spex_staging`` in the work directory of the computer
+    :return: (path of the staging directory, list of the staged file names)
+    """
+    with remote_folder.get_authinfo().get_transport() as transport:
+        if root is None:
+            workdir = remote_folder.computer.get_workdir().format(
+                username=transport.whoami()
+            )
+            root = os.path.join(workdir, SHARED_STAGING_DIR)
+        staging = os.path.join(root, key)
+        script = (
+            "mkdir -p {root} && ( flock 9 && "
+            "if [ ! -e {staging}/.complete ]; then "
+            "cd {source} && tmp=$(mktemp -d {root}/.{key}.XXXXXX) && "
+            "for f in {filenames}; do "
+            'if [ -f "$f" ]; then cp -p "$f" "$tmp"/; fi; done && '
+            'touch "$tmp"/.complete && '
+            '{{ mv -T "$tmp" {staging} 2>/dev/null || rm -rf "$tmp"; }}; fi && '
+            "mkdir -p {staging}/.refs && touch {staging}/.refs/{ref} && "
+            "ls {staging} ) 9>{lock}"
+        ).format(
+            root=shlex.quote(root),
+            source=shlex.quote(remote_folder.get_remote_path()),
+            staging=shlex.quote(staging),
+            lock=shlex.quote(_staging_lock(staging)),
+            key=key,
+            ref=ref,
+            filenames=" ".join(filenames),
+        )
+        retval, stdout, stderr = transport.exec_command_wait(script)
+        if retval != 0:
+            raise InputValidationError(
+                f"Filling the shared staging directory failed: {stderr.strip()}"
+            )
+    return staging, stdout.split()
+
+
+def release_shared_staging(remote_folder, ref):
+    """
+    Remove the reference marker `ref` of the job with the working directory
+    `remote_folder` (a RemoteData) from its shared staging directory, and
+    remove the staging directory if it was the last reference.
+
+    :return: True if the staging directory was removed
+    """
+    script = (
+        "cd {workdir} && [ -f {marker} ] && staging=$(cat {marker}) && "
+        'lock="$(dirname "$staging")/.$(basename "$staging").lock" && '
+        '( flock 9 && rm -f "$staging"/.refs/{ref} && '
+        'if rmdir "$staging"/.refs 2>/dev/null; then '
+        'rm -rf "$staging" && echo removed; fi ) 9>"$lock"'
+    ).format(
+        workdir=shlex.quote(remote_folder.get_remote_path()),
+        marker=SHARED_STAGING_MARKER,
+        ref=ref,
+    )
+    with remote_folder.get_authinfo().get_transport() as transport:
+        _, stdout, _ = transport.exec_command_wait(script)
+    return stdout.strip() == "removed"
+
+
+def clean_workdir(calc):
+    """
+    Clean the remote working directory of the SPEX calculation `calc` and
+    release its shared staging directory first.
+    """
+    remote_folder = calc.outputs.remote_folder
+    release_shared_staging(remote_folder, calc.uuid)
+    remote_folder._clean()  # pylint: disable=protected-access
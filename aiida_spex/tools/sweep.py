@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# Copyright (c), Forschungszentrum Jülich GmbH, IAS-1/PGI-1, Germany.         #
+#                All rights reserved.                                         #
+# This file is part of the AiiDA-SPEX package.                               #
+#                                                                             #
+# The code is hosted on GitHub at https://github.com/JuDFTteam/aiida-spex     #
+# For further information on the license, see the LICENSE.txt file            #
+# For further information please visit http://www.flapw.de or                 #
+###############################################################################
+"""
+Parameter sweeps of SPEX calculations.
+
+A sweep is a base parameter dictionary and sweep axes, every axis a keyword
+path (``"NBAND"``, ``"MBASIS/GCUT"`` or ``("MBASIS", "GCUT")``) with a list
+of values. The points are generated lazily, validated in one batch and
+deduplicated by their `canonical_hash`: points equivalent to an earlier
+point of the sweep, and points with a finished SpexCalculation of equivalent
+parameters (found with one query), are dropped before submission.
+
+Example of use::
+
+    plan = plan_sweep(
+        base, {"NBAND": [100, 200], "MBASIS/GCUT": [2.9, 3.4]}, parent_folder=remote
+    )
+    for point in plan["new"]:
+        params = Dict(dict=point.parameters)
+        inputs = get_inputs_spex(code, remote, options, params=params)
+"""
+import copy
+import itertools
+from collections import namedtuple
+
+from aiida_spex.tools.spexinp_utils import canonical_hash
+from aiida_spex.tools.spexinp_validator import validate_parameters_batch
+
+# values: the value of each axis, parameters: the full parameter dictionary
+SweepPoint = namedtuple("SweepPoint", ["values", "parameters", "parameters_hash"])
+
+
+def _axis_path(axis):
+    """Keyword path of a sweep axis, as tuple of keywords."""
+    if isinstance(axis, str):
+        return tuple(axis.split("/"))
+    return tuple(axis)
+
+
+def _set_path(parameters, path, value):
+    """
+    Set the keyword `path` of `parameters` to `value`, in place. Keywords are
+    matched case insensitive, missing sections are created.
+    """
+    target = parameters
+    for i, key in enumerate(path):
+        existing = next((k for k in target if k.upper() == key.upper()), key.upper())
+        if i == len(path) - 1:
+            target[existing] = value
+        else:
+            if not isinstance(target.get(existing), dict):
+                target[existing] = {}
+            target = target[existing]
+
+
+def sweep_points(base, axes, mode="product"):
+    """
+    Generate the parameters of a sweep lazily.
+
+    :param base: dictionary of the parameters common to all points
+    :param axes: dictionary of keyword path: list of values
+    :param mode: "product" for all combinations of the values, "zip" for the
+                 n-th values of all axes together (the axes have to have the
+                 same length)
+    :return: generator of (dictionary axis: value, parameters)
+    """
+    axis_names = list(axes)
+    paths = [_axis_path(axis) for axis in axis_names]
+    if mode == "product":
+        combinations = itertools.product(*axes.values())
+    elif mode == "zip":
+        if len({len(values) for values in axes.values()}) > 1:
+            raise ValueError("The axes of a zipped sweep must have the same length")
+        combinations = zip(*axes.values())
+    else:
+        raise ValueError(f"Unknown sweep mode '{mode}', use 'product' or 'zip'")
+
+    for combination in combinations:
+        parameters = copy.deepcopy(base)
+        for path, value in zip(paths, combination):
+            _set_path(parameters, path, value)
+        yield dict(zip(axis_names, combination)), parameters
+
+
+def finished_calculations(hashes, parent_folder=None):
+    """
+    Finished SpexCalculations (exit status 0) with the given parameter hashes,
+    looked up with one query.
+
+    :param hashes: `canonical_hash` of the parameters
+    :param parent_folder: if given, only calculations with this parent_folder
+    :return: dictionary parameters hash: uuid of a calculation
+    """
+    from aiida.orm import CalcJobNode, RemoteData
+    from aiida.orm.querybuilder import QueryBuilder
+    from aiida.plugins import CalculationFactory
+
+    hashes = list(set(hashes))
+    if not hashes:
+        return {}
+    SpexCalculation = CalculationFactory("spex.spex")
+    hash_attribute = f"attributes.{SpexCalculation._PARAMETERS_HASH_ATTRIBUTE}"
+
+    qb = QueryBuilder()
+    calc_kwargs = {}
+    if parent_folder is not None:
+        qb.append(RemoteData, filters={"uuid": parent_folder.uuid}, tag="parent")
+        calc_kwargs = {"with_incoming": "parent"}
+    qb.append(
+        CalcJobNode,
+        filters={
+            "process_type": {"==": "aiida.calculations:spex.spex"},
+            "attributes.exit_status": {"==": 0},
+            hash_attribute: {"in": hashes},
+        },
+        project=[hash_attribute, "uuid"],
+        **calc_kwargs,
+    )
+    return {parameters_hash: uuid for parameters_hash, uuid in qb.iterall()}
+
+
+def plan_sweep(
+    base,
+    axes,
+    mode="product",
+    parent_folder=None,
+    check_types=True,
+    skip_finished=True,
+):
+    """
+    Expand, validate and deduplicate a parameter sweep before submission.
+
+    :param base: dictionary of the parameters common to all points
+    :param axes: dictionary of keyword path: list of values, see `sweep_points`
+    :param mode: "product" or "zip", see `sweep_points`
+    :param parent_folder: RemoteData the points will run on, finished
+                          calculations are only matched with this parent
+    :param check_types: also check the types of the values
+    :param skip_finished: drop the points with a finished SpexCalculation
+    :return: dictionary with the lists ``new`` (SweepPoints to submit),
+             ``duplicate`` (SweepPoints equivalent to an earlier point),
+             ``invalid`` ((SweepPoint, errors)) and ``finished``
+             ((SweepPoint, uuid of the finished calculation))
+    """
+    plan = {"new": [], "invalid": [], "duplicate": [], "finished": []}
+    seen = set()
+    points = []
+    for values, parameters in sweep_points(base, axes, mode=mode):
+        point = SweepPoint(values, parameters, canonical_hash(parameters))
+        if point.parameters_hash in seen:
+            plan["duplicate"].append(point)
+            continue
+        seen.add(point.parameters_hash)
+        points.append(point)
+
+    errors = validate_parameters_batch(
+        [point.parameters for point in points],
+        check_types=check_types,
+        hashes=[point.parameters_hash for point in points],
+    )
+    valid = []
+    for point, point_errors in zip(points, errors):
+        if point_errors:
+            plan["invalid"].append((point, point_errors))
+        else:
+            valid.append(point)
+
+    finished = {}
+    if skip_finished:
+        finished = finished_calculations(
+            [point.parameters_hash for point in valid], parent_folder=parent_folder
+        )
+    for point in valid:
+        if point.parameters_hash in finished:
+            plan["finished"].append((point, finished[point.parameters_hash]))
+        else:
+            plan["new"].append(point)
+    return plan
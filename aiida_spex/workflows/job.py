@@ -25,7 +25,8 @@ from aiida.common.exceptions import NotExistent, InputValidationError
 from aiida.engine import ToContext, WorkChain
 from aiida.engine import calcfunction as cf
 from aiida.engine import if_, while_
-from aiida.orm import CalcJobNode, Code, Dict, RemoteData, load_node
+from aiida.orm import CalcJobNode, Code, Dict, RemoteData, Str, load_node
+from aiida.orm.nodes.data.base import to_aiida_type
 
 from aiida_spex.tools.common_spex_wf import (
     find_last_submitted_calcjob,
@@ -34,7 +35,8 @@ from aiida_spex.tools.common_spex_wf import (
 )
 from aiida_spex.workflows.base_spex import SpexBaseWorkChain
 from aiida_spex.tools.spex_io import get_err_info
-from aiida_spex.tools.spexinp_utils import SpexInputValidation, ValidationError
+from aiida_spex.tools.spexinp_utils import canonical_parameters, parse_spex_inp
+from aiida_spex.tools.spexinp_validator import validate_parameters
 
 
 class SpexJobWorkChain(WorkChain):
@@ -49,6 +51,7 @@ class SpexJobWorkChain(WorkChain):
 
     :param wf_parameters: (Dict), Workchain Specifications
     :param calc_parameters: (Dict), Spexinp Parameters
+    :param raw_parameters: (Str), content of a spex.inp file instead of the parameters
     :param remote_data: (RemoteData), from a Fleur calculation
     :param spex: (Code)
 
@@ -77,6 +80,13 @@ class SpexJobWorkChain(WorkChain):
 
         # spec.input('calc_parameters', valid_type=Dict, required=False)
         spec.input("parameters", valid_type=Dict, required=False)
+        spec.input(
+            "raw_parameters",
+            valid_type=Str,
+            required=False,
+            serializer=to_aiida_type,
+            help="Content of a spex.inp file, used if no parameters are given.",
+        )
         spec.input("remote_data", valid_type=RemoteData, required=False)
 
         spec.input("settings", valid_type=Dict, required=False)
@@ -165,12 +175,22 @@ class SpexJobWorkChain(WorkChain):
         """
         Validate input parameters
         """
-        try:
-            SpexInputValidation(**self.inputs.parameters.get_dict())
-        except ValidationError as e:
+        if "parameters" in self.inputs:
+            self.ctx.parameters = self.inputs.parameters
+        elif "raw_parameters" in self.inputs:
+            # read the spex.inp, linked to the raw input in the provenance
+            self.ctx.parameters = parse_raw_parameters(self.inputs.raw_parameters)
+        else:
+            return self.exit_codes.ERROR_INVALID_INPUT_PARAM
+
+        errors = validate_parameters(self.ctx.parameters.get_dict())
+        if errors:
             raise InputValidationError(
-                "Found following error in input parameters: {}".format(e)
+                "Found following error in input parameters: {}".format(
+                    "; ".join(errors)
+                )
             )
+
     def run_spex(self):
         """
         run a SPEX calculation
@@ -190,10 +210,7 @@ class SpexJobWorkChain(WorkChain):
         else:
             remote = None
 
-        if "parameters" in self.inputs:
-            params = self.inputs.parameters
-        else:
-            return self.exit_codes.ERROR_INVALID_INPUT_PARAM
+        params = self.ctx.parameters
 
         if "description" in self.inputs:
             description = self.inputs.description
@@ -383,3 +400,12 @@ def create_spexjob_result_node(**kwargs):
 
     outdict["output_spexjob_wc_para"] = outputnode
     return outdict
+
+
+@cf
+def parse_raw_parameters(raw_parameters):
+    """
+    Read the content of a spex.inp file into the parameters of a SPEX calculation,
+    in canonical form.
+    """
+    return Dict(dict=canonical_parameters(parse_spex_inp(raw_parameters.value)))
@@ -0,0 +1,408 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# Copyright (c), Forschungszentrum Jülich GmbH, IAS-1/PGI-1, Germany.         #
+#                All rights reserved.                                         #
+# This file is part of the AiiDA-SPEX package.                               #
+#                                                                             #
+# The code is hosted on GitHub at https://github.com/JuDFTteam/aiida-spex     #
+# For further information on the license, see the LICENSE.txt file            #
+# For further information please visit http://www.flapw.de or                 #
+###############################################################################
+
+"""
+In this module you find the workchain 'SpexKpointWorkChain', which splits
+the k points of a SPEX JOB into chunks, runs them as concurrent SPEX
+calculations on the same parent and merges the parsed results.
+
+NOTICE: every chunk recalculates what does not depend on the k points of the
+JOB (e.g. the screened interaction), unless the parameters contain RESTART.
+Then the first chunk runs alone and the other chunks restart from its
+working directory, so its RESTART files (spex.cor, spex.wcou, ...) are reused.
+
+A JOB on the k points of the KPTPATH is split along the path, by the
+length of its segments in reciprocal space. The lattice is taken from the
+structure input, or from the FLEUR parent. The chunks share the end points
+of their sub-paths, the merged results have every k point once, numbered
+along the whole path.
+
+With ``settings["shared_staging"] = True`` the chunks on the computer of the
+parent link one shared copy of its files instead of copying them each, the
+chunks restarting from the first chunk link the same copy as well (see
+`aiida_spex.tools.staging`).
+"""
+
+from __future__ import absolute_import
+
+import six
+from aiida.common.exceptions import InputValidationError, NotExistent
+from aiida.engine import ToContext, WorkChain, append_
+from aiida.engine import calcfunction as cf
+from aiida.engine import if_
+from aiida.orm import ArrayData, Bool, Code, Dict, Int, RemoteData, Str, StructureData
+from aiida.orm.nodes.data.base import to_aiida_type
+
+from aiida_spex.tools.add_results import (
+    merge_add_results,
+    renumber_kpoints,
+    resolve_add_results,
+    split_add_results,
+)
+from aiida_spex.tools.common_spex_wf import find_last_submitted_calcjob, get_inputs_spex
+from aiida_spex.tools.kpoint_chunks import split_kpoints, splits_kptpath
+from aiida_spex.tools.spexinp_utils import canonical_parameters
+from aiida_spex.tools.spexinp_validator import validate_parameters
+from aiida_spex.workflows.base_spex import SpexBaseWorkChain
+from aiida_spex.workflows.job import parse_raw_parameters
+
+
+class SpexKpointWorkChain(WorkChain):
+    """
+    Workchain running the k points of a SPEX JOB as concurrent calculations.
+
+    :param wf_parameters: (Dict), Workchain Specifications
+        n_chunks: number of calculations the k points are split into
+        share_restart: run the first chunk alone and restart the others from
+            it, if the parameters contain RESTART
+    :param parameters: (Dict), Spexinp Parameters
+    :param raw_parameters: (Str), content of a spex.inp file instead of the parameters
+    :param remote_data: (RemoteData), from a Fleur calculation
+    :param structure: (StructureData), to split a KPTPATH by the length of its
+        segments, default the structure of the Fleur calculation
+    :param spex: (Code)
+
+    :return: output_kpoints_wc_para (Dict), Information of workflow results
+        output_parameters_add (Dict), merged results of the additional parsers
+        output_arrays_add (ArrayData), merged arrays of the additional parsers,
+            if the chunks stored their results as arrays
+    """
+
+    _workflowversion = "1.0.0"
+    _default_wf_para = {"n_chunks": 2, "share_restart": True, "serial": False}
+
+    _default_options = {
+        "resources": {"num_machines": 1, "num_mpiprocs_per_machine": 1},
+        "max_wallclock_seconds": 6 * 60 * 60,
+        "queue_name": "",
+        "custom_scheduler_commands": "",
+        "import_sys_environment": False,
+        "environment_variables": {},
+    }
+
+    @classmethod
+    def define(cls, spec):
+        super().define(spec)
+        spec.input("spex", valid_type=Code, required=True)
+        spec.input("options", valid_type=Dict, required=False)
+        spec.input("wf_parameters", valid_type=Dict, required=False)
+        spec.input("parameters", valid_type=Dict, required=False)
+        spec.input(
+            "raw_parameters",
+            valid_type=Str,
+            required=False,
+            serializer=to_aiida_type,
+            help="Content of a spex.inp file, used if no parameters are given.",
+        )
+        spec.input("remote_data", valid_type=RemoteData, required=True)
+        spec.input("structure", valid_type=StructureData, required=False)
+        spec.input("settings", valid_type=Dict, required=False)
+        spec.outline(
+            cls.start,
+            cls.validate_input,
+            cls.split_job,
+            if_(cls.should_run_first_chunk)(
+                cls.run_first_chunk,
+                cls.inspect_first_chunk,
+            ),
+            cls.run_chunks,
+            cls.inspect_chunks,
+            cls.return_results,
+        )
+
+        spec.output("output_kpoints_wc_para", valid_type=Dict)
+        spec.output("output_parameters_add", valid_type=Dict, required=False)
+        spec.output("output_arrays_add", valid_type=ArrayData, required=False)
+
+        spec.exit_code(
+            130, "ERROR_INVALID_INPUT_PARAM", message="Invalid workchain parameters."
+        )
+        spec.exit_code(
+            102,
+            "ERROR_SPEX_CALC_FAILED",
+            message="SPEX calculation failed for unknown reason.",
+        )
+
+    def start(self):
+        """
+        init context and some parameters
+        """
+        self.report(
+            "INFO: started k-point workflow version {}".format(self._workflowversion)
+        )
+
+        self.ctx.chunks = []
+        self.ctx.restart_folder = None
+        self.ctx.successful = True
+        self.ctx.total_wall_time = 0
+        self.ctx.errors = []
+
+        wf_dict = self._default_wf_para.copy()
+        if "wf_parameters" in self.inputs:
+            wf_dict.update(self.inputs.wf_parameters.get_dict())
+        self.ctx.wf_dict = wf_dict
+
+        options = self._default_options.copy()
+        if "options" in self.inputs:
+            options = self.inputs.options.get_dict()
+            for key, val in six.iteritems(self._default_options):
+                options[key] = options.get(key, val)
+        self.ctx.options = options
+
+        self.ctx.description_wf = (
+            self.inputs.get("description", "") + "|spex_kpoints_wc|"
+        )
+        self.ctx.label_wf = self.inputs.get("label", "spex_kpoints_wc")
+
+    def validate_input(self):
+        """
+        Validate input parameters
+        """
+        if "parameters" in self.inputs:
+            self.ctx.parameters = self.inputs.parameters
+        elif "raw_parameters" in self.inputs:
+            self.ctx.parameters = parse_raw_parameters(self.inputs.raw_parameters)
+        else:
+            return self.exit_codes.ERROR_INVALID_INPUT_PARAM
+
+        errors = validate_parameters(self.ctx.parameters.get_dict())
+        if errors:
+            raise InputValidationError(
+                "Found following error in input parameters: {}".format(
+                    "; ".join(errors)
+                )
+            )
+        if int(self.ctx.wf_dict["n_chunks"]) < 1:
+            return self.exit_codes.ERROR_INVALID_INPUT_PARAM
+
+    def split_job(self):
+        """
+        Split the k points of the JOB into the parameters of the chunks
+        """
+        split_inputs = {}
+        self.ctx.shared_kpoints = splits_kptpath(self.ctx.parameters.get_dict())
+        if self.ctx.shared_kpoints:
+            structure = self._get_structure()
+            if structure is not None:
+                split_inputs["structure"] = structure
+        chunks = split_kpoint_parameters(
+            self.ctx.parameters, Int(self.ctx.wf_dict["n_chunks"]), **split_inputs
+        )
+        self.ctx.chunk_parameters = [chunks[key] for key in sorted(chunks)]
+        self.report(
+            "INFO: JOB split into {} chunks".format(len(self.ctx.chunk_parameters))
+        )
+
+    def _get_structure(self):
+        """
+        structure input, or the structure of the Fleur parent, None if unknown
+        """
+        if "structure" in self.inputs:
+            return self.inputs.structure
+        try:
+            fleurinp = self.inputs.remote_data.creator.inputs.fleurinp
+            return fleurinp.get_structuredata_ncf()
+        except (AttributeError, ValueError) as exc:
+            self.report(
+                "WARNING: no structure of the parent ({}), the KPTPATH is split "
+                "into segments of equal weight".format(exc)
+            )
+            return None
+
+    def _submit_chunk(self, index, remote):
+        """
+        submit the SpexBaseWorkChain of a chunk
+        """
+        inputs_builder = get_inputs_spex(
+            self.inputs.spex,
+            remote,
+            self.ctx.options.copy(),
+            label="{} chunk {}".format(self.ctx.label_wf, index),
+            description=self.ctx.description_wf,
+            settings=self.inputs.get("settings"),
+            params=self.ctx.chunk_parameters[index],
+            serial=self.ctx.wf_dict["serial"],
+        )
+        return self.submit(SpexBaseWorkChain, **inputs_builder)
+
+    def should_run_first_chunk(self):
+        """
+        run the first chunk alone if the other chunks can restart from it
+        """
+        keys = {key.upper() for key in self.ctx.parameters.get_dict()}
+        return (
+            self.ctx.wf_dict["share_restart"]
+            and "RESTART" in keys
+            and len(self.ctx.chunk_parameters) > 1
+        )
+
+    def run_first_chunk(self):
+        """
+        run the first chunk, which writes the RESTART files
+        """
+        self.report("INFO: run SPEX chunk 0, the others restart from it")
+        future = self._submit_chunk(0, self.inputs.remote_data)
+        return ToContext(chunks=append_(future))
+
+    def inspect_first_chunk(self):
+        """
+        check the first chunk before the others restart from it
+        """
+        first_chunk = self.ctx.chunks[0]
+        if not first_chunk.is_finished_ok:
+            return self.control_end_wc(
+                "ERROR: SPEX chunk 0 failed with exit status {}".format(
+                    first_chunk.exit_status
+                )
+            )
+        self.ctx.restart_folder = first_chunk.outputs.remote_folder
+
+    def run_chunks(self):
+        """
+        run the remaining chunks concurrently
+        """
+        remote = self.ctx.restart_folder or self.inputs.remote_data
+        for index in range(len(self.ctx.chunks), len(self.ctx.chunk_parameters)):
+            future = self._submit_chunk(index, remote)
+            self.report("INFO: run SPEX chunk {}".format(index))
+            self.to_context(chunks=append_(future))
+
+    def inspect_chunks(self):
+        """
+        check that all chunks finished successfully
+        """
+        failed = [
+            index
+            for index, chunk in enumerate(self.ctx.chunks)
+            if not chunk.is_finished_ok
+        ]
+        if failed:
+            return self.control_end_wc(
+                "ERROR: SPEX chunks {} failed".format(", ".join(map(str, failed)))
+            )
+
+    def return_results(self):
+        """
+        merge the results of the chunks
+        """
+        chunk_uuids = []
+        add_results = {}
+        for index, chunk in enumerate(self.ctx.chunks):
+            try:
+                chunk_uuids.append(find_last_submitted_calcjob(chunk))
+            except NotExistent:
+                chunk_uuids.append(None)
+            if not chunk.is_finished_ok:
+                continue
+            walltime = chunk.outputs.output_parameters.get_dict().get("walltime")
+            if isinstance(walltime, int):
+                self.ctx.total_wall_time = self.ctx.total_wall_time + walltime
+            if hasattr(chunk.outputs, "output_parameters_add"):
+                add_results["chunk_{:03d}".format(index)] = (
+                    chunk.outputs.output_parameters_add
+                )
+                if hasattr(chunk.outputs, "output_arrays_add"):
+                    add_results["arrays_{:03d}".format(index)] = (
+                        chunk.outputs.output_arrays_add
+                    )
+
+        outputnode_dict = {}
+        outputnode_dict["workflow_name"] = self.__class__.__name__
+        outputnode_dict["workflow_version"] = self._workflowversion
+        outputnode_dict["successful"] = self.ctx.successful
+        outputnode_dict["number_of_chunks"] = len(self.ctx.chunk_parameters)
+        outputnode_dict["chunk_calc_uuids"] = chunk_uuids
+        outputnode_dict["total_wall_time"] = self.ctx.total_wall_time
+        outputnode_dict["total_wall_time_units"] = "s"
+        outputnode_dict["errors"] = self.ctx.errors
+
+        self.out(
+            "output_kpoints_wc_para",
+            create_kpoints_result_node(outpara=Dict(dict=outputnode_dict)),
+        )
+        if self.ctx.successful and add_results:
+            add_results["shared_kpoints"] = Bool(self.ctx.shared_kpoints)
+            self.out_many(merge_kpoint_results(**add_results))
+
+    def control_end_wc(self, errormsg):
+        """
+        Controlled way to shutdown the workchain. will initialize the output nodes
+        """
+        self.ctx.successful = False
+        self.report(errormsg)
+        self.ctx.errors.append(errormsg)
+        self.return_results()
+        return self.exit_codes.ERROR_SPEX_CALC_FAILED
+
+
+@cf
+def split_kpoint_parameters(parameters, n_chunks, structure=None):
+    """
+    Split the k points of the JOB of the parameters into the parameters of
+    at most n_chunks calculations, in canonical form. A KPTPATH is split by
+    the length of its segments with the lattice of the structure.
+    """
+    lattice = structure.cell if structure is not None else None
+    chunks = split_kpoints(parameters.get_dict(), n_chunks.value, lattice=lattice)
+    return {
+        "chunk_{:03d}".format(index): Dict(dict=canonical_parameters(chunk))
+        for index, chunk in enumerate(chunks)
+    }
+
+
+@cf
+def merge_kpoint_results(**kwargs):
+    """
+    Merge the output_parameters_add of the chunks (chunk_000, ...), with
+    the arrays of the chunks stored as arrays (arrays_000, ...). If the chunks
+    stored arrays, the merged arrays are stored as arrays again.
+
+    The k points of the tables are numbered along all chunks. With
+    shared_kpoints (sub-paths of a KPTPATH) the first k point of every chunk
+    but the first one is the last k point of the chunk before, it is kept once.
+    """
+    shared_kpoints = kwargs.get("shared_kpoints")
+    results_list = []
+    for key in sorted(key for key in kwargs if key.startswith("chunk_")):
+        results = kwargs[key].get_dict()
+        array_key = key.replace("chunk_", "arrays_")
+        if array_key in kwargs:
+            results = resolve_add_results(results, kwargs[array_key])
+        results_list.append(results)
+    renumber_kpoints(
+        results_list,
+        shared_boundaries=shared_kpoints is not None and shared_kpoints.value,
+    )
+    merged = merge_add_results(results_list)
+    if not any(key.startswith("arrays_") for key in kwargs):
+        return {"output_parameters_add": Dict(dict=merged)}
+
+    summary, arrays = split_add_results(merged)
+    array_node = ArrayData()
+    for array_name, array in arrays.items():
+        array_node.set_array(array_name, array)
+    return {
+        "output_parameters_add": Dict(dict=summary),
+        "output_arrays_add": array_node,
+    }
+
+
+@cf
+def create_kpoints_result_node(outpara):
+    """
+    This is a pseudo wf, to create the output node of the workchain in the database.
+    """
+    outputnode = outpara.clone()
+    outputnode.label = "output_kpoints_wc_para"
+    outputnode.description = (
+        "Contains results and information of an spex_kpoints_wc run."
+    )
+    return outputnode
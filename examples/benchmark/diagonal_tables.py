@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# Copyright (c), Forschungszentrum Jülich GmbH, IAS-1/PGI-1, Germany.         #
+#                All rights reserved.                                         #
+# This file is part of the AiiDA-SPEX package.                               #
+#                                                                             #
+# The code is hosted on GitHub at https://github.com/JuDFTteam/aiida-spex     #
+# For further information on the license, see the LICENSE.txt file            #
+# For further information please visit http://www.flapw.de or                 #
+###############################################################################
+"""
+Compares the batched NumPy decoder of the GW diagonal element tables
+(decode_diagonal_tables) with the former one DataFrame per k point approach.
+
+usage: python diagonal_tables.py [--kpoints 1000] [--bands 100] [--spins 1]
+"""
+# pylint: disable=invalid-name
+import argparse
+import time
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+
+from aiida_spex.tools.add_parsers import (
+    GW_IMAG_FIELDS,
+    GW_REAL_FIELDS,
+    _GW_TABLE_HEADER,
+    decode_diagonal_tables,
+    read_kpoint_tables,
+    structured_to_dict,
+)
+from aiida_spex.tools.spex_io import KPointIndex, spexout_parser
+from synthetic_spexout import make_spexout
+
+
+def get_gw_energies(kpt_energies, k_point, number_of_spins):
+    """The former decoder: one DataFrame per k point."""
+    df = pd.read_csv(StringIO(kpt_energies), sep=r"\s+", header=None)
+    diag_r = pd.DataFrame()
+    diag_i = pd.DataFrame()
+    diag_r[GW_REAL_FIELDS] = df.iloc[::2]
+    diag_i[GW_IMAG_FIELDS] = df.iloc[1::2].dropna(axis=1, how="all")
+    diag_i.reset_index(drop=True, inplace=True)
+    diag_r.reset_index(drop=True, inplace=True)
+    diag_r["Bd"] = diag_r["Bd"].astype(int)
+    diag_i["Bd"] = diag_r["Bd"]
+    diag_r["kpoint"] = int(k_point)
+    diag_i["kpoint"] = int(k_point)
+    if number_of_spins == 2:
+        spins = np.ones(diag_r.shape[0], dtype=int)
+        spins[1::2] += 1
+        diag_r["spin"] = spins
+        diag_i["spin"] = spins
+    else:
+        diag_r["spin"] = 1
+        diag_i["spin"] = 1
+    return diag_r, diag_i
+
+
+def dataframe_decoder(tables, k_points, number_of_spins):
+    """Decode all k points with get_gw_energies and concatenate."""
+    r_energies = []
+    i_energies = []
+    for k_point in k_points:
+        rdf, idf = get_gw_energies(tables[k_point], k_point, number_of_spins)
+        r_energies.append(rdf)
+        i_energies.append(idf)
+    energies_real = pd.concat(r_energies, axis=0, ignore_index=True)
+    energies_imag = pd.concat(i_energies, axis=0, ignore_index=True)
+    return energies_real.to_dict("list"), energies_imag.to_dict("list")
+
+
+def numpy_decoder(tables, k_points, number_of_spins):
+    """Decode all k points with decode_diagonal_tables."""
+    real, imag = decode_diagonal_tables(
+        tables, k_points, number_of_spins, GW_REAL_FIELDS, GW_IMAG_FIELDS
+    )
+    return structured_to_dict(real), structured_to_dict(imag)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--kpoints", type=int, default=1000)
+    parser.add_argument("--bands", type=int, default=100)
+    parser.add_argument("--spins", type=int, default=1)
+    args = parser.parse_args()
+
+    content = make_spexout(
+        n_kpoints=args.kpoints, n_bands=args.bands, n_spins=args.spins
+    )
+    out_dict = spexout_parser(content)
+    k_points = out_dict["list_of_k_points"][:, 0]
+    tables = read_kpoint_tables(KPointIndex(content), _GW_TABLE_HEADER, k_points)
+
+    start = time.perf_counter()
+    reference = dataframe_decoder(tables, k_points, args.spins)
+    t_pandas = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = numpy_decoder(tables, k_points, args.spins)
+    t_numpy = time.perf_counter() - start
+
+    assert result == reference, "the decoders do not agree"
+    print(
+        "{} k points x {} rows   DataFrame per k point: {:.3f} s   batched NumPy: {:.3f} s   speedup: {:.1f}x".format(
+            args.kpoints,
+            len(result[0]["Bd"]) // args.kpoints,
+            t_pandas,
+            t_numpy,
+            t_pandas / t_numpy,
+        )
+    )
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# Copyright (c), Forschungszentrum Jülich GmbH, IAS-1/PGI-1, Germany.         #
+#                All rights reserved.                                         #
+# This file is part of the AiiDA-SPEX package.                               #
+#                                                                             #
+# The code is hosted on GitHub at https://github.com/JuDFTteam/aiida-spex     #
+# For further information on the license, see the LICENSE.txt file            #
+# For further information please visit http://www.flapw.de or                 #
+###############################################################################
+"""
+Compares the column-wise energy.inp writer (dump_energy_inp) with the former
+DataFrame.iterrows() writer and checks that the files are byte-identical.
+
+usage: python energy_inp.py [--kpoints 1000] [--bands 200] [--spins 2]
+"""
+# pylint: disable=invalid-name
+import argparse
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+from aiida_spex import __version__ as aiida_spex_version
+from aiida_spex.tools.spexinp_utils import dump_energy_inp
+
+
+def iterrows_energy_inp(energy_inp_dict, with_e="GW"):
+    """The former writer: one formatted string per DataFrame row."""
+    real_energy_inp_string = f"# ENERGY input file generated by aiida-spex v{aiida_spex_version}\n\n#  n  k s    Energy\n"
+    real_energy_inp_df = pd.DataFrame.from_dict(energy_inp_dict["results"]["real"])
+    for _, row in real_energy_inp_df.iterrows():
+        real_energy_inp_string += f"  {int(row['Bd']):d} {int(row['kpoint']):2d} {int(row['spin']):d} {row[with_e]:9.5f}\n"
+    return real_energy_inp_string
+
+
+def make_results(n_kpoints, n_bands, n_spins, seed=0):
+    """Parsed GW results of a parent as stored in output_parameters_add."""
+    rng = np.random.default_rng(seed)
+    nrows = n_kpoints * n_bands * n_spins
+    return {
+        "results": {
+            "real": {
+                "Bd": np.tile(np.arange(1, n_bands + 1), n_kpoints * n_spins).tolist(),
+                "kpoint": np.repeat(np.arange(1, n_kpoints + 1), n_bands * n_spins).tolist(),
+                "spin": np.tile(np.repeat(np.arange(1, n_spins + 1), n_bands), n_kpoints).tolist(),
+                "KS": rng.uniform(-20, 20, nrows).tolist(),
+                "GW": rng.uniform(-20, 20, nrows).tolist(),
+            }
+        }
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--kpoints", type=int, default=1000)
+    parser.add_argument("--bands", type=int, default=200)
+    parser.add_argument("--spins", type=int, default=2)
+    args = parser.parse_args()
+
+    results = make_results(args.kpoints, args.bands, args.spins)
+
+    start = time.perf_counter()
+    reference = iterrows_energy_inp(results)
+    t_iterrows = time.perf_counter() - start
+
+    start = time.perf_counter()
+    handle = io.StringIO()
+    dump_energy_inp(results, handle)
+    result = handle.getvalue()
+    t_columns = time.perf_counter() - start
+
+    assert result == reference, "the energy.inp files are not byte-identical"
+    print(
+        "{} rows   iterrows: {:.3f} s   column-wise: {:.3f} s   speedup: {:.1f}x".format(
+            len(results["results"]["real"]["Bd"]),
+            t_iterrows,
+            t_columns,
+            t_iterrows / t_columns,
+        )
+    )
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# Copyright (c), Forschungszentrum Jülich GmbH, IAS-1/PGI-1, Germany.         #
+#                All rights reserved.                                         #
+# This file is part of the AiiDA-SPEX package.                               #
+#                                                                             #
+# The code is hosted on GitHub at https://github.com/JuDFTteam/aiida-spex     #
+# For further information on the license, see the LICENSE.txt file            #
+# For further information please visit http://www.flapw.de or                 #
+###############################################################################
+"""
+Compares the single pass spex.out scanner (spexout_parser) with the
+regex based get_*_info functions on large synthetic outputs.
+
+usage: python spexout_parser.py [--kpoints 2000] [--bands 200]
+"""
+# pylint: disable=invalid-name
+import argparse
+import time
+
+import numpy as np
+
+from aiida_spex.tools.spex_io import (
+    get_basic_info,
+    get_out_info,
+    get_run_info,
+    get_unitcell_info,
+    spexout_parser,
+)
+from synthetic_spexout import make_spexout
+
+
+def regex_parser(content):
+    """The regex based parser, one full-text sweep per field."""
+    run_info = get_run_info(content)
+    basic_info = get_basic_info(content)
+    unitcell_info = get_unitcell_info(content)
+    out_info = get_out_info(content)
+    return {**run_info, **basic_info, **unitcell_info, **out_info}
+
+
+def assert_same(result, reference):
+    """Check that both parsers return the same dictionary."""
+    assert list(result.keys()) == list(reference.keys()), "keys differ"
+    for key, val in reference.items():
+        if isinstance(val, np.ndarray):
+            assert np.array_equal(result[key], val), key
+        else:
+            assert result[key] == val, key
+
+
+def timeit(func, content, repeat):
+    """Best wall time of `repeat` runs."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(content)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--kpoints", type=int, nargs="+", default=[100, 1000, 4000])
+    parser.add_argument("--bands", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for n_kpoints in args.kpoints:
+        content = make_spexout(n_kpoints=n_kpoints, n_bands=args.bands)
+        assert_same(spexout_parser(content), regex_parser(content))
+        t_regex = timeit(regex_parser, content, args.repeat)
+        t_scan = timeit(spexout_parser, content, args.repeat)
+        print(
+            "{:6d} k points {:8.1f} MB   regex: {:8.3f} s   single pass: {:8.3f} s   speedup: {:6.1f}x".format(
+                n_kpoints,
+                len(content) / 1e6,
+                t_regex,
+                t_scan,
+                t_regex / t_scan,
+            )
+        )
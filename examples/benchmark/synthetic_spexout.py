@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# Copyright (c), Forschungszentrum Jülich GmbH, IAS-1/PGI-1, Germany.         #
+#                All rights reserved.                                         #
+# This file is part of the AiiDA-SPEX package.                               #
+#                                                                             #
+# The code is hosted on GitHub at https://github.com/JuDFTteam/aiida-spex     #
+# For further information on the license, see the LICENSE.txt file            #
+# For further information please visit http://www.flapw.de or                 #
+###############################################################################
+"""
+Generates synthetic SPEX output files (spex.out) of arbitrary size
+for the benchmarks in this folder.
+"""
+import random
+
+
+def make_spexout(n_kpoints=10, n_bands=20, n_spins=1, job="GW", seed=0):
+    """
+    Make the content of a synthetic spex.out of a GW (or KS) calculation
+    with `n_kpoints` k points and `n_bands` bands per k point.
+
+    :return: the file content as a string
+    """
+    rng = random.Random(seed)
+    lines = [
+        "################################################################################",
+        "#                                                                              #",
+        "#                     SPEX  Version 05.00 (spex05.00pre42)                     #",
+        "#                                                                              #",
+        "################################################################################",
+        "",
+        "Execution time: 2021-03-04  12:34:56",
+        "Compiler:       GNU 11.2.0",
+        "Hostname:       jrc0001",
+        "Interfaced to   FLEUR MaX-R5.1",
+        "MPI:            4 processes",
+        "",
+        "Number of spins = {}".format(n_spins),
+        "Lattice parameter  =   10.26000",
+        "Primitive vectors  =    0.00000   0.50000   0.50000",
+        "                        0.50000   0.00000   0.50000",
+        "                        0.50000   0.50000   0.00000",
+        "Unit-cell volume   =  270.00980",
+        "Reciprocal vectors =   -1.00000   1.00000   1.00000",
+        "                        1.00000  -1.00000   1.00000",
+        "                        1.00000   1.00000  -1.00000",
+        "Reciprocal volume  =    0.91868",
+        "Reciprocal cutoff  =    4.50000",
+        "",
+        "Number of centers  =  2",
+        "Number of types    =  1",
+        "equivalent atoms   =  1 1",
+        "#  Ty  El              Coord.",
+        "   1   1  Si    0.12500  0.12500  0.12500",
+        "   2   1  Si   -0.12500 -0.12500 -0.12500",
+        "",
+        "Number of symmetry operations =  48",
+        "Number of valence electrons:  8",
+        "",
+        "Number of k points:  {}".format(n_kpoints),
+        "  in IBZ:  {}".format(n_kpoints),
+    ]
+    for k in range(1, n_kpoints + 1):
+        x, y, z = (rng.random() for _ in range(3))
+        lines.append(
+            "  {}  ({:.5f},{:.5f},{:.5f})  [ {:.5f}, {:.5f}, {:.5f}]  eq:  {}".format(
+                k, x, y, z, x, y, z, k
+            )
+        )
+    lines += ["", "List of k points"]
+    for k in range(1, n_kpoints + 1):
+        lines.append(
+            "  {}   {:.5f}   {:.5f}   {:.5f}".format(
+                k, rng.random(), rng.random(), rng.random()
+            )
+        )
+    lines += ["", "  Fermi energy:     0.18463 Ha", "  Energy gap:       0.02145 Ha", ""]
+    for k in range(1, n_kpoints + 1):
+        lines += [
+            "##################################",
+            "######## K POINT:   {}   ########".format(k),
+            "##################################",
+            "",
+            "",
+            "--- DIAGONAL ELEMENTS [eV] ---",
+            "",
+        ]
+        if job == "KS":
+            lines.append(" Bd       vxc        KS")
+        else:
+            lines.append(
+                " Bd       vxc    sigmax    sigmac         Z        KS        HF        GW   lin/dir "
+            )
+        for band in range(1, n_bands + 1):
+            for _ in range(n_spins):
+                if job == "KS":
+                    values = [rng.uniform(-20, 20) for _ in range(2)]
+                    imag_values = [rng.uniform(-1, 1)]
+                    indent = 5
+                else:
+                    values = [rng.uniform(-20, 20) for _ in range(8)]
+                    imag_values = [rng.uniform(-1, 1) for _ in range(4)]
+                    indent = 25
+                lines.append(
+                    "{:5d}".format(band)
+                    + "".join("{:10.5f}".format(v) for v in values)
+                )
+                lines.append(
+                    " " * indent + "".join("{:10.5f}".format(v) for v in imag_values)
+                )
+        lines += ["", "  Timing (quasiparticle equation):  0.5 s", ""]
+    lines += [
+        "  Fermi energy:     0.19012 Ha",
+        "  Maximal energy:   2.31120 Ha",
+        "",
+        "Timing:  3725",
+        "",
+    ]
+    return "\n".join(lines)
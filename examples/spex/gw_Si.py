@@ -38,7 +38,7 @@ wf_parameters = Dict(dict={'spex_runmax': 1, #Note that runmax > 1 only works wi
                      'serial': False})
 
 remote_data = load_node(44402) # Remote data folder must have necessary files for a spex run
-raw_spexinp="BZ 4 4 4\nJOB GW 1:(4-12)\nNBAND 80\nITERATE\nPROJET\n"
+raw_spexinp="BZ 4 4 4\nJOB GW 1:(4-12)\nNBAND 80\nITERATE\nSECTION ANALYZE\nPROJECT\nEND\n"
 
 parameters = Dict(dict={
     'BZ': [4,4,4],
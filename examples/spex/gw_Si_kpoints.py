@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# Copyright (c), Forschungszentrum Jülich GmbH, IAS-1/PGI-1, Germany.         #
+#                All rights reserved.                                         #
+# This file is part of the AiiDA-SPEX package.                               #
+#                                                                             #
+# The code is hosted on GitHub at https://github.com/JuDFTteam/aiida-spex     #
+# For further information on the license, see the LICENSE.txt file            #
+# For further information please visit http://www.flapw.de or                 #
+###############################################################################
+"""
+Here we run the SpexKpointWorkChain, the k points of the GW JOB are split
+into concurrent SPEX calculations
+"""
+# pylint: disable=invalid-name
+from __future__ import absolute_import, print_function
+
+from aiida.engine import run
+from aiida.orm import load_node
+from aiida.plugins import DataFactory
+
+from aiida_spex.tools.common_spex_wf import is_code, test_and_get_codenode
+from aiida_spex.workflows.kpoints import SpexKpointWorkChain
+
+Dict = DataFactory('dict')
+
+### Defaults ###
+options = Dict(dict={'resources': {"num_machines": 1, "num_mpiprocs_per_machine": 2},
+                     'max_wallclock_seconds':  30*60})
+
+# 3 calculations, the first one writes the RESTART files the others reuse
+wf_parameters = Dict(dict={'n_chunks': 3,
+                           'share_restart': True})
+
+remote_data = load_node(44402) # Remote data folder must have necessary files for a spex run
+
+parameters = Dict(dict={
+    'BZ': [4,4,4],
+    'NBAND': 80,
+    'KPT':{
+        'R': [0.5,0.5,0.5],
+        'X': [0.0,0.5,0.5]
+    },
+    'JOB': {
+        'GW': {'1':[(4,12)], 'R':[(4,12)], 'X':[(4,12)]}
+    },
+    'RESTART': None,
+})
+
+settings = Dict(dict={
+    'parsers': ['gw'],
+    # 'shared_staging': True, # the chunks link one copy of the parent files
+})
+
+
+inputs = {}
+spex_code = is_code(44190)
+inputs['spex'] = test_and_get_codenode( spex_code, expected_code_type='spex.spex')
+inputs['options'] = options
+inputs['wf_parameters'] = wf_parameters
+inputs['remote_data'] = remote_data
+inputs['parameters'] = parameters
+inputs['settings'] = settings
+
+
+res = run(SpexKpointWorkChain, **inputs)
+print(("RUNTIME INFO: {}".format(res)))